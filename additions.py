@@ -14,33 +14,21 @@
 
 import json
 import os
-import sqlite3
 import tkinter as tk
 from tkinter import messagebox, filedialog, simpledialog, scrolledtext
 from datetime import datetime
 
+from namegen import db as _core_db
+
 # 嘗試使用與主程式相同的資料夾名稱（與你的主程式保持一致）
 DATA_DIR = "name_generator_data"
 DB_FILE = os.path.join(DATA_DIR, "name_generator.sqlite3")
 CHAR_ATTR_FILE = os.path.join(DATA_DIR, "char_attributes.json")
 
-# ---------- DB config helpers (獨立於主檔，可用 sqlite 直接讀寫 config 表) ----------
+# ---------- DB config helpers (共用 namegen.db 的長期連線，直接讀寫 config 表) ----------
 def _db_connect():
-    if not os.path.exists(DB_FILE):
-        # caller should ensure DB 已建立 (主程式會呼叫 init_db)
-        # 仍然嘗試建立一個檔案連線
-        conn = sqlite3.connect(DB_FILE, timeout=10, isolation_level=None)
-        try:
-            conn.execute("PRAGMA journal_mode=WAL;")
-        except Exception:
-            pass
-        return conn
-    conn = sqlite3.connect(DB_FILE, timeout=10, isolation_level=None)
-    try:
-        conn.execute("PRAGMA journal_mode=WAL;")
-    except Exception:
-        pass
-    return conn
+    # 主程式已設定資料夾時用它的 DB 路徑，否則用本模組預設路徑；只讀寫 config，不必等寫入佇列
+    return _core_db.db_connect(_core_db.DB_FILE or DB_FILE, flush=False)
 
 def db_config_get_raw(key):
     try:
@@ -0,0 +1,49 @@
+# benchmarks/_common.py
+# 基準測試共用工具：在暫存資料夾中建立資料目錄並載入 namegen.engine（不開啟 Tk 視窗）。
+
+import os
+import sys
+import shutil
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from namegen import engine as app, db
+
+
+def synthetic_words(count):
+    """產生 count 個不重複的常用區漢字（從 U+4E00 起算）。"""
+    return [chr(0x4E00 + i) for i in range(count)]
+
+
+def setup_app(word_count=None, keep_cwd=False):
+    """
+    建立暫存資料夾並載入主程式的字詞庫與 DB。
+    word_count=None 時使用 repo 內的 words_list.txt，否則使用合成字詞庫。
+    回傳 (namegen.engine 模組, tmpdir)。
+    """
+    tmpdir = tempfile.mkdtemp(prefix="namegen_bench_")
+    if not keep_cwd:
+        os.chdir(tmpdir)
+    app.DATA_DIR = os.path.join(tmpdir, "name_generator_data")
+    app.setup_data_paths()
+    if word_count is None:
+        shutil.copy(os.path.join(REPO_DIR, "words_list.txt"), app.WORDS_FILE)
+    else:
+        with open(app.WORDS_FILE, "w", encoding="utf-8") as f:
+            f.write("\n".join(synthetic_words(word_count)) + "\n")
+    app.load_master_words()
+    app.load_char_attributes()
+    db.init_db()
+    return app, tmpdir
+
+
+def timeit(fn, repeat=1):
+    """執行 fn repeat 次，回傳平均秒數。"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
@@ -0,0 +1,48 @@
+# benchmarks/bench_db.py
+# 比較每次呼叫都開新連線（舊行為）與長期連線管理下，各項 DB 操作的平均延遲。
+# 用法： python benchmarks/bench_db.py [--ops 2000]
+
+import argparse
+from datetime import datetime
+
+from _common import setup_app, timeit
+from namegen import db
+
+
+def run_ops(app, ops):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cases = [
+        ("db_config_get", lambda: db.db_config_get("draw_mode", "uniform")),
+        ("db_insert_history", lambda: db.db_insert_history(timestamp, "測試", None)),
+        ("db_append_journal", lambda: db.db_append_journal("exclude", 0)),
+        ("db_get_excluded", lambda: db.db_get_excluded()),
+        ("draw_many(1)", lambda: app.draw_many(1)),
+    ]
+    results = {}
+    for label, fn in cases:
+        results[label] = timeit(fn, ops)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="per-operation SQLite latency: per-call vs long-lived connections")
+    parser.add_argument("--ops", type=int, default=2000)
+    args = parser.parse_args()
+
+    app, _ = setup_app()
+    app.initialize_database(reset_history=True)
+
+    db.PERSISTENT_CONNECTIONS = False
+    before = run_ops(app, args.ops)
+    db.PERSISTENT_CONNECTIONS = True
+    after = run_ops(app, args.ops)
+    db.db_close()
+
+    print(f"{'操作':<20}{'每次新連線':>14}{'長期連線':>14}{'加速':>8}")
+    for label in before:
+        b, a = before[label], after[label]
+        print(f"{label:<20}{b * 1e6:11.1f} us{a * 1e6:11.1f} us{b / a:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/bench_import.py
+# 量測核心套件的匯入時間（每次都在全新的直譯器中），並檢查沒有載入 GUI 或大型選用套件。
+# 超過預算或載入了禁止的模組時以結束碼 1 結束，可放進 CI。
+# 用法： python benchmarks/bench_import.py [--runs 7] [--budget-ms 100] [--gui]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CORE_MODULES = ("namegen.engine", "namegen.cli")
+# 核心在模組載入時不得匯入這些套件（NumPy / pypinyin 應在第一次使用時才載入）
+FORBIDDEN = ("tkinter", "numpy", "pypinyin", "pyttsx3", "additions", "zhuyin_ui", "tts")
+IMPORT_BUDGET_MS = 100.0
+
+_PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - t) * 1000
+print(json.dumps({{"ms": elapsed, "loaded": [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, runs):
+    """在全新直譯器中匯入 module runs 次，回傳 (各次毫秒 list, 被載入的禁止模組)。"""
+    times = []
+    loaded = set()
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", _PROBE.format(module=module, forbidden=FORBIDDEN)],
+                             cwd=REPO_DIR, capture_output=True, text=True, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        times.append(result["ms"])
+        loaded.update(result["loaded"])
+    return times, sorted(loaded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="core import-time budget check")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--gui", action="store_true", help="一併量測 GUI 主程式（需要 tkinter）")
+    args = parser.parse_args()
+
+    # 第一次執行可能需要寫入 .pyc，先暖身一次
+    measure(CORE_MODULES[0], 1)
+    ok = True
+    for module in CORE_MODULES:
+        times, loaded = measure(module, args.runs)
+        median = statistics.median(times)
+        status = "OK" if median <= args.budget_ms and not loaded else "FAIL"
+        ok = ok and status == "OK"
+        print(f"{module:<16} 中位數 {median:7.1f} ms  最小 {min(times):7.1f} ms  預算 {args.budget_ms:.0f} ms  [{status}]")
+        if loaded:
+            print(f"  載入了不應載入的模組: {', '.join(loaded)}")
+
+    if args.gui:
+        try:
+            times, loaded = measure("姓名產生器", args.runs)
+            print(f"{'姓名產生器 (GUI)':<16} 中位數 {statistics.median(times):7.1f} ms  載入: {', '.join(loaded) or '-'}")
+        except subprocess.CalledProcessError as e:
+            print(f"GUI 主程式無法匯入：{e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+# benchmarks/bench_phonetics.py
+# 比較抽取與預覽評分時「每次呼叫 pypinyin」與「查每字聲調表」的延遲，以及聲調表由 pypinyin / DB 拼音快取建立的時間。
+# 用法： python benchmarks/bench_phonetics.py [--draws 2000] [--sample 800]
+
+import argparse
+import random
+
+from _common import setup_app, timeit
+from namegen import db, phonetics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pypinyin vs. phonetic table benchmark")
+    parser.add_argument("--draws", type=int, default=2000)
+    parser.add_argument("--sample", type=int, default=800)
+    args = parser.parse_args()
+
+    app, _ = setup_app()
+    if not phonetics.PINYIN_ENABLED:
+        print("pypinyin 未安裝，無法比較。")
+        return
+    app.initialize_database(reset_history=True)
+
+    def build_table(clear_db):
+        if clear_db:
+            with db.db_connect() as conn:
+                conn.execute("DELETE FROM phonetic_cache;")
+        app._PHONETIC_CACHE_DB = None  # 強制重新讀取 DB 快取
+        app.build_phonetic_table()
+
+    t_cold = timeit(lambda: build_table(True))
+    t_warm = timeit(lambda: build_table(False), 3)
+    print(f"聲調表建立 ({app.WORD_COUNT} 字)  pypinyin: {t_cold * 1e3:8.1f} ms   拼音快取: {t_warm * 1e3:8.1f} ms")
+
+    names = []
+    for idx in app.NAME_INDICES_CACHE.sample(args.sample):
+        ia, ib = divmod(idx, app.WORD_COUNT)
+        names.append((ia, ib, app.MASTER_WORDS[ia] + app.MASTER_WORDS[ib]))
+
+    def tones_pypinyin():
+        for _, _, name in names:
+            phonetics.get_pinyin_with_tone(name)
+
+    def tones_table():
+        for ia, ib, _ in names:
+            (app.CHAR_TONES[ia], app.CHAR_TONES[ib])
+
+    t_old = timeit(tones_pypinyin, 3) / len(names)
+    t_new = timeit(tones_table, 3) / len(names)
+    print(f"聲調查詢 / 名字  pypinyin: {t_old * 1e6:9.2f} us   查表: {t_new * 1e6:9.2f} us")
+
+    t_score = timeit(lambda: [app.score_name(n) for _, _, n in names]) / len(names)
+    print(f"score_name / 名字: {t_score * 1e6:9.2f} us  ({len(names)} 個預覽候選共 {t_score * len(names) * 1e3:.1f} ms)")
+
+    random.seed(0)
+    draws = min(args.draws, len(app.NAME_INDICES_CACHE))
+    t_draw = timeit(lambda: app.draw_many(1), draws)
+    print(f"draw_many(1) 平均延遲: {t_draw * 1e3:.3f} ms  ({draws} 次)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# benchmarks/bench_scale.py
+# 字詞庫規模基準：以合成字詞庫（250 / 2,000 / 5,000 / 20,000 字）各在全新的直譯器中量測
+#   words   ：建立資料夾並載入字詞庫、字屬性與 DB（ms）
+#   tones   ：第一次建立聲調表（pypinyin 逐字查詢，之後由 phonetic_cache 取得；s）
+#   reset   ：initialize_database(reset_history=True)，含聲調預過濾與寫入抽取池快照（s）
+#   reopen  ：load_indices_cache，即下次啟動從 DB 載入抽取池快照（ms）
+#   draw    ：draw_many(1) 的延遲中位數 / p99（ms）
+#   batch   ：draw_many(10000) 每秒抽取數
+#   rss     ：行程的峰值 RSS（MB）
+#   db      ：DB 檔大小（含 -wal；MB）
+# 抽取池模式依組合數自動選擇（list / permutation / sparse，見 engine.choose_pool_mode）。
+# 用法： python benchmarks/bench_scale.py [--words 250,2000,5000,20000] [--length 2] [--draws 2000]
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+COLUMNS = ("words_ms", "tones_s", "reset_s", "reopen_ms", "draw_p50_ms", "draw_p99_ms", "batch_per_s", "rss_mb", "db_mb")
+
+
+def probe(word_count, length, draws):
+    """子行程：建立資料夾、重置並抽取，回傳各項量測值。"""
+    from _common import setup_app
+    from namegen import db
+
+    start = time.perf_counter()
+    app, tmpdir = setup_app(word_count)
+    words_ms = (time.perf_counter() - start) * 1000
+    db.db_config_set("name_length", str(length))
+    app.load_name_length()
+
+    start = time.perf_counter()
+    app.ensure_phonetic_table()
+    tones_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    filtered = app.initialize_database(reset_history=True)
+    reset_s = time.perf_counter() - start
+    mode = type(app.NAME_INDICES_CACHE).__name__
+
+    app.save_indices_cache()
+    # 模擬下次啟動：先放掉記憶體中的抽取池再從 DB 載入
+    app.NAME_INDICES_CACHE = app.IndexPool(0)
+    start = time.perf_counter()
+    app.load_indices_cache()
+    reopen_ms = (time.perf_counter() - start) * 1000
+
+    latencies = []
+    for _ in range(draws):
+        start = time.perf_counter()
+        app.draw_many(1)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    start = time.perf_counter()
+    batch = len(app.draw_many(10000))
+    batch_per_s = batch / (time.perf_counter() - start)
+    app.save_indices_cache()
+    db.db_flush()
+    db.db_close()
+
+    db_bytes = sum(os.path.getsize(db.DB_FILE + ext) for ext in ("", "-wal") if os.path.exists(db.DB_FILE + ext))
+    return {
+        "words": word_count,
+        "pool": app.POOL_SIZE,
+        "mode": mode,
+        "filtered": filtered or 0,
+        "words_ms": words_ms,
+        "tones_s": tones_s,
+        "reset_s": reset_s,
+        "reopen_ms": reopen_ms,
+        "draw_p50_ms": statistics.median(latencies),
+        "draw_p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "batch_per_s": batch_per_s,
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "db_mb": db_bytes / (1 << 20),
+        "tmpdir": tmpdir,
+    }
+
+
+def run_probe(word_count, length, draws):
+    cmd = [sys.executable, os.path.abspath(__file__), "--probe", str(word_count),
+           "--length", str(length), "--draws", str(draws)]
+    out = subprocess.run(cmd, cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="word-list scaling benchmark")
+    parser.add_argument("--words", default="250,2000,5000,20000", help="以逗號分隔的字數")
+    parser.add_argument("--length", type=int, default=2, help="名字長度")
+    parser.add_argument("--draws", type=int, default=2000, help="量測 draw_many(1) 延遲的次數")
+    parser.add_argument("--probe", type=int, metavar="WORDS", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        result = probe(args.probe, args.length, args.draws)
+        shutil.rmtree(result.pop("tmpdir"), ignore_errors=True)
+        print(json.dumps(result))
+        return 0
+
+    print(f"{'字數':>6} {'組合數':>15} {'抽取池':<22}" + "".join(f"{c:>13}" for c in COLUMNS))
+    for word_count in (int(w) for w in args.words.split(",") if w.strip()):
+        r = run_probe(word_count, args.length, args.draws)
+        print(f"{r['words']:>6,} {r['pool']:>15,} {r['mode']:<22}" + "".join(f"{r[c]:>13,.2f}" for c in COLUMNS), flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
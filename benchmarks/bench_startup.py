@@ -0,0 +1,151 @@
+# benchmarks/bench_startup.py
+# 啟動時間基準：每次都在全新的直譯器中重現 GUI 的啟動流程，量測
+#   import    ：匯入主程式（tkinter、對話框模組、namegen 核心）
+#   loaded    ：字詞庫 / 字屬性 / DB / 抽取池載入完成
+#   frame     ：建立 Tk 視窗並完成第一次繪製（沒有顯示器時略過）
+#   draw      ：第一次抽取完成（含拼音顯示），即 time-to-first-draw
+# cold：使用空的 bytecode 快取（-X pycache_prefix 指向新資料夾），warm：重複使用同一份快取。
+# --eager 在視窗出現前就建立聲調表並載入 pyttsx3（延遲載入之前的行為），供比較。
+# --think-ms 模擬使用者在視窗出現後多久才按下抽取；期間背景預熱照常進行。
+# 用法： python benchmarks/bench_startup.py [--runs 5] [--think-ms 0] [--eager] [--words 2000]
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MARKS = ("import", "loaded", "frame", "draw")
+
+
+def probe(data_dir, eager, think_ms):
+    """子行程：依 GUI __main__ 的順序啟動，回傳各階段距離直譯器開始的毫秒數。"""
+    import time
+    t0 = time.perf_counter()
+    marks = {}
+
+    def mark(key):
+        marks[key] = (time.perf_counter() - t0) * 1000
+
+    sys.path.insert(0, REPO_DIR)
+    import 姓名產生器 as gui
+    from namegen import engine, phonetics
+    from namegen.db import init_db
+    mark("import")
+
+    engine.DATA_DIR = data_dir
+    gui.setup_data_paths()
+    gui.load_master_words()
+    gui.load_char_attributes()
+    init_db()
+    gui.load_draw_mode()
+    gui.load_indices_cache()
+    if not engine.NAME_INDICES_CACHE and engine.POOL_SIZE > 0:
+        gui.initialize_database(reset_history=True)
+    gui.db.start_writer()
+    if eager:
+        gui.warm_optional_modules()
+    mark("loaded")
+
+    root = None
+    try:
+        root = gui.tk.Tk()
+        gui.NameGeneratorApp(root)
+        root.update()
+        mark("frame")
+    except gui.tk.TclError:
+        # 沒有顯示器：只量測非 GUI 部分
+        root = None
+    if not eager:
+        gui.start_background_warmup()
+    if think_ms:
+        deadline = time.perf_counter() + think_ms / 1000
+        while time.perf_counter() < deadline:
+            if root is not None:
+                root.update()
+            time.sleep(0.005)
+
+    draw_start = time.perf_counter()
+    names = engine.draw_many(1)
+    if names and phonetics.PINYIN_ENABLED:
+        engine.get_name_phonetics(names[0])
+    mark("draw")
+    marks["draw_latency"] = (time.perf_counter() - draw_start) * 1000
+    marks["pypinyin_loaded"] = "pypinyin" in sys.modules
+    if root is not None:
+        root.destroy()
+    return marks
+
+
+def run_probe(data_dir, pycache, eager, think_ms):
+    cmd = [sys.executable, "-X", f"pycache_prefix={pycache}", os.path.abspath(__file__),
+           "--probe", data_dir, "--think-ms", str(think_ms)]
+    if eager:
+        cmd.append("--eager")
+    out = subprocess.run(cmd, cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def prepare_data_dir(words):
+    """建立一份已初始化的資料夾（相當於第二次以後的啟動）。"""
+    tmp = tempfile.mkdtemp(prefix="namegen_startup_")
+    data_dir = os.path.join(tmp, "name_generator_data")
+    os.makedirs(data_dir)
+    words_file = os.path.join(data_dir, "words_list.txt")
+    if words:
+        with open(words_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(chr(0x4E00 + i) for i in range(words)) + "\n")
+    else:
+        shutil.copy(os.path.join(REPO_DIR, "words_list.txt"), words_file)
+    subprocess.run([sys.executable, "-m", "namegen", "--data-dir", data_dir, "status"],
+                   cwd=REPO_DIR, capture_output=True, check=True)
+    return tmp, data_dir
+
+
+def report(label, results):
+    cells = []
+    for key in MARKS + ("draw_latency",):
+        values = [r[key] for r in results if key in r]
+        cells.append(f"{key} {statistics.median(values):7.1f}" if values else f"{key} {'-':>7}")
+    loaded = sum(1 for r in results if r.get("pypinyin_loaded"))
+    print(f"{label:<6} " + "  ".join(cells) + f"  (ms, 中位數)  pypinyin 載入 {loaded}/{len(results)} 次")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="startup time benchmark (cold / warm)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--think-ms", type=int, default=0)
+    parser.add_argument("--eager", action="store_true")
+    parser.add_argument("--words", type=int, default=0, help="使用合成字詞庫的字數（0 = repo 的 words_list.txt）")
+    parser.add_argument("--probe", metavar="DATA_DIR", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        print(json.dumps(probe(args.probe, args.eager, args.think_ms)))
+        return 0
+
+    tmp, data_dir = prepare_data_dir(args.words)
+    try:
+        cold = []
+        for _ in range(args.runs):
+            pycache = tempfile.mkdtemp(dir=tmp, prefix="pycache_")
+            cold.append(run_probe(data_dir, pycache, args.eager, args.think_ms))
+        pycache = tempfile.mkdtemp(dir=tmp, prefix="pycache_")
+        run_probe(data_dir, pycache, args.eager, args.think_ms)
+        warm = [run_probe(data_dir, pycache, args.eager, args.think_ms) for _ in range(args.runs)]
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    print(f"模式: {'eager（視窗前載入）' if args.eager else 'deferred（背景預熱）'}  think={args.think_ms} ms")
+    report("cold", cold)
+    report("warm", warm)
+    if not any("frame" in r for r in cold + warm):
+        print("（沒有顯示器，未量測 frame）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
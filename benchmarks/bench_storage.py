@@ -0,0 +1,43 @@
+# benchmarks/bench_storage.py
+# 依儲存設定檔（durable / balanced / fast）比較：重置時間、逐筆抽取（每筆一次提交）與批次抽取的每秒名字數。
+# 每個設定檔都使用新的暫存資料夾，避免互相影響。
+# 用法： python benchmarks/bench_storage.py [--words 600] [--draws 1000] [--batch 20000]
+
+import argparse
+import time
+
+from _common import setup_app
+from namegen import db
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite storage profile benchmark")
+    parser.add_argument("--words", type=int, default=600, help="合成字詞庫字數（組合數為平方）")
+    parser.add_argument("--draws", type=int, default=1000, help="逐筆抽取次數")
+    parser.add_argument("--batch", type=int, default=20000, help="批次抽取數量")
+    args = parser.parse_args()
+
+    print(f"{'設定檔':<10}{'重置':>10}{'逐筆抽取':>16}{'批次抽取':>16}")
+    for profile in db.STORAGE_PROFILES:
+        app, _ = setup_app(args.words)
+        db.set_storage_profile(profile)
+
+        start = time.perf_counter()
+        app.initialize_database(reset_history=True)
+        t_reset = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.draws):
+            app.draw_many(1)
+        single_rate = args.draws / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        drawn = len(app.draw_many(args.batch))
+        batch_rate = drawn / (time.perf_counter() - start)
+
+        print(f"{profile:<10}{t_reset * 1e3:8.1f} ms{single_rate:11,.0f} 個/秒{batch_rate:11,.0f} 個/秒")
+        db.db_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# benchmarks/bench_writer.py
+# 量測 Tk 主執行緒上 draw_many(1) 的延遲：同步寫入 vs. 背景寫入佇列（group commit），
+# 並模擬另一個行程持有 DB 寫入鎖一段時間時，抽取是否會卡住。
+# 用法： python benchmarks/bench_writer.py [--draws 2000] [--lock-ms 300]
+
+import argparse
+import sqlite3
+import statistics
+import threading
+import time
+
+from _common import setup_app
+from namegen import db
+
+
+def hold_lock(path, seconds, ready):
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("BEGIN IMMEDIATE;")
+    ready.set()
+    time.sleep(seconds)
+    conn.execute("COMMIT;")
+    conn.close()
+
+
+def measure(app, draws, lock_ms):
+    latencies = []
+    for _ in range(draws):
+        start = time.perf_counter()
+        app.draw_many(1)
+        latencies.append((time.perf_counter() - start) * 1000)
+    ready = threading.Event()
+    locker = threading.Thread(target=hold_lock, args=(db.DB_FILE, lock_ms / 1000, ready))
+    locker.start()
+    ready.wait()
+    start = time.perf_counter()
+    app.draw_many(1)
+    locked = (time.perf_counter() - start) * 1000
+    locker.join()
+    db.db_flush()
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1], locked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="draw latency: synchronous vs write-behind")
+    parser.add_argument("--draws", type=int, default=2000)
+    parser.add_argument("--lock-ms", type=int, default=300)
+    args = parser.parse_args()
+
+    app, _ = setup_app()
+    app.initialize_database(reset_history=True)
+
+    print(f"{'模式':<14}{'中位數':>10}{'p99':>10}{'DB 被鎖時':>14}")
+    for label, use_writer in (("同步寫入", False), ("背景寫入佇列", True)):
+        if use_writer:
+            db.start_writer()
+        median, p99, locked = measure(app, args.draws, args.lock_ms)
+        print(f"{label:<14}{median:7.3f} ms{p99:7.3f} ms{locked:11.1f} ms")
+    db.stop_writer()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+# namegen —— 名字抽取器的核心套件（不依賴 tkinter，模組載入時不匯入 NumPy / pypinyin）
+#   pools     ：抽取池資料結構        db      ：SQLite 存取
+#   filters   ：聲調過濾規則          phonetics：pypinyin 包裝（延遲載入）
+#   engine    ：字詞庫、評分、抽取    cli     ：命令列入口（python -m namegen）
+#   export    ：歷史紀錄串流匯出
+#   favorites ：收藏清單分頁模型
@@ -0,0 +1,5 @@
+import sys
+
+from namegen.cli import main
+
+sys.exit(main())
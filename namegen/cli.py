@@ -0,0 +1,218 @@
+# namegen/cli.py
+# 無視窗的命令列介面：與 GUI 共用同一套抽取池、過濾規則與歷史紀錄（namegen.engine）。
+#
+#   python -m namegen draw --count 100000 --format jsonl > names.jsonl
+#   python -m namegen reset [--smart]
+#   python -m namegen status
+#   python -m namegen storage [durable|balanced|fast]
+#   python -m namegen export history.jsonl.gz
+#   python -m namegen length [1-4]
+#   python -m namegen surname [王 | --none] [--list 王,李,歐陽]
+#
+# draw 以 draw_many() 分批抽取，每批寫完立即 flush 到 stdout，大量抽取時不會累積在記憶體。
+
+import argparse
+import csv
+import json
+import os
+import sys
+
+from namegen import db, engine, phonetics
+from namegen.db import init_db, db_close
+from namegen.export import export_history, EXPORT_FORMATS
+
+FORMATS = ("txt", "csv", "jsonl")
+
+
+def _load_app(data_dir):
+    """完成與 GUI 啟動時相同的初始化（不建立 Tk 視窗），回傳 engine 模組。"""
+    app = engine
+    app.DATA_DIR = data_dir
+    app.setup_data_paths()
+    if not os.path.exists(app.WORDS_FILE):
+        raise SystemExit(f"找不到字詞庫檔案：{app.WORDS_FILE}")
+    try:
+        app.load_master_words()
+    except ValueError as e:
+        raise SystemExit(str(e))
+    app.load_char_attributes()
+    init_db()
+    app.load_draw_mode()
+    # 尚未建立抽取池（全新或舊版資料庫）時由 load_indices_cache 依歷史建立，不會清除任何紀錄
+    app.load_indices_cache()
+    return app
+
+
+class _Writer:
+    """依格式把名字寫到串流。"""
+
+    def __init__(self, app, fmt, stream):
+        self.app = app
+        self.fmt = fmt
+        self.stream = stream
+        self.csv = csv.writer(stream) if fmt == "csv" else None
+        if self.csv:
+            self.csv.writerow(["Name", "Pinyin", "Tones"])
+
+    def write(self, names):
+        if self.fmt == "txt":
+            self.stream.write("".join(name + "\n" for name in names))
+            return
+        for name in names:
+            pinyin, tones = "", ()
+            if phonetics.PINYIN_ENABLED:
+                try:
+                    pinyin, tones = self.app.get_name_phonetics(name)
+                except Exception:
+                    pass
+            if self.csv:
+                self.csv.writerow([name, pinyin, ",".join(str(t) for t in tones)])
+            else:
+                self.stream.write(json.dumps({"name": name, "pinyin": pinyin, "tones": list(tones)},
+                                             ensure_ascii=False) + "\n")
+
+
+def cmd_draw(app, args):
+    out = sys.stdout
+    writer = _Writer(app, args.format, out)
+    remaining = args.count
+    drawn = 0
+    try:
+        while remaining > 0 and app.NAME_INDICES_CACHE:
+            names = app.draw_many(min(args.chunk, remaining))
+            if not names:
+                break
+            writer.write([app.full_name(name) for name in names])
+            out.flush()
+            drawn += len(names)
+            remaining -= len(names)
+    except BrokenPipeError:
+        # 下游（例如 | head）已關閉；已抽出的名字仍記錄在歷史中
+        try:
+            sys.stdout = open(os.devnull, "w")
+        except Exception:
+            pass
+    finally:
+        app.save_indices_cache()
+    print(f"已抽取 {drawn:,} 個名字，剩餘 {len(app.NAME_INDICES_CACHE):,} 個組合。", file=sys.stderr)
+    return 0 if drawn >= args.count else 1
+
+
+def cmd_reset(app, args):
+    filtered = app.initialize_database(reset_history=not args.smart, exclude_drawn=args.smart)
+    print(f"{'智慧' if args.smart else '標準'}重置完成：總組合數 {app.POOL_SIZE:,}，"
+          f"聲調預先過濾 {filtered or 0:,}，剩餘 {len(app.NAME_INDICES_CACHE):,}。", file=sys.stderr)
+    return 0
+
+
+def cmd_status(app, args):
+    print(f"字數: {app.WORD_COUNT:,}")
+    print(f"名字長度: {app.NAME_LENGTH}")
+    print(f"姓氏: {app.SURNAME or '（不加姓）'}")
+    print(f"總組合數: {app.POOL_SIZE:,}")
+    print(f"剩餘: {len(app.NAME_INDICES_CACHE):,}")
+    print(f"抽取池: {type(app.NAME_INDICES_CACHE).__name__}")
+    print(f"抽取模式: {app.DRAW_MODE}")
+    print(f"儲存設定檔: {db.STORAGE_PROFILE}")
+    return 0
+
+
+def cmd_storage(app, args):
+    if args.profile:
+        db.set_storage_profile(args.profile)
+    for name, pragmas in db.STORAGE_PROFILES.items():
+        mark = "*" if name == db.STORAGE_PROFILE else " "
+        print(f"{mark} {name:<9} " + "  ".join(f"{k}={v}" for k, v in pragmas.items()))
+    return 0
+
+
+def cmd_export(app, args):
+    def progress(done, total):
+        print(f"\r已匯出 {done:,} / {total:,} 筆", end="", file=sys.stderr, flush=True)
+    count = export_history(args.path, fmt=args.format, progress=progress)
+    print(f"\n歷史記錄已匯出至 {args.path}（{count:,} 筆）", file=sys.stderr)
+    return 0
+
+
+def cmd_length(app, args):
+    if args.length is not None:
+        try:
+            filtered = app.set_name_length(args.length)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+        print(f"名字長度已設為 {app.NAME_LENGTH}：總組合數 {app.POOL_SIZE:,}，"
+              f"聲調預先過濾 {filtered or 0:,}，剩餘 {len(app.NAME_INDICES_CACHE):,}。", file=sys.stderr)
+    else:
+        print(app.NAME_LENGTH)
+    return 0
+
+
+def cmd_surname(app, args):
+    try:
+        if args.list is not None:
+            app.set_surnames(s for s in args.list.replace("，", ",").split(",") if s.strip())
+        if args.none:
+            app.set_surname("")
+        elif args.surname is not None:
+            app.set_surname(args.surname)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    for surname in app.SURNAMES:
+        print(f"{'*' if surname == app.SURNAME else ' '} {surname}")
+    if not app.SURNAME:
+        print("* （不加姓）")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m namegen", description="名字抽取器（命令列版）")
+    parser.add_argument("--data-dir", default="name_generator_data", help="資料夾（預設 name_generator_data）")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_draw = sub.add_parser("draw", help="抽取名字並輸出到 stdout")
+    p_draw.add_argument("--count", "-n", type=int, default=1)
+    p_draw.add_argument("--format", "-f", choices=FORMATS, default="txt")
+    p_draw.add_argument("--chunk", type=int, default=1000, help="每批抽取/寫入的數量")
+    p_draw.set_defaults(func=cmd_draw)
+
+    p_reset = sub.add_parser("reset", help="重置抽取池")
+    p_reset.add_argument("--smart", action="store_true", help="保留歷史，排除已抽組合")
+    p_reset.set_defaults(func=cmd_reset)
+
+    p_status = sub.add_parser("status", help="顯示抽取進度")
+    p_status.set_defaults(func=cmd_status)
+
+    p_storage = sub.add_parser("storage", help="顯示或設定 SQLite 儲存設定檔")
+    p_storage.add_argument("profile", nargs="?", choices=tuple(db.STORAGE_PROFILES))
+    p_storage.set_defaults(func=cmd_storage)
+
+    p_export = sub.add_parser("export", help="匯出歷史紀錄（副檔名 .gz 時壓縮）")
+    p_export.add_argument("path")
+    p_export.add_argument("--format", "-f", choices=EXPORT_FORMATS, help="預設依副檔名判斷")
+    p_export.set_defaults(func=cmd_export)
+
+    p_length = sub.add_parser("length", help="顯示或設定名字長度（切換時重建該長度的抽取池）")
+    p_length.add_argument("length", nargs="?", type=int,
+                          choices=range(engine.NAME_LENGTH_MIN, engine.NAME_LENGTH_MAX + 1))
+    p_length.set_defaults(func=cmd_length)
+
+    p_surname = sub.add_parser("surname", help="顯示或設定姓氏（評分與聲調過濾以「姓 + 名」計算）")
+    p_surname.add_argument("surname", nargs="?")
+    p_surname.add_argument("--none", action="store_true", help="不加姓")
+    p_surname.add_argument("--list", help="以逗號分隔設定整份姓氏清單")
+    p_surname.set_defaults(func=cmd_surname)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if getattr(args, "count", 1) < 0 or getattr(args, "chunk", 1) <= 0:
+        print("--count 不可為負數，--chunk 必須大於 0。", file=sys.stderr)
+        return 2
+    app = _load_app(args.data_dir)
+    try:
+        return args.func(app, args)
+    finally:
+        db_close()
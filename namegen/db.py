@@ -0,0 +1,703 @@
+# namegen/db.py
+# SQLite 存取：資料表結構、抽取池快照與 journal、歷史/收藏/排除紀錄、config 鍵值。
+# DB_FILE 由 namegen.engine.setup_data_paths() 設定。
+
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+from namegen.pools import PermutationPool, SparsePermutationPool, BITMAP_CHUNK_BYTES
+
+DB_FILE = None
+
+# ----------------- 連線管理 -----------------
+# 每個執行緒對每個 DB 檔保留一條長期連線：PRAGMA 只在開啟時執行一次，
+# sqlite3 內建的 prepared statement 快取（cached_statements）也因此能跨呼叫重用。
+# 呼叫端照舊寫 `with db_connect() as conn:`；離開 with 只會 commit / rollback，不會關閉連線。
+PERSISTENT_CONNECTIONS = True  # False：每次呼叫都開新連線（舊行為，供基準比較）
+STATEMENT_CACHE_SIZE = 256
+_LOCAL = threading.local()
+
+# 儲存設定檔（config 鍵 'storage_profile'），每條連線開啟時與設定變更後都會套用：
+#   durable ：每次提交都 fsync（SQLite 預設），斷電也不遺失已提交的抽取
+#   balanced：WAL + synchronous=NORMAL，只在 checkpoint 時 fsync；斷電最多遺失最後幾筆提交，不會損毀
+#   fast    ：不 fsync，適合可重建的暫存資料或大量批次抽取
+# page_size 維持 SQLite 預設（WAL 模式下變更需重建整個 DB）。
+STORAGE_PROFILES = {
+    "durable": {"synchronous": "FULL", "cache_size": -8192, "mmap_size": 0,
+                "temp_store": "DEFAULT", "wal_autocheckpoint": 1000},
+    "balanced": {"synchronous": "NORMAL", "cache_size": -32768, "mmap_size": 64 * 1024 * 1024,
+                 "temp_store": "MEMORY", "wal_autocheckpoint": 1000},
+    "fast": {"synchronous": "OFF", "cache_size": -65536, "mmap_size": 256 * 1024 * 1024,
+             "temp_store": "MEMORY", "wal_autocheckpoint": 4000},
+}
+DEFAULT_STORAGE_PROFILE = "balanced"
+STORAGE_PROFILE = DEFAULT_STORAGE_PROFILE
+_PROFILE_VERSION = 0
+
+def _apply_storage_profile(conn):
+    for pragma, value in STORAGE_PROFILES[STORAGE_PROFILE].items():
+        try:
+            conn.execute(f"PRAGMA {pragma}={value};")
+        except Exception:
+            pass
+
+def _open_connection(path):
+    conn = sqlite3.connect(path, timeout=10, isolation_level=None, cached_statements=STATEMENT_CACHE_SIZE)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL;")
+    except Exception:
+        pass
+    _apply_storage_profile(conn)
+    return conn
+
+def db_connect(path=None, flush=True):
+    """
+    回傳目前執行緒連到 path（預設 DB_FILE）的長期連線。
+    寫入佇列啟用時會先等佇列內的寫入提交（flush=False 只用於不受佇列影響的 config 表）。
+    """
+    path = path or DB_FILE
+    if path is None:
+        raise RuntimeError("DB_FILE unknown. Call setup_data_paths() first.")
+    if flush and _WRITER is not None:
+        _WRITER.flush()
+    if not PERSISTENT_CONNECTIONS:
+        return _open_connection(path)
+    conns = getattr(_LOCAL, "conns", None)
+    if conns is None:
+        conns = _LOCAL.conns = {}
+        _LOCAL.profile_versions = {}
+    conn = conns.get(path)
+    if conn is None:
+        conn = conns[path] = _open_connection(path)
+        _LOCAL.profile_versions[path] = _PROFILE_VERSION
+    elif _LOCAL.profile_versions.get(path) != _PROFILE_VERSION:
+        # 其他執行緒變更了設定檔：這條連線下次使用時補套用
+        _apply_storage_profile(conn)
+        _LOCAL.profile_versions[path] = _PROFILE_VERSION
+    return conn
+
+def db_close():
+    """關閉目前執行緒的所有連線（程式結束或切換資料夾時呼叫）。"""
+    conns = getattr(_LOCAL, "conns", None) or {}
+    for conn in conns.values():
+        try:
+            conn.close()
+        except Exception:
+            pass
+    conns.clear()
+
+# ----------------- 寫入佇列（write-behind） -----------------
+# start_writer() 之後，抽取/journal/歷史/收藏/排除的新增改由背景執行緒寫入：
+# 每 WRITE_BEHIND_INTERVAL 秒或累積 WRITE_BEHIND_MAX_BATCH 筆合併成一個交易（group commit），
+# 呼叫端（Tk 主執行緒）只把資料放進佇列就返回，不會被磁碟或其他行程的 DB 鎖卡住。
+# 其他 DB 操作經 db_connect() 前會先 flush，因此讀取永遠看得到先前排入的寫入。
+# 程式異常終止時，最多遺失最後一個尚未提交的批次。
+# 提交失敗（例如其他行程鎖住 DB 超過逾時）的寫入不會丟掉：保留在 failed，依原順序排在下一批之前，
+# 每 WRITE_BEHIND_RETRY_DELAY 秒重試；stop_writer() 時仍無法提交則丟出 RuntimeError。
+WRITE_BEHIND_INTERVAL = 0.005
+WRITE_BEHIND_MAX_BATCH = 500
+WRITE_BEHIND_RETRY_DELAY = 1.0
+_WRITER = None
+_UNCOMMITTED = []  # stop_writer() 時仍無法提交的 (DB 路徑, statements)，下次 stop_writer() 再試
+
+def _commit_statements(path, statements):
+    with db_connect(path) as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN;")
+        for sql, rows in statements:
+            cur.executemany(sql, rows)
+        cur.execute("COMMIT;")
+
+def _commit_groups(groups):
+    """依序提交 [(DB 路徑, statements)]（同一路徑合併成一個交易），回傳 (未能提交的 groups, 最後的例外)。"""
+    by_path = {}
+    for path, statements in groups:
+        by_path.setdefault(path, []).extend(statements)
+    failed, error = [], None
+    for path, statements in by_path.items():
+        try:
+            _commit_statements(path, statements)
+        except Exception as e:
+            failed.append((path, statements))
+            error = e
+    return failed, error
+
+class WriteBehindWriter:
+    """背景寫入執行緒；佇列元素為 (DB 路徑, [(sql, 參數列 list), ...])。"""
+
+    def __init__(self, interval=WRITE_BEHIND_INTERVAL, max_batch=WRITE_BEHIND_MAX_BATCH):
+        self.interval = interval
+        self.max_batch = max_batch
+        self.queue = queue.Queue()
+        self.pending = 0
+        self.cond = threading.Condition()
+        self.error = None
+        self.failed = []  # 提交失敗、等待重試的 (DB 路徑, statements)
+        self.thread = threading.Thread(target=self._run, name="namegen-db-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, path, statements):
+        with self.cond:
+            self.pending += 1
+        self.queue.put((path, statements))
+
+    def flush(self, timeout=None):
+        """
+        等待目前已排入的寫入處理完畢；在寫入執行緒本身呼叫時直接返回。
+        回傳 False 表示逾時，或有寫入提交失敗仍在等待重試（錯誤見 self.error）。
+        """
+        if threading.current_thread() is self.thread:
+            return True
+        with self.cond:
+            done = self.cond.wait_for(lambda: self.pending == 0 or not self.thread.is_alive(), timeout)
+        return done and not self.failed
+
+    def close(self, timeout=None):
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            try:
+                item = self.queue.get(timeout=WRITE_BEHIND_RETRY_DELAY if self.failed else None)
+            except queue.Empty:
+                self._commit([])  # 沒有新的寫入：只重試失敗的批次
+                continue
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            with self.cond:
+                self.pending -= len(batch)
+                self.cond.notify_all()
+
+    def _commit(self, batch):
+        """先重試之前失敗的寫入再提交這一批（維持原本順序）；失敗的留在 self.failed。"""
+        retrying = bool(self.failed)
+        self.failed, error = _commit_groups(self.failed + batch)
+        if self.failed:
+            if self.error is None:
+                print("警告：背景寫入 DB 失敗，稍後重試:", error)
+            self.error = error
+        elif retrying:
+            self.error = None
+
+def start_writer():
+    global _WRITER
+    if _WRITER is None or not _WRITER.thread.is_alive():
+        _WRITER = WriteBehindWriter()
+    return _WRITER
+
+def stop_writer(timeout=10):
+    """
+    提交佇列中剩餘的寫入並結束寫入執行緒（關閉視窗 / 重新啟動前呼叫）。
+    仍有寫入無法提交時丟出 RuntimeError；這些寫入會保留，再呼叫一次 stop_writer() 即重試。
+    """
+    global _WRITER, _UNCOMMITTED
+    writer, _WRITER = _WRITER, None
+    if writer is not None:
+        writer.close(timeout)
+        if writer.thread.is_alive():
+            _WRITER = writer  # 仍在提交中：保留寫入器，再呼叫一次 stop_writer() 繼續等待
+            raise RuntimeError("背景寫入執行緒未在時限內結束。")
+        _UNCOMMITTED += writer.failed
+    if _UNCOMMITTED:
+        # 寫入執行緒已結束：在呼叫端最後再試一次
+        _UNCOMMITTED, error = _commit_groups(_UNCOMMITTED)
+        if _UNCOMMITTED:
+            count = sum(len(rows) for _, statements in _UNCOMMITTED for _, rows in statements)
+            raise RuntimeError(f"有 {count} 筆寫入無法提交到 DB：{error}")
+
+def db_flush(timeout=None):
+    if _WRITER is not None:
+        return _WRITER.flush(timeout)
+    return True
+
+def _db_write(statements):
+    """寫入 [(sql, 參數列 list)]：寫入佇列啟用時排入佇列，否則立即以一個交易執行。"""
+    if _WRITER is not None:
+        _WRITER.submit(DB_FILE, statements)
+        return
+    with db_connect() as conn:
+        cur = conn.cursor()
+        if len(statements) == 1 and len(statements[0][1]) == 1:
+            cur.execute(statements[0][0], statements[0][1][0])
+            return
+        cur.execute("BEGIN;")
+        for sql, rows in statements:
+            cur.executemany(sql, rows)
+        cur.execute("COMMIT;")
+
+def init_db():
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS remaining_indices (
+                idx INTEGER PRIMARY KEY
+            );
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                name TEXT NOT NULL,
+                tones TEXT,
+                idx INTEGER
+            );
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS favorites (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                name TEXT NOT NULL,
+                idx INTEGER
+            );
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS excluded (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                name TEXT NOT NULL,
+                idx INTEGER
+            );
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS config (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS pool_journal (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                op TEXT NOT NULL,
+                idx INTEGER NOT NULL
+            );
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS pool_bitmap (
+                chunk INTEGER PRIMARY KEY,
+                bits BLOB NOT NULL
+            );
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS phonetic_cache (
+                key TEXT PRIMARY KEY,
+                pinyin TEXT NOT NULL,
+                tones TEXT NOT NULL,
+                zhuyin TEXT NOT NULL
+            );
+        """)
+        _migrate_record_indices(cur)
+        _create_char_usage(cur)
+    load_storage_profile()
+
+# ----------------- 紀錄表的組合索引欄 -----------------
+# history / favorites / excluded 都存一份組合索引 idx（不在字詞庫中的名字為 NULL），
+# 「是否已抽/已收藏/已排除」與智慧重置都改成索引查詢，不必掃描整張表比對名字。
+RECORD_TABLES = ("history", "favorites", "excluded")
+RECORD_INDEX_CHUNK = 5000
+
+def _migrate_record_indices(cur):
+    """舊版 DB 沒有 idx 欄：補上欄位並清掉回填標記，讓 engine 依字詞庫重新回填。"""
+    added = False
+    for table in RECORD_TABLES:
+        cols = [row[1] for row in cur.execute(f"PRAGMA table_info({table});")]
+        if "idx" not in cols:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN idx INTEGER;")
+            added = True
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {table}_idx ON {table}(idx);")
+    if added:
+        cur.execute("DELETE FROM config WHERE key = 'record_index_words';")
+
+def db_reindex_records(name_to_index):
+    """以 name_to_index(name) 重新計算三張紀錄表的 idx（字詞庫變動或舊 DB 遷移時），回傳更新筆數。"""
+    updated = 0
+    with db_connect() as conn:
+        read = conn.cursor()
+        cur = conn.cursor()
+        cur.execute("BEGIN;")
+        try:
+            for table in RECORD_TABLES:
+                read.execute(f"SELECT id, name, idx FROM {table};")
+                while True:
+                    rows = read.fetchmany(RECORD_INDEX_CHUNK)
+                    if not rows:
+                        break
+                    changes = []
+                    for rid, name, old in rows:
+                        idx = name_to_index(name)
+                        if idx != old:
+                            changes.append((idx, rid))
+                    cur.executemany(f"UPDATE {table} SET idx = ? WHERE id = ?;", changes)
+                    updated += len(changes)
+            cur.execute("COMMIT;")
+        except Exception:
+            cur.execute("ROLLBACK;")
+            raise
+    return updated
+
+# ----------------- 每字使用次數 (char_usage) -----------------
+# 所有寫入/刪除 history 的函式都在同一交易內更新 char_usage（抽取、手動使用、撤銷、重置），
+# 統計視窗只需讀 N 列。批次抽取先在 Python 彙總，每個字只 upsert 一次
+# （觸發器逐列執行，批次寫入會慢約三倍）。
+# 名字每個位置各算一次（「安安」的「安」算兩次），最多看前 CHAR_USAGE_POSITIONS 個字。
+CHAR_USAGE_POSITIONS = 4
+CHAR_USAGE_UPSERT = "INSERT INTO char_usage(ch, count) VALUES (?, ?) ON CONFLICT(ch) DO UPDATE SET count = count + excluded.count;"
+
+def _create_char_usage(cur):
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'char_usage';")
+    exists = cur.fetchone() is not None
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS char_usage (
+            ch TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID;
+    """)
+    if not exists:
+        # 舊版 DB：依現有歷史一次回填
+        parts = " UNION ALL ".join(
+            f"SELECT substr(name, {pos}, 1) AS ch FROM history WHERE length(name) >= {pos}"
+            for pos in range(1, CHAR_USAGE_POSITIONS + 1))
+        cur.execute(f"INSERT INTO char_usage(ch, count) SELECT ch, COUNT(*) FROM ({parts}) GROUP BY ch;")
+
+def _char_usage_deltas(names, sign=1):
+    counts = {}
+    for name in names:
+        for ch in (name or "")[:CHAR_USAGE_POSITIONS]:
+            counts[ch] = counts.get(ch, 0) + sign
+    return list(counts.items())
+
+def db_get_char_usage():
+    """回傳 {字: 被抽取次數}（只含次數大於 0 的字）。"""
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT ch, count FROM char_usage WHERE count > 0;")
+        return dict(cur.fetchall())
+
+def db_clear_history():
+    """清空歷史與每字統計（重置用）。"""
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN;")
+        cur.execute("DELETE FROM char_usage;")
+        cur.execute("DELETE FROM history;")
+        cur.execute("COMMIT;")
+
+def _db_record_indices(table, lo, hi):
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT DISTINCT idx - ?1 FROM {table} WHERE idx >= ?1 AND idx < ?2;", (lo, hi))
+        return [row[0] for row in cur.fetchall()]
+
+def db_get_drawn_indices(lo, hi):
+    """歷史中出現過、編號在 [lo, hi) 的組合索引減去 lo（走 history_idx 索引的範圍掃描，不讀名字與時間）。"""
+    return _db_record_indices("history", lo, hi)
+
+def db_get_excluded_indices(lo, hi):
+    return _db_record_indices("excluded", lo, hi)
+
+def db_index_status(idx):
+    """一次查詢某組合是否已抽取 / 已收藏 / 已排除，回傳 (drawn, favorite, excluded) 三個 bool。"""
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT EXISTS(SELECT 1 FROM history WHERE idx = ?1),
+                   EXISTS(SELECT 1 FROM favorites WHERE idx = ?1),
+                   EXISTS(SELECT 1 FROM excluded WHERE idx = ?1);
+        """, (idx,))
+        return tuple(bool(v) for v in cur.fetchone())
+
+def db_replace_remaining(indices):
+    """以 indices 取代整個抽取池快照（重置時呼叫）：同時清掉 journal 與置換抽取池的位圖，不留下舊狀態。"""
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN;")
+        cur.execute("DELETE FROM remaining_indices;")
+        cur.executemany("INSERT INTO remaining_indices(idx) VALUES (?);", ((i,) for i in indices))
+        cur.execute("DELETE FROM pool_journal;")
+        cur.execute("DELETE FROM pool_bitmap;")
+        cur.execute("COMMIT;")
+
+# 抽取池 journal：每次抽取/排除/恢復/撤銷只追加一列，定期壓縮回快照
+JOURNAL_REMOVE_OPS = ("draw", "reject", "exclude")
+JOURNAL_INSERT_OPS = ("restore", "undo")
+
+def db_append_journal(op, idx):
+    _db_write([("INSERT INTO pool_journal(op, idx) VALUES (?, ?);", [(op, idx)])])
+
+def db_get_journal():
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT op, idx FROM pool_journal ORDER BY id ASC;")
+        return cur.fetchall()
+
+def db_compact_remaining_journal():
+    """把 journal 的淨變動套用到 remaining_indices 後清空 journal（成本與 journal 長度成正比）。"""
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN;")
+        cur.execute("SELECT op, idx FROM pool_journal ORDER BY id ASC;")
+        net = {}
+        for op, idx in cur.fetchall():
+            net[idx] = op in JOURNAL_INSERT_OPS
+        cur.executemany("DELETE FROM remaining_indices WHERE idx = ?;", ((i,) for i, present in net.items() if not present))
+        cur.executemany("INSERT OR IGNORE INTO remaining_indices(idx) VALUES (?);", ((i,) for i, present in net.items() if present))
+        cur.execute("DELETE FROM pool_journal;")
+        cur.execute("COMMIT;")
+
+def db_get_remaining():
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT idx FROM remaining_indices;")
+        rows = cur.fetchall()
+        return [r[0] for r in rows]
+
+def db_save_permutation_pool(pool, full=False):
+    """寫回置換抽取池：只寫有變動的位圖區塊（full=True 時全部重寫），並更新 pool_state。"""
+    state = dict(pool.state(), mode="permutation")
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN;")
+        if full:
+            cur.execute("DELETE FROM pool_bitmap;")
+            chunks = range(pool.chunk_count())
+        else:
+            chunks = sorted(pool.dirty_chunks)
+        for chunk in chunks:
+            data = pool.chunk_bytes(chunk)
+            if data is not None:
+                cur.execute("INSERT OR REPLACE INTO pool_bitmap(chunk, bits) VALUES (?, ?);", (chunk, data))
+            elif not full:
+                cur.execute("DELETE FROM pool_bitmap WHERE chunk = ?;", (chunk,))
+        cur.execute("INSERT INTO config(key, value) VALUES ('pool_state', ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value;", (json.dumps(state),))
+        # 位圖快照已包含 journal 內的所有變動
+        cur.execute("DELETE FROM pool_journal;")
+        cur.execute("COMMIT;")
+    pool.dirty_chunks.clear()
+
+def db_load_permutation_pool(state):
+    if state.get("sparse"):
+        with db_connect() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT chunk, bits FROM pool_bitmap;")
+            buckets = dict(cur.fetchall())
+        return SparsePermutationPool(state["size"], seed=state["seed"], cursor=state.get("cursor", 0),
+                                     buckets=buckets, returned=state.get("returned"), removed=state.get("removed"))
+    bitmap = bytearray((state["size"] + 7) // 8)
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT chunk, bits FROM pool_bitmap;")
+        for chunk, bits in cur:
+            start = chunk * BITMAP_CHUNK_BYTES
+            bitmap[start:start + len(bits)] = bits
+    return PermutationPool(state["size"], seed=state["seed"], cursor=state.get("cursor", 0),
+                           bitmap=bitmap, returned=state.get("returned"), removed=state.get("removed"))
+
+# 拼音快取：key 為單字或整個名字，tones 為 TONE3 聲調數字串（例如 "21"）
+def db_get_phonetic_cache():
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT key, pinyin, tones, zhuyin FROM phonetic_cache;")
+        return cur.fetchall()
+
+def db_put_phonetics(rows):
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN;")
+        cur.executemany("INSERT OR REPLACE INTO phonetic_cache(key, pinyin, tones, zhuyin) VALUES (?, ?, ?, ?);", rows)
+        cur.execute("COMMIT;")
+
+def db_insert_history(timestamp, name, tones_text=None, idx=None):
+    _db_write([("INSERT INTO history(timestamp, name, tones, idx) VALUES (?, ?, ?, ?);", [(timestamp, name, tones_text, idx)]),
+               (CHAR_USAGE_UPSERT, _char_usage_deltas([name]))])
+
+def db_count_history():
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM history;")
+        return cur.fetchone()[0]
+
+def db_iter_history(chunk=5000):
+    """依 id 順序逐批產生歷史列 [(timestamp, name, tones), ...]（fetchmany，不一次載入整張表）。"""
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT timestamp, name, tones FROM history ORDER BY id ASC;")
+        while True:
+            rows = cur.fetchmany(chunk)
+            if not rows:
+                break
+            yield rows
+
+# ----------------- 歷史分頁（keyset） -----------------
+# 以 id 為游標（WHERE id < 上一頁最後一個 id），每頁的成本與翻到第幾頁無關，不使用 OFFSET。
+HISTORY_PAGE_SIZE = 200
+
+def db_history_page(before_id=None, limit=HISTORY_PAGE_SIZE, idx=None, name_like=None):
+    """
+    由新到舊回傳一頁歷史 [(id, timestamp, name, tones), ...]。
+    idx：只取該組合（走 history_idx 索引）；name_like：名字包含此字串（SQL LIKE）。
+    """
+    conds = []
+    params = []
+    if before_id is not None:
+        conds.append("id < ?")
+        params.append(before_id)
+    if idx is not None:
+        conds.append("idx = ?")
+        params.append(idx)
+    elif name_like:
+        escaped = name_like.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        conds.append("name LIKE ? ESCAPE '\\'")
+        params.append(f"%{escaped}%")
+    q = "SELECT id, timestamp, name, tones FROM history"
+    if conds:
+        q += " WHERE " + " AND ".join(conds)
+    q += " ORDER BY id DESC LIMIT ?;"
+    params.append(limit)
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute(q, params)
+        return cur.fetchall()
+
+def db_history_id_at(timestamp):
+    """
+    最後一筆 timestamp <= 指定時間的 id；沒有則回傳 None。
+    id 與抽取時間同向遞增，因此以 rowid 二分搜尋（約 log2(N) 次主鍵查詢），不需要 timestamp 索引。
+    """
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT (SELECT MIN(id) FROM history), (SELECT MAX(id) FROM history);")
+        lo, hi = cur.fetchone()
+        if lo is None:
+            return None
+        found = None
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            cur.execute("SELECT id, timestamp FROM history WHERE id >= ? ORDER BY id LIMIT 1;", (mid,))
+            row = cur.fetchone()
+            if row is None or row[0] > hi or row[1] > timestamp:
+                hi = mid - 1
+            else:
+                found = row[0]
+                lo = row[0] + 1
+        return found
+
+def db_pop_last_history():
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id, timestamp, name, tones, idx FROM history ORDER BY id DESC LIMIT 1;")
+        row = cur.fetchone()
+        if not row:
+            return None
+        cur.execute("BEGIN;")
+        cur.execute("DELETE FROM history WHERE id = ?;", (row[0],))
+        cur.executemany(CHAR_USAGE_UPSERT, _char_usage_deltas([row[2]], -1))
+        cur.execute("COMMIT;")
+        return row
+
+def db_insert_favorite(timestamp, name, idx=None):
+    _db_write([("INSERT INTO favorites(timestamp, name, idx) VALUES (?, ?, ?);", [(timestamp, name, idx)])])
+
+# ----------------- 收藏分頁 -----------------
+FAVORITES_PAGE_SIZE = 500
+
+def db_count_favorites():
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM favorites;")
+        return cur.fetchone()[0]
+
+def db_favorites_page(after_id=None, limit=FAVORITES_PAGE_SIZE):
+    """由舊到新回傳 id > after_id 的一頁收藏 [(id, timestamp, name), ...]。"""
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id, timestamp, name FROM favorites WHERE id > ? ORDER BY id ASC LIMIT ?;",
+                    (after_id if after_id is not None else -1, limit))
+        return cur.fetchall()
+
+def db_iter_favorites(chunk=5000):
+    after_id = None
+    while True:
+        rows = db_favorites_page(after_id, chunk)
+        if not rows:
+            break
+        yield rows
+        after_id = rows[-1][0]
+
+def db_delete_favorites(ids):
+    """以單一交易刪除多筆收藏。"""
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN;")
+        cur.executemany("DELETE FROM favorites WHERE id = ?;", [(i,) for i in ids])
+        cur.execute("COMMIT;")
+
+def db_insert_excluded(timestamp, name, idx=None):
+    _db_write([("INSERT INTO excluded(timestamp, name, idx) VALUES (?, ?, ?);", [(timestamp, name, idx)])])
+
+def db_get_excluded():
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id, timestamp, name FROM excluded ORDER BY id DESC;")
+        return cur.fetchall()
+
+def db_delete_excluded_by_id(excluded_id):
+    with db_connect() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM excluded WHERE id = ?;", (excluded_id,))
+
+def db_config_get(key, default=None):
+    # config 不經寫入佇列，讀寫都不必等佇列 flush
+    with db_connect(flush=False) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT value FROM config WHERE key = ?;", (key,))
+        row = cur.fetchone()
+        return row[0] if row else default
+
+def db_config_set(key, value):
+    with db_connect(flush=False) as conn:
+        cur = conn.cursor()
+        cur.execute("INSERT INTO config(key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value;", (key, value))
+
+def _use_storage_profile(name):
+    global STORAGE_PROFILE, _PROFILE_VERSION
+    if name != STORAGE_PROFILE:
+        STORAGE_PROFILE = name
+        _PROFILE_VERSION += 1
+
+def load_storage_profile():
+    """讀取 config 的 storage_profile 並套用到之後使用的每條連線（init_db 會呼叫）。"""
+    name = db_config_get("storage_profile", DEFAULT_STORAGE_PROFILE)
+    _use_storage_profile(name if name in STORAGE_PROFILES else DEFAULT_STORAGE_PROFILE)
+    return STORAGE_PROFILE
+
+def set_storage_profile(name):
+    if name not in STORAGE_PROFILES:
+        raise ValueError(f"未知的儲存設定檔：{name}（可用：{', '.join(STORAGE_PROFILES)}）")
+    db_config_set("storage_profile", name)
+    _use_storage_profile(name)
+
+def db_commit_draws(journal_rows, history_rows):
+    """以單一交易寫入一批 journal 與歷史紀錄 (timestamp, name, tones, idx)（executemany；寫入佇列啟用時由背景執行緒提交）。"""
+    history_rows = list(history_rows)
+    _db_write([("INSERT INTO pool_journal(op, idx) VALUES (?, ?);", list(journal_rows)),
+               ("INSERT INTO history(timestamp, name, tones, idx) VALUES (?, ?, ?, ?);", history_rows),
+               (CHAR_USAGE_UPSERT, _char_usage_deltas(row[1] for row in history_rows))])
@@ -0,0 +1,1129 @@
+# namegen/engine.py
+# 抽取引擎：字詞庫、字屬性、每字聲調表、評分矩陣、高分索引、加權抽取與抽取池的重置/載入/抽取。
+# 不依賴 tkinter；錯誤以例外回報，由 GUI / CLI 決定如何呈現。NumPy 與 pypinyin 都在第一次使用時才載入。
+
+import random
+import json
+import hashlib
+import heapq
+import itertools
+import math
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from array import array
+
+from namegen import db, phonetics
+from namegen.pools import IndexPool, PermutationPool, SparsePermutationPool, TopKIndex, FenwickTree
+from namegen.db import (
+    init_db, db_connect, db_replace_remaining, db_append_journal, db_get_journal,
+    db_compact_remaining_journal, db_get_remaining, db_save_permutation_pool, db_load_permutation_pool,
+    db_config_get, db_config_set, db_commit_draws, db_get_phonetic_cache, db_put_phonetics,
+    db_reindex_records, db_get_drawn_indices, db_get_excluded_indices, db_get_char_usage, db_clear_history,
+    JOURNAL_INSERT_OPS,
+)
+from namegen.filters import get_filter_rules, TONE_ACCEPT, TONE_REJECT, TONE_PROBABILISTIC
+
+# --- NumPy 可選（評分矩陣、重置時向量化預過濾）；第一次需要時才 import ---
+np = None
+NUMPY_ENABLED = None  # None：尚未嘗試載入
+
+def numpy_enabled():
+    global np, NUMPY_ENABLED
+    if NUMPY_ENABLED is None:
+        try:
+            import numpy
+            np = numpy
+            NUMPY_ENABLED = True
+        except Exception:
+            NUMPY_ENABLED = False
+    return NUMPY_ENABLED
+
+# ----------------- 配置 -----------------
+WORDS_FILE = 'words_list.txt'
+DATA_DIR = 'name_generator_data'
+STATE_FILE = None
+HISTORY_FILE = None
+FAVORITES_FILE = None
+STATUS_FILE = None
+DB_FILE = None
+CHAR_ATTR_FILE = None
+
+MASTER_WORDS = []
+POOL_SIZE = 0
+WORD_COUNT = 0
+NAME_INDICES_CACHE = IndexPool(0)
+POOL_GENERATION = 0  # NAME_INDICES_CACHE 每次被替換就加 1（衍生快取以它判斷抽取池是否已換掉）
+WORD_TO_INDEX = {}
+# 名字長度（不含姓氏）1..4：組合以混合進位制編號，第 p 個字的基數為 NAME_RADICES[p]（目前每個位置都是整個字詞庫），
+# 長度 L 的抽取池為 [0, N^L)，三字以上的大池子照常由 PermutationPool 惰性抽取。
+# 紀錄表（history 等）的 idx 另外加上 record_index_offset(L)，不同長度的名字不會撞號。
+NAME_LENGTH = 2
+NAME_LENGTH_MIN = 1
+NAME_LENGTH_MAX = 4
+NAME_RADICES = ()
+RECORD_INDEX_SCHEME = "mixed-radix-1"
+# 組合數超過此值時不建立評分矩陣與預過濾遮罩（Top-K、加權抽取不可用），抽取時仍逐一套用聲調過濾
+SCORE_MATRIX_MAX = 20_000_000
+# 姓氏：抽取池與歷史只記錄名字（不含姓），評分與聲調過濾則以「姓 + 名」的完整讀音計算。
+# SURNAMES 為姓氏清單（config 'surnames'），SURNAME 為目前使用的姓（config 'surname'，空字串表示不加姓）。
+SURNAME = ""
+SURNAMES = []
+SURNAME_MAX_LENGTH = 2
+# 各姓氏評分表的快取上限（位元組）；清單內的姓氏預先建好，切換時直接取用，不重新評分
+SCORE_TABLE_CACHE_BYTES = 256 << 20
+# 組合數超過此值時改用惰性置換抽取池（不實體化 list(range(POOL_SIZE))）
+LAZY_POOL_THRESHOLD = 1_000_000
+# 置換抽取池的位圖（POOL_SIZE/8 bytes）超過此大小時改用 SparsePermutationPool，不做重置時的預過濾
+# （預設約 5.4 億組合：2 萬字的二字名、800 字的三字名以內都還是位圖）
+DENSE_BITMAP_MAX_BYTES = 64 << 20
+# 批量抽取上限（draw_many 以單一交易寫入，十萬筆以上也只需數秒）
+BATCH_DRAW_MAX = 1_000_000
+# 抽取池 journal 累積超過此筆數時壓縮成快照
+JOURNAL_COMPACT_EVERY = 2000
+JOURNAL_PENDING = 0
+
+# ----------------- 工具 -----------------
+def atomic_write(path, data, mode='w', encoding='utf-8'):
+    tmp = f"{path}.tmp"
+    with open(tmp, mode, encoding=encoding) as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def atomic_write_json(path, obj):
+    atomic_write(path, json.dumps(obj, ensure_ascii=False, indent=2))
+
+# 字詞屬性 (char attributes)
+CHAR_ATTRS = {}  # char -> {strokes:int, wuxing:str, weight:int, meaning:str}
+
+def load_char_attributes():
+    """從 CHAR_ATTR_FILE 載入字屬性；若不存在則建立範例檔案。"""
+    global CHAR_ATTRS
+    invalidate_score_cache()
+    if CHAR_ATTR_FILE is None:
+        return
+    if not os.path.exists(CHAR_ATTR_FILE):
+        # create a sample attribute set for the existing MASTER_WORDS if possible
+        sample = {}
+        for ch in MASTER_WORDS[:20]:
+            sample[ch] = {"strokes": random.randint(5,15), "wuxing": random.choice(["木","火","土","金","水"]), "weight": 1, "meaning": ""}
+        try:
+            atomic_write_json(CHAR_ATTR_FILE, sample)
+        except Exception:
+            pass
+        CHAR_ATTRS = sample
+        return
+    try:
+        with open(CHAR_ATTR_FILE, 'r', encoding='utf-8') as f:
+            CHAR_ATTRS = json.load(f)
+    except Exception:
+        CHAR_ATTRS = {}
+
+def save_char_attributes():
+    if CHAR_ATTR_FILE:
+        try:
+            atomic_write_json(CHAR_ATTR_FILE, CHAR_ATTRS)
+        except Exception:
+            pass
+
+# ----------------- 每字拼音/聲調/注音表 -----------------
+# 以 WORD_TO_INDEX 為索引；抽取與評分的熱路徑只查表，不呼叫 pypinyin。
+# 第一次需要時（或 GUI 出現後的背景預熱）才由 ensure_phonetic_table() 建立，字詞庫重新載入後自動重建。
+# 每字結果存在 DB 的 phonetic_cache，字詞庫沒有新字時整個 session 都不必 import pypinyin。
+# 注意：逐字查詢不含詞組語境，多音字取 pypinyin 的預設讀音。
+CHAR_TONES = array('b')
+CHAR_PINYIN = []
+CHAR_ZHUYIN = []
+_PHONETIC_WORDS = None  # 目前表格所對應的 MASTER_WORDS（以物件身分比較）
+_PHONETIC_LOCK = threading.Lock()
+_PHONETIC_CACHE = {}    # 單字或名字 -> (顯示拼音, 聲調 tuple, 注音)
+_PHONETIC_CACHE_DB = None
+
+def load_phonetic_cache():
+    """把 phonetic_cache 表讀進記憶體（每個 DB 檔只讀一次）。"""
+    global _PHONETIC_CACHE, _PHONETIC_CACHE_DB
+    if _PHONETIC_CACHE_DB != db.DB_FILE:
+        try:
+            rows = db_get_phonetic_cache()
+        except Exception:
+            rows = []
+        _PHONETIC_CACHE = {key: (pinyin, tuple(int(t) for t in tones), zhuyin) for key, pinyin, tones, zhuyin in rows}
+        _PHONETIC_CACHE_DB = db.DB_FILE
+    return _PHONETIC_CACHE
+
+def _compute_phonetics(text):
+    display, tones = phonetics.get_pinyin_with_tone(text)
+    return display, tuple(tones), phonetics.get_zhuyin(text) or ""
+
+def _phonetic_row(text, entry):
+    return (text, entry[0], "".join(str(t) for t in entry[1]), entry[2])
+
+def cached_phonetics(text):
+    """回傳 (顯示拼音, 聲調 tuple, 注音)；快取沒有時才呼叫 pypinyin，並寫回 DB。"""
+    cache = load_phonetic_cache()
+    entry = cache.get(text)
+    if entry is None:
+        entry = _compute_phonetics(text)
+        cache[text] = entry
+        try:
+            db_put_phonetics([_phonetic_row(text, entry)])
+        except Exception:
+            pass
+    return entry
+
+def build_phonetic_table():
+    global CHAR_TONES, CHAR_PINYIN, CHAR_ZHUYIN, _PHONETIC_WORDS
+    words = MASTER_WORDS
+    tones = array('b')
+    pinyins = []
+    zhuyins = []
+    if phonetics.PINYIN_ENABLED:
+        cache = load_phonetic_cache()
+        # 字詞庫有新字時一次補齊，並以單一交易寫回快取
+        new_rows = []
+        for ch in dict.fromkeys(words):
+            if ch in cache:
+                continue
+            try:
+                cache[ch] = _compute_phonetics(ch)
+                new_rows.append(_phonetic_row(ch, cache[ch]))
+            except Exception:
+                pass
+        if new_rows:
+            try:
+                db_put_phonetics(new_rows)
+            except Exception:
+                pass
+        for ch in words:
+            display, char_tones, zhuyin = cache.get(ch, ("", (), ""))
+            tones.append(char_tones[0] if char_tones else 5)
+            pinyins.append(display)
+            zhuyins.append(zhuyin)
+    CHAR_TONES, CHAR_PINYIN, CHAR_ZHUYIN = tones, pinyins, zhuyins
+    _PHONETIC_WORDS = words
+    _SURNAME_FILTERS.clear()
+    _SURNAME_PHONETICS.clear()
+
+def ensure_phonetic_table():
+    """聲調表尚未對應目前字詞庫時建立；可在背景執行緒預先呼叫。"""
+    if _PHONETIC_WORDS is not MASTER_WORDS:
+        with _PHONETIC_LOCK:
+            if _PHONETIC_WORDS is not MASTER_WORDS:
+                build_phonetic_table()
+
+def _split_surname(name):
+    """name 以目前的姓開頭（full_name 的結果）時回傳 (姓氏每字的讀音, 名字部分)，否則 ((), name)。"""
+    if SURNAME and len(name) > len(SURNAME) and name.startswith(SURNAME):
+        return surname_phonetics(SURNAME), name[len(SURNAME):]
+    return (), name
+
+def get_name_phonetics(name):
+    """
+    回傳 (顯示拼音, 聲調 tuple)；名字（可含目前的姓）的字都在字詞庫時只查表，姓氏讀音取自 surname_phonetics，
+    否則查拼音快取（必要時呼叫 pypinyin）。
+    """
+    ensure_phonetic_table()
+    head, given = _split_surname(name)
+    try:
+        ids = [WORD_TO_INDEX[ch] for ch in given]
+        return (" ".join([e[0] for e in head] + [CHAR_PINYIN[i] for i in ids]),
+                tuple(e[1] for e in head) + tuple(CHAR_TONES[i] for i in ids))
+    except (KeyError, IndexError):
+        display, tones, _ = cached_phonetics(name)
+        return display, tones
+
+def get_name_zhuyin(name):
+    """回傳注音；查表方式同 get_name_phonetics，否則查拼音快取（pypinyin 不可用時回傳空字串）。"""
+    ensure_phonetic_table()
+    head, given = _split_surname(name)
+    try:
+        return " ".join([e[2] for e in head] + [CHAR_ZHUYIN[WORD_TO_INDEX[ch]] for ch in given])
+    except (KeyError, IndexError):
+        if not name or not phonetics.PINYIN_ENABLED:
+            return ""
+        try:
+            return cached_phonetics(name)[2]
+        except Exception:
+            return ""
+
+# ----------------- 姓氏 -----------------
+_SURNAME_FILTERS = {}  # (姓氏, 過濾設定版本) -> 姓氏末字與名字第一字的處理方式表
+_SURNAME_PHONETICS = {}  # 姓氏 -> 每字的 (顯示拼音, 聲調, 注音)
+
+def _validate_surname(surname):
+    surname = (surname or "").strip()
+    if len(surname) > SURNAME_MAX_LENGTH or any(ch.isspace() or ch in ',，#' for ch in surname):
+        raise ValueError(f"姓氏必須是 1 到 {SURNAME_MAX_LENGTH} 個字。")
+    return surname
+
+def load_surnames():
+    """讀取 config 的姓氏清單與目前的姓。"""
+    global SURNAME, SURNAMES
+    try:
+        names = json.loads(db_config_get("surnames", "[]") or "[]")
+    except Exception:
+        names = []
+    SURNAMES = [s for s in names if isinstance(s, str) and 0 < len(s) <= SURNAME_MAX_LENGTH]
+    current = db_config_get("surname", "") or ""
+    SURNAME = current if current in SURNAMES else ""
+
+def set_surnames(surnames):
+    """設定姓氏清單（去除重複、保留順序）；目前的姓不在新清單中時改為不加姓。姓氏不合法時丟出 ValueError。"""
+    global SURNAMES
+    cleaned = []
+    for surname in surnames:
+        surname = _validate_surname(surname)
+        if surname and surname not in cleaned:
+            cleaned.append(surname)
+    SURNAMES = cleaned
+    db_config_set("surnames", json.dumps(cleaned, ensure_ascii=False))
+    if SURNAME not in cleaned:
+        set_surname("")
+
+def set_surname(surname):
+    """
+    切換目前的姓（空字串表示不加姓），新的姓會加入清單。抽取池不重建：所有姓共用同一個抽取池，
+    姓氏末字與第一字的聲調拒絕只在抽取時由 get_surname_filter() 判斷，不會把名字移出抽取池。
+    """
+    global SURNAME
+    surname = _validate_surname(surname)
+    if surname and surname not in SURNAMES:
+        set_surnames(SURNAMES + [surname])
+    SURNAME = surname
+    db_config_set("surname", surname)
+    if surname and _PHONETIC_WORDS is MASTER_WORDS:
+        # 聲調表已建立時順便備好姓氏讀音，之後每次顯示全名只查表
+        surname_phonetics(surname)
+
+def full_name(name):
+    """名字加上目前的姓（顯示、複製、發音用）。"""
+    return SURNAME + name if name else name
+
+def surname_phonetics(surname):
+    """
+    姓氏每字的 (顯示拼音, 聲調, 注音)，依姓氏快取。與聲調表相同逐字取預設讀音：字詞庫中的字查表，
+    其餘逐字查拼音快取（每字只查一次）；無法取得時聲調為 5。
+    """
+    entries = _SURNAME_PHONETICS.get(surname)
+    if entries is None:
+        ensure_phonetic_table()
+        entries = []
+        for ch in surname:
+            i = WORD_TO_INDEX.get(ch)
+            if i is not None and i < len(CHAR_TONES):
+                entries.append((CHAR_PINYIN[i], CHAR_TONES[i], CHAR_ZHUYIN[i]))
+                continue
+            try:
+                display, char_tones, zhuyin = cached_phonetics(ch) if phonetics.PINYIN_ENABLED else ("", (), "")
+            except Exception:
+                display, char_tones, zhuyin = "", (), ""
+            entries.append((display, char_tones[0] if char_tones else 5, zhuyin))
+        entries = _SURNAME_PHONETICS[surname] = tuple(entries)
+    return entries
+
+def surname_tones(surname):
+    """姓氏每字的聲調（見 surname_phonetics）。"""
+    return tuple(entry[1] for entry in surname_phonetics(surname))
+
+def get_surname_filter(surname=None):
+    """
+    姓氏末字與名字第一字的聲調處理方式（長度 N 的 bytearray，值為 TONE_*，以第一字索引查表）；
+    不加姓或無聲調資料時回傳 None。依姓氏與過濾設定版本快取（抽取與評分用）。
+    """
+    surname = SURNAME if surname is None else surname
+    if not surname or not phonetics.PINYIN_ENABLED:
+        return None
+    ensure_phonetic_table()
+    if len(CHAR_TONES) != WORD_COUNT:
+        return None
+    rules = get_filter_rules()
+    key = (surname, rules.version)
+    table = _SURNAME_FILTERS.get(key)
+    if table is None:
+        table = rules.lead_actions(surname_tones(surname)[-1], CHAR_TONES)
+        _SURNAME_FILTERS[key] = table
+    return table
+
+# ----------------- 評分系統 -----------------
+def score_name(name, surname=None):
+    """
+    簡單評分範例（可擴充），以「姓 + 名」計分（surname 省略時為目前的 SURNAME）：
+    - 權重（weight）
+    - 筆劃平衡
+    - 五行配對
+    - 聲調影響（若能取得）
+    """
+    # 多字名字：權重逐字加總，筆劃/五行/聲調逐一比較相鄰兩字（姓氏末字與名字第一字也算一組）
+    surname = SURNAME if surname is None else surname
+    full = surname + name
+    base = 0.0
+    attrs = [CHAR_ATTRS.get(ch, {}) for ch in full]
+    weights = [at.get("weight", 1) for at in attrs]
+    base += sum(weights) * 1.0
+
+    for x, y in zip(attrs, attrs[1:]):
+        # strokes
+        sa = x.get("strokes")
+        sb = y.get("strokes")
+        if sa is not None and sb is not None:
+            diff = abs(sa - sb)
+            base += max(0, 3 - diff) * 0.6
+
+        # wuxing
+        wa_x = x.get("wuxing")
+        wb_x = y.get("wuxing")
+        if wa_x and wb_x:
+            if wa_x == wb_x:
+                base -= 0.5
+            else:
+                base += 0.4
+
+    # pinyin/tones
+    if phonetics.PINYIN_ENABLED and len(full) >= 2:
+        try:
+            _, tones = get_name_phonetics(name)
+            tones = surname_tones(surname) + tuple(tones)
+            if len(tones) >= 2:
+                base += get_filter_rules().sequence_tone_score(tones)
+            else:
+                base -= 0.2
+        except Exception:
+            pass
+
+    base += max(0, 1.5 - (sum(weights) / max(len(weights), 1))) * 0.7
+
+    return base
+
+# ----------------- 全組合評分矩陣 -----------------
+# 與 score_name 相同的公式，但以每字屬性陣列一次算出整個 N^L 池的分數（攤平成 POOL_SIZE 長度），
+# 快取到 CHAR_ATTRS 或過濾設定變動為止。有 NumPy 時以 broadcasting 分塊計算，否則以純 Python 迴圈。
+# 每個姓氏各有一張表，存在 _SCORE_TABLES（LRU，上限 SCORE_TABLE_CACHE_BYTES）；_SCORE_CACHE 為目前姓氏的那張。
+CHAR_ATTRS_VERSION = 0
+_SCORE_CACHE = {"key": None, "scores": None}
+_SCORE_TABLES = OrderedDict()
+_SCORE_LOCK = threading.Lock()
+SCORE_BLOCK_CELLS = 1 << 20
+
+def invalidate_score_cache():
+    """CHAR_ATTRS 被修改後呼叫，讓評分矩陣在下次使用時重算。"""
+    global CHAR_ATTRS_VERSION
+    CHAR_ATTRS_VERSION += 1
+    _SCORE_CACHE["key"] = None
+    _SCORE_CACHE["scores"] = None
+    _SCORE_TABLES.clear()
+
+def _char_attr_arrays(chars):
+    """回傳 chars 每字 (權重, 筆劃, 五行代碼) 三個 list；缺筆劃為 nan，缺五行為 0。"""
+    weights, strokes, wuxing = [], [], []
+    codes = {}
+    for ch in chars:
+        attrs = CHAR_ATTRS.get(ch, {}) or {}
+        try:
+            weights.append(float(attrs.get("weight", 1)))
+        except (TypeError, ValueError):
+            weights.append(1.0)
+        st = attrs.get("strokes")
+        try:
+            strokes.append(float(st) if st is not None else math.nan)
+        except (TypeError, ValueError):
+            strokes.append(math.nan)
+        wx = attrs.get("wuxing")
+        wuxing.append(codes.setdefault(wx, len(codes) + 1) if wx else 0)
+    return weights, strokes, wuxing
+
+def _digit_grids(start, stop):
+    """混合進位制的各位數，以 broadcasting 形狀排列：第一位限 [start, stop)，其餘位完整。"""
+    length = NAME_LENGTH
+    grids = []
+    for p in range(length):
+        values = np.arange(start, stop) if p == 0 else np.arange(WORD_COUNT)
+        grids.append(values.reshape([-1 if q == p else 1 for q in range(length)]))
+    return grids
+
+def _score_matrix_numpy(rules, surname):
+    n = WORD_COUNT
+    length = NAME_LENGTH
+    # 姓氏各字接在屬性陣列尾端（索引 n..n+k-1），當作形狀 [1]*L 的固定位數參與 broadcasting
+    k = len(surname)
+    weights, strokes, wuxing = _char_attr_arrays(MASTER_WORDS + list(surname))
+    w = np.array(weights)
+    st = np.array(strokes)
+    wx = np.array(wuxing)
+    use_tones = phonetics.PINYIN_ENABLED and len(CHAR_TONES) == n
+    if use_tones:
+        tones = np.concatenate([np.frombuffer(CHAR_TONES, dtype=np.int8), np.array(surname_tones(surname), dtype=np.int8)])
+        tones = np.clip(tones, 0, 5).astype(np.intp)
+        tone_scores = np.array(rules.tone_scores).reshape(6, 6)
+    prefix = [np.full([1] * length, n + j, dtype=np.intp) for j in range(k)]
+    out = np.empty(POOL_SIZE, dtype=np.float32)
+    tail = n ** (length - 1)
+    rows = max(1, SCORE_BLOCK_CELLS // max(tail, 1))
+    for start in range(0, n, rows):
+        stop = min(n, start + rows)
+        d = prefix + _digit_grids(start, stop)
+        wsum = sum(w[x] for x in d)
+        score = np.broadcast_to(wsum, [stop - start] + [n] * (length - 1)).astype(np.float64)
+        for a, b in zip(d, d[1:]):
+            diff = np.abs(st[a] - st[b])
+            score += np.where(np.isnan(diff), 0.0, np.maximum(0.0, 3.0 - np.nan_to_num(diff)) * 0.6)
+            both = (wx[a] > 0) & (wx[b] > 0)
+            same = wx[a] == wx[b]
+            score += np.where(both, np.where(same, -0.5, 0.4), 0.0)
+            if use_tones:
+                score += tone_scores[tones[a], tones[b]]
+        score += np.maximum(0.0, 1.5 - wsum / (length + k)) * 0.7
+        out[start * tail:stop * tail] = score.ravel()
+    return out
+
+def _score_matrix_python(rules, surname):
+    n = WORD_COUNT
+    length = NAME_LENGTH
+    k = len(surname)
+    weights, strokes, wuxing = _char_attr_arrays(MASTER_WORDS + list(surname))
+    use_tones = phonetics.PINYIN_ENABLED and len(CHAR_TONES) == n
+    if use_tones:
+        tones = list(CHAR_TONES) + list(surname_tones(surname))
+    prefix = tuple(range(n, n + k))
+    out = array('f', bytes(4 * POOL_SIZE))
+    for idx, given in enumerate(itertools.product(range(n), repeat=length)):
+        digits = prefix + given
+        wsum = 0.0
+        for d in digits:
+            wsum += weights[d]
+        score = wsum
+        for a, b in zip(digits, digits[1:]):
+            sa, sb = strokes[a], strokes[b]
+            if sa == sa and sb == sb:
+                score += max(0, 3 - abs(sa - sb)) * 0.6
+            xa, xb = wuxing[a], wuxing[b]
+            if xa and xb:
+                score += -0.5 if xa == xb else 0.4
+            if use_tones:
+                score += rules.tone_score(tones[a], tones[b])
+        score += max(0, 1.5 - (wsum / (length + k))) * 0.7
+        out[idx] = score
+    return out
+
+def _score_key(rules, surname):
+    return (CHAR_ATTRS_VERSION, rules.version, WORD_COUNT, NAME_LENGTH, len(CHAR_TONES), numpy_enabled(), surname)
+
+def _score_table(key, rules, surname):
+    """取出（必要時建立）某姓氏的評分表；只保留目前設定下的表，超過 SCORE_TABLE_CACHE_BYTES 時丟掉最久未用的。"""
+    with _SCORE_LOCK:
+        for old in [old for old in _SCORE_TABLES if old[:-1] != key[:-1]]:
+            del _SCORE_TABLES[old]
+        scores = _SCORE_TABLES.pop(key, None)
+        if scores is None:
+            scores = _score_matrix_numpy(rules, surname) if numpy_enabled() else _score_matrix_python(rules, surname)
+        _SCORE_TABLES[key] = scores
+        while len(_SCORE_TABLES) > 1 and len(_SCORE_TABLES) * POOL_SIZE * 4 > SCORE_TABLE_CACHE_BYTES:
+            _SCORE_TABLES.popitem(last=False)
+        return scores
+
+def get_score_matrix():
+    """回傳目前姓氏攤平的 N^L 分數（NumPy float32 陣列或 array('f')），必要時重算；組合數超過 SCORE_MATRIX_MAX 時丟出 ValueError。"""
+    if POOL_SIZE > SCORE_MATRIX_MAX:
+        raise ValueError(f"組合數 {POOL_SIZE:,} 過多，無法建立評分表（上限 {SCORE_MATRIX_MAX:,}）。")
+    rules = get_filter_rules()
+    ensure_phonetic_table()
+    key = _score_key(rules, SURNAME)
+    if _SCORE_CACHE["key"] != key:
+        _SCORE_CACHE["scores"] = _score_table(key, rules, SURNAME)
+        _SCORE_CACHE["key"] = key
+    return _SCORE_CACHE["scores"]
+
+def precompute_surname_tables():
+    """
+    預先建立姓氏清單中各姓（與不加姓）的評分表與過濾表，之後切換姓氏只需取表（GUI 在背景預熱時呼叫）。
+    數量受 SCORE_TABLE_CACHE_BYTES 限制，目前的姓最後建立、優先保留；回傳新建立的評分表張數。
+    """
+    if POOL_SIZE == 0 or POOL_SIZE > SCORE_MATRIX_MAX:
+        return 0
+    rules = get_filter_rules()
+    ensure_phonetic_table()
+    budget = max(1, SCORE_TABLE_CACHE_BYTES // (POOL_SIZE * 4))
+    surnames = [s for s in dict.fromkeys([""] + SURNAMES) if s != SURNAME][:budget - 1] + [SURNAME]
+    built = 0
+    for surname in surnames:
+        key = _score_key(rules, surname)
+        if key not in _SCORE_TABLES:
+            _score_table(key, rules, surname)
+            built += 1
+        get_surname_filter(surname)
+    return built
+
+def top_remaining_candidates(n):
+    """回傳所有剩餘組合中分數最高的 n 個 [(score, idx)]，由高到低。"""
+    pool = NAME_INDICES_CACHE
+    if n <= 0 or not pool:
+        return []
+    scores = get_score_matrix()
+    if numpy_enabled():
+        if isinstance(pool, PermutationPool):
+            removed = np.unpackbits(np.frombuffer(bytes(pool.bitmap), dtype=np.uint8), bitorder='little')[:pool.size]
+            cand = np.flatnonzero(removed == 0)
+        else:
+            cand = np.frombuffer(pool.items, dtype=np.uint32).astype(np.intp)
+        sub = scores[cand]
+        k = min(n, len(cand))
+        part = np.argpartition(-sub, k - 1)[:k]
+        order = part[np.argsort(-sub[part], kind='stable')]
+        return [(float(sub[i]), int(cand[i])) for i in order]
+    if isinstance(pool, PermutationPool):
+        cand = (i for i in range(pool.size) if i in pool)
+    else:
+        cand = iter(pool)
+    return heapq.nlargest(n, ((scores[i], i) for i in cand))
+
+# 高分候選索引：建立時收錄前 TOPK_CAPACITY 名，之後隨抽取池變動增量維護，
+# 有效筆數低於 TOPK_SIZE 或分數/抽取池被替換時才重建。
+TOPK_SIZE = 50
+TOPK_CAPACITY = 200
+_TOPK = {"key": None, "index": None}
+
+def get_topk_index():
+    # 先更新評分快取（過濾設定、姓氏或字屬性變動後 key 才會跟著變）
+    get_score_matrix()
+    key = (POOL_GENERATION, _SCORE_CACHE["key"])
+    index = _TOPK["index"]
+    if _TOPK["key"] != key or index is None or index.needs_rebuild():
+        entries = top_remaining_candidates(TOPK_CAPACITY)
+        floor = entries[-1][0] if len(entries) >= TOPK_CAPACITY else float('-inf')
+        index = TopKIndex(TOPK_SIZE, entries, floor)
+        _TOPK["index"] = index
+        _TOPK["key"] = key
+    return index
+
+def _topk_on_change(op, idx):
+    """record_pool_change 的掛勾：已建立的高分索引跟著增減，不重算。"""
+    index = _TOPK["index"]
+    if index is None or _TOPK["key"] != (POOL_GENERATION, _SCORE_CACHE["key"]):
+        return
+    if op in JOURNAL_INSERT_OPS:
+        index.add(idx, float(_SCORE_CACHE["scores"][idx]))
+    else:
+        index.discard(idx)
+
+# ----------------- 加權抽取 -----------------
+# draw_mode = "weighted" 時，剩餘組合被抽中的機率正比於 exp(score / 溫度)；
+# 權重存在 FenwickTree，抽樣、移除、放回都是 O(log n)，抽取池變動時經 record_pool_change 同步。
+DRAW_MODE = "uniform"
+WEIGHTED_DRAW_TEMPERATURE = 1.0
+_WEIGHT_TREE = {"key": None, "tree": None, "offset": 0.0, "lead": None, "tail": 1}
+
+def load_draw_mode():
+    global DRAW_MODE, WEIGHTED_DRAW_TEMPERATURE
+    DRAW_MODE = "weighted" if db_config_get("draw_mode", "uniform") == "weighted" else "uniform"
+    try:
+        WEIGHTED_DRAW_TEMPERATURE = max(0.05, float(db_config_get("weighted_draw_temperature", "1.0")))
+    except (TypeError, ValueError):
+        WEIGHTED_DRAW_TEMPERATURE = 1.0
+
+def set_draw_mode(mode):
+    global DRAW_MODE
+    DRAW_MODE = "weighted" if mode == "weighted" else "uniform"
+    db_config_set("draw_mode", DRAW_MODE)
+
+def _weight_tree_key():
+    return (POOL_GENERATION, _SCORE_CACHE["key"], WEIGHTED_DRAW_TEMPERATURE)
+
+def get_weight_tree():
+    """
+    回傳剩餘組合的權重樹；分數、溫度或抽取池被替換時以 O(N) 重建。
+    第一字與目前的姓確定拒絕的組合權重為 0（仍留在抽取池，換姓後的權重樹才會抽到）。
+    """
+    scores = get_score_matrix()
+    key = _weight_tree_key()
+    if _WEIGHT_TREE["key"] != key:
+        pool = NAME_INDICES_CACHE
+        n = POOL_SIZE
+        lead = get_surname_filter()
+        tail = WORD_COUNT ** (NAME_LENGTH - 1)
+        if numpy_enabled():
+            offset = float(scores.max()) if n else 0.0
+            weights = np.exp((scores.astype(np.float64) - offset) / WEIGHTED_DRAW_TEMPERATURE)
+            if isinstance(pool, PermutationPool):
+                removed = np.unpackbits(np.frombuffer(bytes(pool.bitmap), dtype=np.uint8), bitorder='little')[:n]
+                weights[removed == 1] = 0.0
+            else:
+                present = np.zeros(n, dtype=bool)
+                present[np.frombuffer(pool.items, dtype=np.uint32).astype(np.intp)] = True
+                weights[~present] = 0.0
+            if lead is not None:
+                weights[np.repeat(np.frombuffer(bytes(lead), dtype=np.uint8) == TONE_REJECT, tail)] = 0.0
+            # Fenwick 節點 i 存 (i - lowbit(i), i] 的部分和，可由前綴和一次算出
+            prefix = np.concatenate(([0.0], np.cumsum(weights)))
+            pos = np.arange(1, n + 1)
+            tree = array('d', [0.0])
+            tree.frombytes((prefix[pos] - prefix[pos - (pos & -pos)]).tobytes())
+            fenwick = FenwickTree(n, tree)
+        else:
+            offset = max(scores) if n else 0.0
+            fenwick = FenwickTree.from_weights(
+                [math.exp((scores[i] - offset) / WEIGHTED_DRAW_TEMPERATURE)
+                 if i in pool and (lead is None or lead[i // tail] != TONE_REJECT) else 0.0 for i in range(n)])
+        _WEIGHT_TREE.update(key=key, tree=fenwick, offset=offset, lead=lead, tail=tail)
+    return _WEIGHT_TREE["tree"]
+
+def _weights_on_change(op, idx):
+    """record_pool_change 的掛勾：已建立的權重樹只調整單一權重。"""
+    tree = _WEIGHT_TREE["tree"]
+    if tree is None or _WEIGHT_TREE["key"] != _weight_tree_key():
+        return
+    lead = _WEIGHT_TREE["lead"]
+    if lead is not None and lead[idx // _WEIGHT_TREE["tail"]] == TONE_REJECT:
+        return
+    w = math.exp((float(_SCORE_CACHE["scores"][idx]) - _WEIGHT_TREE["offset"]) / WEIGHTED_DRAW_TEMPERATURE)
+    tree.add(idx, w if op in JOURNAL_INSERT_OPS else -w)
+
+def _next_draw_index():
+    """依目前抽取模式取出下一個索引（已從抽取池移除）。"""
+    if DRAW_MODE == "weighted":
+        try:
+            idx = get_weight_tree().sample(random.random())
+        except Exception:
+            idx = None
+        # 浮點誤差可能抽到已移除的位置，此時退回均勻抽取
+        if idx is not None and NAME_INDICES_CACHE.discard(idx):
+            return idx
+    return NAME_INDICES_CACHE.pop()
+
+# ----------------- name/index 與核心邏輯 -----------------
+def _apply_name_length(length):
+    global NAME_LENGTH, NAME_RADICES, POOL_SIZE
+    NAME_LENGTH = length
+    NAME_RADICES = (WORD_COUNT,) * length
+    POOL_SIZE = WORD_COUNT ** length
+
+def load_name_length():
+    """讀取 config 的 name_length（預設 2）並套用到 POOL_SIZE / 索引換算。"""
+    try:
+        length = int(db_config_get("name_length", "2"))
+    except (TypeError, ValueError):
+        length = 2
+    if not NAME_LENGTH_MIN <= length <= NAME_LENGTH_MAX:
+        length = 2
+    _apply_name_length(length)
+
+def set_name_length(length):
+    """
+    切換名字長度並重建該長度的抽取池：已抽（history）與已排除（excluded）的同長度名字不會再出現，
+    各長度互不影響。回傳預先過濾掉的組合數；長度不合法時丟出 ValueError。
+    """
+    if not NAME_LENGTH_MIN <= length <= NAME_LENGTH_MAX:
+        raise ValueError(f"名字長度必須是 {NAME_LENGTH_MIN} 到 {NAME_LENGTH_MAX} 個字。")
+    if length == NAME_LENGTH:
+        return 0
+    save_indices_cache()
+    db_config_set("name_length", str(length))
+    _apply_name_length(length)
+    return initialize_database(reset_history=False, exclude_drawn=True, keep_exclusions=True)
+
+def index_to_digits(idx):
+    """抽取池索引 → 每個位置的字索引（混合進位制，第一個字為最高位）。"""
+    digits = []
+    for radix in reversed(NAME_RADICES):
+        idx, d = divmod(idx, radix)
+        digits.append(d)
+    digits.reverse()
+    return digits
+
+def index_to_name(idx):
+    return "".join(MASTER_WORDS[d] for d in index_to_digits(idx))
+
+def name_to_index(name):
+    """目前長度的名字 → 抽取池索引；長度不符或有字不在字詞庫時回傳 None。"""
+    if not name or len(name) != NAME_LENGTH:
+        return None
+    idx = 0
+    for ch, radix in zip(name, NAME_RADICES):
+        d = WORD_TO_INDEX.get(ch)
+        if d is None:
+            return None
+        idx = idx * radix + d
+    return idx
+
+def record_index_offset(length):
+    """長度 length 的名字在紀錄表 idx 欄的起始編號（較短長度的組合數總和）。"""
+    return sum(WORD_COUNT ** l for l in range(1, length))
+
+def name_to_record_index(name):
+    """任一長度（1..NAME_LENGTH_MAX）的名字在紀錄表 idx 欄的編號；有字不在字詞庫時回傳 None。"""
+    if not name or len(name) > NAME_LENGTH_MAX:
+        return None
+    idx = 0
+    for ch in name:
+        d = WORD_TO_INDEX.get(ch)
+        if d is None:
+            return None
+        idx = idx * WORD_COUNT + d
+    return record_index_offset(len(name)) + idx
+
+def record_index_to_index(record_idx):
+    """紀錄表的 idx → 目前長度的抽取池索引；屬於其他長度時回傳 None。"""
+    if record_idx is None:
+        return None
+    idx = record_idx - record_index_offset(NAME_LENGTH)
+    return idx if 0 <= idx < POOL_SIZE else None
+
+def get_drawn_indices_from_history():
+    """歷史中已抽過的目前長度組合索引（history.idx 的範圍查詢，見 sync_record_indices）。"""
+    offset = record_index_offset(NAME_LENGTH)
+    return set(db_get_drawn_indices(offset, offset + POOL_SIZE))
+
+def get_excluded_indices():
+    offset = record_index_offset(NAME_LENGTH)
+    return set(db_get_excluded_indices(offset, offset + POOL_SIZE))
+
+def word_list_signature():
+    return hashlib.sha1("\n".join([RECORD_INDEX_SCHEME] + MASTER_WORDS).encode("utf-8")).hexdigest()
+
+def sync_record_indices():
+    """
+    history / favorites / excluded 的 idx 欄是依目前字詞庫算出的組合索引；
+    字詞庫變動（或舊版 DB 剛補上 idx 欄）時全部重新回填，回傳更新筆數。
+    """
+    signature = word_list_signature()
+    if db_config_get("record_index_words") == signature:
+        return 0
+    updated = db_reindex_records(name_to_record_index)
+    db_config_set("record_index_words", signature)
+    return updated
+
+def get_word_frequency_stats():
+    """每字被抽取次數（讀 char_usage 的 N 列，不掃描歷史）。"""
+    usage = db_get_char_usage()
+    return {word: usage.get(word, 0) for word in MASTER_WORDS}
+
+def choose_pool_mode(pool_size):
+    """
+    依組合數決定抽取池模式：list（IndexPool）、permutation（位圖）或 sparse（位圖超過 DENSE_BITMAP_MAX_BYTES）。
+    可用 config 'pool_mode' 強制指定 list / permutation。
+    """
+    try:
+        forced = db_config_get("pool_mode", "auto")
+    except Exception:
+        forced = "auto"
+    if forced in ("list", "permutation"):
+        return forced
+    if pool_size <= LAZY_POOL_THRESHOLD:
+        return "list"
+    return "permutation" if (pool_size + 7) // 8 <= DENSE_BITMAP_MAX_BYTES else "sparse"
+
+def compute_prefilter_bitmap(rules):
+    """
+    以每字聲調向量算出 N^L 組合中「確定拒絕」（名字內任一相鄰兩字；與姓無關）的位圖
+    （bytearray，little bit order，與 PermutationPool.bitmap 相同格式）。依第一字分塊計算後直接壓成位元，
+    暫存記憶體與 SCORE_BLOCK_CELLS 成正比。需要 NumPy 與聲調表；不可用或位圖超過
+    DENSE_BITMAP_MAX_BYTES 時回傳 None（改用 iter_prefilter_rejects）。
+    """
+    ensure_phonetic_table()
+    if not numpy_enabled() or not phonetics.PINYIN_ENABLED or len(CHAR_TONES) != WORD_COUNT:
+        return None
+    if (POOL_SIZE + 7) // 8 > DENSE_BITMAP_MAX_BYTES:
+        return None
+    n = WORD_COUNT
+    tones = np.clip(np.frombuffer(CHAR_TONES, dtype=np.int8), 0, 5).astype(np.intp)
+    reject = np.frombuffer(bytes(rules.actions), dtype=np.uint8).reshape(6, 6) == TONE_REJECT
+    tail = n ** (NAME_LENGTH - 1)
+    # 每塊的起點必須落在位元組邊界：第一字的列數取 8 的倍數
+    rows = max(8, SCORE_BLOCK_CELLS // max(tail, 1) // 8 * 8)
+    bitmap = bytearray((POOL_SIZE + 7) // 8)
+    for start in range(0, n, rows):
+        stop = min(n, start + rows)
+        d = _digit_grids(start, stop)
+        mask = np.zeros([stop - start] + [n] * (NAME_LENGTH - 1), dtype=bool)
+        for a, b in zip(d, d[1:]):
+            mask |= reject[tones[a], tones[b]]
+        packed = np.packbits(mask.ravel(), bitorder='little')
+        pos = start * tail // 8
+        bitmap[pos:pos + len(packed)] = packed.tobytes()
+    return bitmap
+
+def iter_prefilter_rejects(rules):
+    """純 Python 後備：依聲調分組，逐一產生確定拒絕的組合索引（組合數超過 SCORE_MATRIX_MAX 時略過）。"""
+    ensure_phonetic_table()
+    if not phonetics.PINYIN_ENABLED or len(CHAR_TONES) != WORD_COUNT or POOL_SIZE > SCORE_MATRIX_MAX:
+        return
+    groups = {}
+    for i, t in enumerate(CHAR_TONES):
+        groups.setdefault(t, []).append(i)
+    for tone_seq in itertools.product(groups, repeat=NAME_LENGTH):
+        if rules.sequence_action(tone_seq) != TONE_REJECT:
+            continue
+        for digits in itertools.product(*(groups[t] for t in tone_seq)):
+            idx = 0
+            for d in digits:
+                idx = idx * WORD_COUNT + d
+            yield idx
+
+def _replace_pool(pool):
+    """替換目前的抽取池；id() 可能被新物件重用，因此以 POOL_GENERATION 區分新舊抽取池。"""
+    global NAME_INDICES_CACHE, POOL_GENERATION
+    NAME_INDICES_CACHE = pool
+    POOL_GENERATION += 1
+
+def initialize_database(reset_history=True, exclude_drawn=False, keep_exclusions=False):
+    """
+    重置目前名字長度的抽取池；回傳預先過濾掉的（確定拒絕）組合數。
+    exclude_drawn：排除歷史中已抽過的組合；keep_exclusions：排除 excluded 表中的組合（切換長度時使用）。
+    """
+    global JOURNAL_PENDING
+    if POOL_SIZE == 0:
+        return 0
+    init_db()
+    rules = get_filter_rules()
+    mode = choose_pool_mode(POOL_SIZE)
+    bitmap = compute_prefilter_bitmap(rules) if mode != "sparse" else None
+    filtered = 0
+    if mode in ("permutation", "sparse"):
+        # 惰性置換：不建立任何索引清單，只換種子；預過濾結果直接成為初始位圖
+        if mode == "sparse":
+            # 位圖放不下：只記錄實際抽走/排除的組合，聲調拒絕留到抽取時判斷
+            pool = SparsePermutationPool(POOL_SIZE)
+        elif bitmap is not None:
+            pool = PermutationPool(POOL_SIZE, bitmap=bitmap)
+            filtered = POOL_SIZE - len(pool)
+        else:
+            pool = PermutationPool(POOL_SIZE)
+            for idx in iter_prefilter_rejects(rules):
+                filtered += pool.discard(idx)
+        if exclude_drawn:
+            for idx in get_drawn_indices_from_history():
+                pool.discard(idx)
+        if keep_exclusions:
+            for idx in get_excluded_indices():
+                pool.discard(idx)
+        _replace_pool(pool)
+        db_replace_remaining([])
+        db_save_permutation_pool(pool, full=True)
+    else:
+        # IndexPool 抽取時即隨機取位置，不需要先洗牌
+        if bitmap is not None:
+            mask = np.unpackbits(np.frombuffer(bitmap, dtype=np.uint8), bitorder='little')[:POOL_SIZE]
+            keep = array('I')
+            keep.frombytes(np.flatnonzero(mask == 0).astype(np.uint32).tobytes())
+            remaining = IndexPool(POOL_SIZE, keep)
+            filtered = POOL_SIZE - len(remaining)
+        else:
+            remaining = IndexPool(POOL_SIZE)
+            for idx in iter_prefilter_rejects(rules):
+                filtered += remaining.discard(idx)
+        if exclude_drawn:
+            for idx in get_drawn_indices_from_history():
+                remaining.discard(idx)
+        if keep_exclusions:
+            for idx in get_excluded_indices():
+                remaining.discard(idx)
+        _replace_pool(remaining)
+        try:
+            db_replace_remaining(remaining)
+        except Exception:
+            with db_connect() as conn:
+                cur = conn.cursor()
+                cur.execute("DELETE FROM remaining_indices;")
+                for idx in remaining:
+                    try:
+                        cur.execute("INSERT INTO remaining_indices(idx) VALUES (?);", (idx,))
+                    except Exception:
+                        pass
+                cur.execute("DELETE FROM pool_journal;")
+                cur.execute("DELETE FROM pool_bitmap;")
+        db_config_set("pool_state", json.dumps({"mode": "list", "size": POOL_SIZE}))
+    db_config_set("pool_length", str(NAME_LENGTH))
+    db_config_set("pool_words", word_list_signature())
+    JOURNAL_PENDING = 0
+    if reset_history:
+        db_clear_history()
+        with db_connect() as conn:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM favorites;")
+            cur.execute("DELETE FROM excluded;")
+        reset_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            atomic_write_json(STATUS_FILE, {"last_reset": reset_time})
+        except Exception:
+            pass
+    return filtered
+
+def load_indices_cache():
+    """
+    啟動時載入抽取池：先讀快照，再依序重播 journal 尾端。
+    尚未建立過、或快照屬於其他長度/字詞庫時，依歷史與排除清單重建（不清除歷史、收藏與排除清單）。
+    """
+    global JOURNAL_PENDING
+    init_db()
+    load_name_length()
+    load_surnames()
+    signature = word_list_signature()
+    # 較舊的 DB 沒有 pool_words：以紀錄表上次回填時的字詞庫代替（sync_record_indices 之前讀）
+    pool_words = db_config_get("pool_words") or db_config_get("record_index_words")
+    try:
+        sync_record_indices()
+    except Exception as e:
+        print("警告：無法更新紀錄的組合索引:", e)
+    try:
+        state = json.loads(db_config_get("pool_state", "") or "{}")
+    except Exception:
+        state = {}
+    if state and (db_config_get("pool_length", "2") != str(NAME_LENGTH) or state.get("size", POOL_SIZE) != POOL_SIZE
+                  or pool_words not in (None, signature)):
+        # 上次存下的是其他長度或其他字詞庫（字數相同但內容不同也算）的抽取池：依歷史與排除清單重建，不清除任何紀錄
+        initialize_database(reset_history=False, exclude_drawn=True, keep_exclusions=True)
+        return
+    if state.get("mode") == "permutation":
+        _replace_pool(db_load_permutation_pool(state))
+    else:
+        remaining = [i for i in db_get_remaining() if i < POOL_SIZE]
+        if not state and not remaining and POOL_SIZE > 0:
+            # 尚未建立過抽取池（全新或舊版資料庫）：同樣依歷史與排除清單建立
+            initialize_database(reset_history=False, exclude_drawn=True, keep_exclusions=True)
+            return
+        _replace_pool(IndexPool(POOL_SIZE, remaining))
+    journal = db_get_journal()
+    for op, idx in journal:
+        if op in JOURNAL_INSERT_OPS:
+            NAME_INDICES_CACHE.add(idx)
+        else:
+            NAME_INDICES_CACHE.discard(idx)
+    JOURNAL_PENDING = len(journal)
+
+def save_indices_cache():
+    """把 journal 壓縮成快照（關閉視窗時呼叫）。"""
+    global JOURNAL_PENDING
+    try:
+        if isinstance(NAME_INDICES_CACHE, PermutationPool):
+            db_save_permutation_pool(NAME_INDICES_CACHE)
+        else:
+            db_compact_remaining_journal()
+        JOURNAL_PENDING = 0
+    except Exception as e:
+        print("警告：無法保存索引到 DB:", e)
+
+def _apply_pool_hooks(op, idx):
+    _topk_on_change(op, idx)
+    _weights_on_change(op, idx)
+
+def record_pool_change(op, idx):
+    """記錄一次抽取池變動（op 見 JOURNAL_*_OPS）；journal 過長時順便壓縮。"""
+    global JOURNAL_PENDING
+    _apply_pool_hooks(op, idx)
+    db_append_journal(op, idx)
+    JOURNAL_PENDING += 1
+    if JOURNAL_PENDING >= JOURNAL_COMPACT_EVERY:
+        save_indices_cache()
+
+def draw_many(k):
+    """
+    一次抽取最多 k 個名字：先在記憶體中挑選並更新抽取池，最後以單一交易寫入 journal 與歷史。
+    回傳抽出的名字 list（池子用完或全被過濾時可能少於 k）。
+    名字本身的聲調拒絕會把組合移出抽取池；只因目前的姓而拒絕的組合則在結束時放回（restore），換姓後仍可抽到。
+    索引超出範圍（字詞庫與資料不一致）時，已抽出的部分照常寫入後丟出 ValueError。
+    """
+    global JOURNAL_PENDING
+    names = []
+    journal_rows = []
+    history_rows = []
+    deferred = []
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rules = get_filter_rules() if phonetics.PINYIN_ENABLED else None
+    lead = None
+    if rules is not None:
+        ensure_phonetic_table()
+        lead = get_surname_filter()
+    record_offset = record_index_offset(NAME_LENGTH)
+    try:
+        while len(names) < k and NAME_INDICES_CACHE:
+            next_index = _next_draw_index()
+            if next_index >= POOL_SIZE:
+                raise ValueError("索引超出範圍，請重置數據庫。")
+            digits = index_to_digits(next_index)
+            name = "".join(MASTER_WORDS[d] for d in digits)
+            tones = None
+            if rules is not None:
+                try:
+                    tones = tuple(CHAR_TONES[d] for d in digits)
+                    action = rules.sequence_action(tones)
+                    if action == TONE_REJECT or (action == TONE_PROBABILISTIC and random.randint(1,100) <= rules.reject_chance):
+                        _apply_pool_hooks("reject", next_index)
+                        journal_rows.append(("reject", next_index))
+                        continue
+                    action = lead[digits[0]] if lead is not None else TONE_ACCEPT
+                    if action == TONE_REJECT or (action == TONE_PROBABILISTIC and random.randint(1,100) <= rules.reject_chance):
+                        # 暫緩的組合在這次呼叫中也移出權重樹，加權抽取不會一直抽到它而退回均勻抽取
+                        _weights_on_change("reject", next_index)
+                        deferred.append(next_index)
+                        continue
+                except Exception:
+                    pass
+            _apply_pool_hooks("draw", next_index)
+            journal_rows.append(("draw", next_index))
+            history_rows.append((timestamp, name, json.dumps(list(tones)) if tones else None, record_offset + next_index))
+            names.append(name)
+    finally:
+        # 池子在這次呼叫中不重複取出暫緩的組合，因此全部不適合目前的姓時迴圈也會結束
+        for idx in deferred:
+            NAME_INDICES_CACHE.restore(idx)
+            _weights_on_change("restore", idx)
+        if journal_rows:
+            try:
+                db_commit_draws(journal_rows, history_rows)
+                JOURNAL_PENDING += len(journal_rows)
+                if JOURNAL_PENDING >= JOURNAL_COMPACT_EVERY:
+                    save_indices_cache()
+            except Exception as e:
+                print("警告：無法寫入抽取結果到 DB:", e)
+    return names
+
+def get_progress_bar(remaining):
+    total = POOL_SIZE
+    drawn = total - remaining
+    if total == 0:
+        progress_ratio = 1.0
+    else:
+        progress_ratio = drawn / total
+    bar_length = 25
+    filled_length = int(bar_length * progress_ratio)
+    bar = '█' * filled_length + '░' * (bar_length - filled_length)
+    percentage = f"{progress_ratio:.2%}"
+    drawn_formatted = f"{drawn:,}"
+    total_formatted = f"{total:,}"
+    return f"進度: {drawn_formatted} / {total_formatted} ({percentage}) [{bar}]"
+
+# ----------------- 啟動邏輯 -----------------
+def setup_data_paths():
+    global WORDS_FILE, STATE_FILE, HISTORY_FILE, FAVORITES_FILE, STATUS_FILE, DATA_DIR, DB_FILE, CHAR_ATTR_FILE
+    if not os.path.exists(DATA_DIR):
+        os.makedirs(DATA_DIR)
+    WORDS_FILE = os.path.join(DATA_DIR, 'words_list.txt')
+    STATE_FILE = os.path.join(DATA_DIR, 'name_indices.json')
+    HISTORY_FILE = os.path.join(DATA_DIR, 'drawn_history.txt')
+    FAVORITES_FILE = os.path.join(DATA_DIR, 'favorites.txt')
+    STATUS_FILE = os.path.join(DATA_DIR, 'system_status.json')
+    DB_FILE = os.path.join(DATA_DIR, 'name_generator.sqlite3')
+    CHAR_ATTR_FILE = os.path.join(DATA_DIR, 'char_attributes.json')
+    db.DB_FILE = DB_FILE
+
+def load_master_words():
+    """
+    載入字詞庫並建立索引（聲調表延到第一次需要時才建立，見 ensure_phonetic_table）。
+    檔案不存在時建立範本後丟出 FileNotFoundError；內容為空時丟出 ValueError。
+    """
+    global MASTER_WORDS, WORD_COUNT, WORD_TO_INDEX
+    if not os.path.exists(WORDS_FILE):
+        with open(WORDS_FILE, 'w', encoding='utf-8') as f:
+            f.write("愛\n麗\n雅\n靜\n")
+            f.write("風\n雲\n月\n星\n")
+        raise FileNotFoundError(f"找不到字詞庫檔案 '{WORDS_FILE}'。\n程式已在資料夾中為您創建範本檔案，請編輯後再次運行程式。")
+    with open(WORDS_FILE, 'r', encoding='utf-8') as f: content = f.read()
+    final_words = []
+    for ch in content:
+        if ch.strip() and not ch.isspace() and ch not in [',','，','#','\n']:
+            final_words.append(ch)
+    if not final_words:
+        raise ValueError(f"字詞庫檔案 '{WORDS_FILE}' 內容為空。請編輯後重新運行。")
+    MASTER_WORDS = final_words
+    WORD_COUNT = len(MASTER_WORDS)
+    _apply_name_length(NAME_LENGTH)
+    WORD_TO_INDEX = {word:i for i,word in enumerate(MASTER_WORDS)}
@@ -0,0 +1,99 @@
+# namegen/export.py
+# 歷史紀錄串流匯出：游標以 fetchmany 分批讀取，經緩衝（檔名以 .gz 結尾時 gzip 壓縮）寫出 txt / csv / jsonl。
+# 記憶體用量與歷史筆數無關；可回報進度與中途取消（GUI 在背景執行緒呼叫）。
+
+import csv
+import gzip
+import io
+import json
+import os
+
+from namegen.db import db_count_history, db_iter_history
+
+EXPORT_FORMATS = ("txt", "csv", "jsonl")
+EXPORT_CHUNK = 5000
+EXPORT_BUFFER = 1 << 20
+
+class ExportCancelled(Exception):
+    pass
+
+def export_format_for(path):
+    """由副檔名判斷 (格式, 是否 gzip)，例如 history.jsonl.gz → ('jsonl', True)；未知副檔名視為 txt。"""
+    lower = path.lower()
+    compressed = lower.endswith(".gz")
+    if compressed:
+        lower = lower[:-3]
+    ext = os.path.splitext(lower)[1].lstrip(".")
+    return (ext if ext in EXPORT_FORMATS else "txt"), compressed
+
+def _tones_cell(tones):
+    """DB 內的 tones 是 json.dumps 的 list（如 "[2, 4]"），直接去掉括號與空白，不逐列 json.loads。"""
+    if not tones:
+        return ""
+    if tones[0] == "[" and tones[-1] == "]":
+        return tones[1:-1].replace(" ", "")
+    return tones
+
+def _tones_json(tones):
+    if not tones:
+        return "[]"
+    if tones[0] == "[" and tones[-1] == "]":
+        return tones
+    return json.dumps(tones, ensure_ascii=False)
+
+def history_line(ts, name, tones):
+    """一筆歷史的顯示文字（TXT 匯出與歷史視窗共用），例如 "[2024-01-01 10:00:00] - 安雅 [1,3]"。"""
+    cell = _tones_cell(tones)
+    return f"[{ts}] - {name} [{cell}]" if cell else f"[{ts}] - {name}"
+
+def _format_txt(rows, out):
+    out.write("".join(history_line(ts, name, tones) + "\n" for ts, name, tones in rows))
+
+def _format_jsonl(rows, out):
+    out.write("".join(
+        f'{{"timestamp": {json.dumps(ts)}, "name": {json.dumps(name, ensure_ascii=False)}, "tones": {_tones_json(tones)}}}\n'
+        for ts, name, tones in rows))
+
+def _open_output(path, compressed):
+    if compressed:
+        return io.TextIOWrapper(io.BufferedWriter(gzip.open(path, "wb"), EXPORT_BUFFER), encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="", buffering=EXPORT_BUFFER)
+
+def export_history(path, fmt=None, progress=None, cancel=None, chunk=EXPORT_CHUNK):
+    """
+    把歷史紀錄匯出到 path，回傳寫出的筆數。
+    fmt 省略時依副檔名判斷；progress(done, total) 每批呼叫一次；cancel 為 threading.Event，
+    設定後丟出 ExportCancelled。先寫到 path + '.part'，完成才改名，取消或失敗不會留下半個檔案。
+    """
+    detected, compressed = export_format_for(path)
+    fmt = fmt or detected
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支援的匯出格式：{fmt}")
+    total = db_count_history()
+    tmp = path + ".part"
+    done = 0
+    try:
+        with _open_output(tmp, compressed) as out:
+            writer = csv.writer(out) if fmt == "csv" else None
+            if writer:
+                writer.writerow(["Timestamp", "Name", "Tones"])
+            for rows in db_iter_history(chunk):
+                if cancel is not None and cancel.is_set():
+                    raise ExportCancelled()
+                if writer:
+                    writer.writerows((ts, name, _tones_cell(tones)) for ts, name, tones in rows)
+                elif fmt == "jsonl":
+                    _format_jsonl(rows, out)
+                else:
+                    _format_txt(rows, out)
+                done += len(rows)
+                if progress:
+                    progress(done, total)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return done
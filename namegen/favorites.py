@@ -0,0 +1,62 @@
+# namegen/favorites.py
+# 收藏清單的分頁模型：依 id 由舊到新以 keyset 分頁載入；刪除與新增只更新本地已載入的列，
+# 不再每次重新讀取整張 favorites 表。GUI 的收藏視窗把它當作資料來源。
+
+from namegen.db import db_count_favorites, db_favorites_page, db_delete_favorites, FAVORITES_PAGE_SIZE
+
+def contiguous_ranges(positions):
+    """把位置集合整理成由後往前的連續區段 [(first, last), ...]，供 Listbox.delete(first, last) 使用。"""
+    ranges = []
+    for pos in sorted(set(positions), reverse=True):
+        if ranges and ranges[-1][0] == pos + 1:
+            ranges[-1] = (pos, ranges[-1][1])
+        else:
+            ranges.append((pos, pos))
+    return ranges
+
+class FavoritesModel:
+    def __init__(self, page_size=FAVORITES_PAGE_SIZE):
+        self.page_size = page_size
+        self.rows = []        # 已載入的 (id, timestamp, name)，依 id 遞增
+        self.total = db_count_favorites()
+        self.done = self.total == 0
+
+    def load_more(self):
+        """載入下一頁，回傳新載入的列（已全部載入時回傳空 list）。"""
+        if self.done:
+            return []
+        after_id = self.rows[-1][0] if self.rows else None
+        rows = db_favorites_page(after_id, self.page_size)
+        self.rows.extend(rows)
+        if len(rows) < self.page_size:
+            self.done = True
+        return rows
+
+    def sync(self):
+        """
+        重新開啟視窗時呼叫：只查總數與已載入尾端之後的新收藏（新增的收藏 id 一定較大），
+        回傳需要附加到清單末端的列。
+        """
+        self.total = db_count_favorites()
+        if not self.done:
+            return []
+        after_id = self.rows[-1][0] if self.rows else None
+        rows = []
+        while True:
+            page = db_favorites_page(after_id, self.page_size)
+            rows.extend(page)
+            if len(page) < self.page_size:
+                break
+            after_id = page[-1][0]
+        self.rows.extend(rows)
+        return rows
+
+    def delete(self, positions):
+        """以單一交易刪除已載入清單中這些位置的收藏，回傳刪除的區段（見 contiguous_ranges）。"""
+        positions = set(positions)
+        if not positions:
+            return []
+        db_delete_favorites([self.rows[pos][0] for pos in positions])
+        self.rows = [row for pos, row in enumerate(self.rows) if pos not in positions]
+        self.total -= len(positions)
+        return contiguous_ranges(positions)
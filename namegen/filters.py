@@ -0,0 +1,104 @@
+# namegen/filters.py
+# 聲調過濾設定（存在 config 表的 filter_config）與編譯後的 FilterRuleSet。
+
+import json
+
+from namegen.db import db_config_get, db_config_set
+
+DEFAULT_FILTER_CONFIG = {
+    "unsmooth_blacklist": [(3,3), (4,4), (1,1), (2,2)],
+    "probabilistic_blacklist": [],
+    "reject_chance": 50
+}
+
+def load_filter_config():
+    raw = db_config_get("filter_config", None)
+    if raw:
+        try:
+            cfg = json.loads(raw)
+            cfg["unsmooth_blacklist"] = [tuple(x) for x in cfg.get("unsmooth_blacklist", [])]
+            cfg["probabilistic_blacklist"] = [tuple(x) for x in cfg.get("probabilistic_blacklist", [])]
+            cfg["reject_chance"] = int(cfg.get("reject_chance", DEFAULT_FILTER_CONFIG["reject_chance"]))
+            return cfg
+        except Exception:
+            pass
+    return DEFAULT_FILTER_CONFIG.copy()
+
+def save_filter_config(cfg):
+    copy = {
+        "unsmooth_blacklist": [list(t) for t in cfg.get("unsmooth_blacklist", [])],
+        "probabilistic_blacklist": [list(t) for t in cfg.get("probabilistic_blacklist", [])],
+        "reject_chance": int(cfg.get("reject_chance", DEFAULT_FILTER_CONFIG["reject_chance"]))
+    }
+    db_config_set("filter_config", json.dumps(copy, ensure_ascii=False))
+    invalidate_filter_rules()
+
+# 編譯後的過濾規則：聲調 0..5 的 6x6 查表，抽取/評分時只做一次索引讀取，不碰 DB
+TONE_ACCEPT = 0
+TONE_REJECT = 1
+TONE_PROBABILISTIC = 2
+
+class FilterRuleSet:
+    """由 filter_config 編譯而成；actions[a*6+b] 為聲調組合 (a,b) 的處理方式。"""
+    def __init__(self, cfg, version):
+        self.version = version
+        self.reject_chance = int(cfg.get("reject_chance", DEFAULT_FILTER_CONFIG["reject_chance"]))
+        self.actions = bytearray(36)
+        # 與舊邏輯相同：確定拒絕優先於機率拒絕
+        for a, b in cfg.get("probabilistic_blacklist", []):
+            if 0 <= a < 6 and 0 <= b < 6:
+                self.actions[a * 6 + b] = TONE_PROBABILISTIC
+        for a, b in cfg.get("unsmooth_blacklist", []):
+            if 0 <= a < 6 and 0 <= b < 6:
+                self.actions[a * 6 + b] = TONE_REJECT
+        # score_name 的聲調加減分也一併預先算好
+        self.tone_scores = []
+        for i, act in enumerate(self.actions):
+            if act == TONE_REJECT:
+                self.tone_scores.append(-5.0)
+            elif act == TONE_PROBABILISTIC:
+                self.tone_scores.append(-(self.reject_chance / 100.0) * 2.0)
+            else:
+                self.tone_scores.append(1.2 if i // 6 != i % 6 else -0.2)
+
+    def action(self, ta, tb):
+        if 0 <= ta < 6 and 0 <= tb < 6:
+            return self.actions[ta * 6 + tb]
+        return TONE_ACCEPT
+
+    def tone_score(self, ta, tb):
+        if 0 <= ta < 6 and 0 <= tb < 6:
+            return self.tone_scores[ta * 6 + tb]
+        return 1.2 if ta != tb else -0.2
+
+    def sequence_action(self, tones):
+        """多字名字：逐一檢查相鄰兩字的聲調組合，任一確定拒絕即拒絕，否則任一機率拒絕即為機率拒絕。"""
+        result = TONE_ACCEPT
+        for ta, tb in zip(tones, tones[1:]):
+            act = self.action(ta, tb)
+            if act == TONE_REJECT:
+                return TONE_REJECT
+            if act == TONE_PROBABILISTIC:
+                result = TONE_PROBABILISTIC
+        return result
+
+    def sequence_tone_score(self, tones):
+        return sum(self.tone_score(ta, tb) for ta, tb in zip(tones, tones[1:]))
+
+    def lead_actions(self, lead_tone, tones):
+        """前一字（例如姓氏末字）聲調固定時，下一字為 tones 各聲調的處理方式（與 tones 等長的 bytearray）。"""
+        return bytearray(self.action(lead_tone, t) for t in tones)
+
+_FILTER_RULES = None
+FILTER_RULES_VERSION = 0
+
+def get_filter_rules():
+    """回傳快取的 FilterRuleSet；只有在設定被儲存後才重新讀 DB 編譯。"""
+    global _FILTER_RULES
+    if _FILTER_RULES is None or _FILTER_RULES.version != FILTER_RULES_VERSION:
+        _FILTER_RULES = FilterRuleSet(load_filter_config(), FILTER_RULES_VERSION)
+    return _FILTER_RULES
+
+def invalidate_filter_rules():
+    global FILTER_RULES_VERSION
+    FILTER_RULES_VERSION += 1
@@ -0,0 +1,45 @@
+# namegen/phonetics.py
+# pypinyin 包裝：模組載入時只檢查是否已安裝，真正的 import（含詞典，約數百 ms）延到第一次查詢。
+
+import importlib.util
+import threading
+
+PINYIN_ENABLED = importlib.util.find_spec("pypinyin") is not None
+_PYPINYIN = None
+_IMPORT_LOCK = threading.Lock()
+
+def _pypinyin():
+    global _PYPINYIN, PINYIN_ENABLED
+    if _PYPINYIN is None:
+        # 背景預熱與主執行緒可能同時第一次查詢，只讓一方真正 import
+        with _IMPORT_LOCK:
+            if _PYPINYIN is None:
+                try:
+                    import pypinyin
+                    _PYPINYIN = pypinyin
+                except Exception:
+                    PINYIN_ENABLED = False
+                    raise
+    return _PYPINYIN
+
+def get_pinyin_with_tone(name):
+    pypinyin = _pypinyin()
+    pinyin_display_result = pypinyin.pinyin(name, style=pypinyin.Style.TONE)
+    display_pinyin = " ".join([p[0] for p in pinyin_display_result])
+    pinyin_num_result = pypinyin.pinyin(name, style=pypinyin.Style.TONE3)
+    tones = []
+    for p in pinyin_num_result:
+        p_str = p[0]
+        tone_num = int(p_str[-1]) if p_str and p_str[-1].isdigit() else 5
+        tones.append(tone_num)
+    return display_pinyin, tuple(tones)
+
+def get_zhuyin(name):
+    """回傳以空格分隔的注音（Bopomofo）；pypinyin 不可用時回傳空字串。"""
+    if not name or not PINYIN_ENABLED:
+        return ""
+    try:
+        pypinyin = _pypinyin()
+        return " ".join(pypinyin.lazy_pinyin(name, style=pypinyin.Style.BOPOMOFO, errors='default'))
+    except Exception:
+        return ""
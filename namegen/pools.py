@@ -0,0 +1,487 @@
+# namegen/pools.py
+# 抽取池資料結構（不依賴 tkinter / DB，可單獨使用）：
+#   IndexPool      ：實體化的剩餘索引，array('I') + 位置索引，移除/查詢/隨機抽取/放回皆為 O(1)，
+#                    每筆約 8 bytes（list 內的 int 物件每筆約 36 bytes）。
+#   PermutationPool：以種子化的雙射置換惰性走訪 [0, size)，搭配游標與「已移除」位圖。
+#                    重置只需換一個種子 (O(1))，記憶體約 size/8 bytes。
+#   SparsePermutationPool：同上，但「已移除」改存成依索引範圍分桶的排序 array，
+#                    記憶體約為已移除筆數 × 8 bytes，與組合數無關（位圖放不下的超大組合數用）。
+#
+# 兩者介面相同（pop / remove / append / add / restore / discard / in / len / sample），
+# namegen.engine 的 NAME_INDICES_CACHE 依組合數選用其中之一。
+#
+#   TopKIndex      ：剩餘候選中高分者的索引，抽取/排除/恢復/撤銷時以 O(log n) 增量維護。
+#   FenwickTree    ：加權抽取用的前綴和樹，依權重抽樣、移除、放回皆為 O(log n)。
+
+import bisect
+import heapq
+import random
+from array import array
+
+# 位圖以固定大小的區塊寫回 DB，單次移除只需重寫一個區塊
+BITMAP_CHUNK_BYTES = 4096
+
+
+def _popcount(data):
+    """計算 bytes/bytearray 中被設為 1 的位元數（分段轉成整數，位圖很大時也不會產生等長的暫存字串）。"""
+    view = memoryview(data)
+    return sum(int.from_bytes(view[i:i + (1 << 16)], 'little').bit_count() for i in range(0, len(view), 1 << 16))
+
+
+class IndexPool:
+    """
+    剩餘索引集合：items 存放剩餘索引（順序無意義），pos[idx] 為 idx 在 items 中的位置，
+    不在池中則為 _ABSENT。移除時把最後一筆搬到空位（swap-remove）。
+    """
+    _ABSENT = 0xFFFFFFFF
+
+    def __init__(self, size, indices=None):
+        """indices 為初始剩餘索引（不可重複）；None 表示 0..size-1 全部。"""
+        self.size = size
+        if indices is None:
+            # 全滿：items 與 pos 都是 0..size-1
+            self.items = array('I', range(size))
+            self.pos = array('I', range(size))
+        else:
+            self.items = indices if isinstance(indices, array) and indices.typecode == 'I' else array('I', indices)
+            self.pos = array('I', [self._ABSENT]) * size
+            pos = self.pos
+            for p, idx in enumerate(self.items):
+                pos[idx] = p
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return len(self.items) > 0
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __contains__(self, idx):
+        return 0 <= idx < self.size and self.pos[idx] != self._ABSENT
+
+    def _take(self, p):
+        items = self.items
+        idx = items[p]
+        last = items.pop()
+        if p < len(items):
+            items[p] = last
+            self.pos[last] = p
+        self.pos[idx] = self._ABSENT
+        return idx
+
+    def pop(self):
+        """隨機取出並移除一個剩餘索引。"""
+        if not self.items:
+            raise IndexError("pop from empty pool")
+        return self._take(random.randrange(len(self.items)))
+
+    def discard(self, idx):
+        """移除 idx；回傳是否確實移除。"""
+        if idx not in self:
+            return False
+        self._take(self.pos[idx])
+        return True
+
+    def remove(self, idx):
+        if not self.discard(idx):
+            raise ValueError(f"{idx} not in pool")
+
+    def add(self, idx):
+        """放回 idx（撤銷/恢復用）；回傳是否確實加入。"""
+        if not 0 <= idx < self.size or idx in self:
+            return False
+        self.pos[idx] = len(self.items)
+        self.items.append(idx)
+        return True
+
+    append = add
+    # 放回剛 pop 出、這次不用的索引（例如不適合目前的姓）；之後同樣隨機取出
+    restore = add
+
+    def sample(self, k):
+        """隨機取樣 k 個剩餘索引（不移除）。"""
+        k = min(k, len(self.items))
+        return [self.items[p] for p in random.sample(range(len(self.items)), k)]
+
+
+class FeistelPermutation:
+    """
+    [0, size) 上的種子化雙射。
+    在 2 的冪次網域上跑平衡 Feistel 網路（本身必為置換），
+    落在 size 之外的值再加密一次（cycle walking），因此結果仍是 [0, size) 的置換。
+    """
+    ROUNDS = 4
+
+    def __init__(self, size, seed):
+        self.size = size
+        bits = max(2, (max(size, 1) - 1).bit_length())
+        if bits % 2:
+            bits += 1
+        self.half_bits = bits // 2
+        self.mask = (1 << self.half_bits) - 1
+        rng = random.Random(seed)
+        self.keys = [rng.getrandbits(32) for _ in range(self.ROUNDS)]
+
+    def _round(self, x, key):
+        # 只需打散均勻，不需密碼學強度
+        h = (x * 0x9E3779B1 + key) & 0xFFFFFFFF
+        h ^= h >> 15
+        h = (h * 0x85EBCA6B) & 0xFFFFFFFF
+        h ^= h >> 13
+        return h & self.mask
+
+    def _encrypt(self, x):
+        left = x >> self.half_bits
+        right = x & self.mask
+        for key in self.keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << self.half_bits) | right
+
+    def __call__(self, i):
+        x = self._encrypt(i)
+        while x >= self.size:
+            x = self._encrypt(x)
+        return x
+
+
+class PermutationPool:
+    """
+    惰性抽取池：第 k 次抽取取 perm(cursor)，並在位圖中標記為已移除。
+    - remove(idx)：只設位元，游標走到時會自動跳過
+    - append(idx)：清除位元並放入 returned 堆疊，下一次 pop 優先取出（與舊 list 行為一致）
+    - restore(idx)：只清除位元；游標已走過它，走完一輪後從頭再走時才會再取出
+    """
+
+    def __init__(self, size, seed=None, cursor=0, bitmap=None, returned=None, removed=None):
+        self.size = size
+        self.seed = seed if seed is not None else random.getrandbits(63)
+        self.perm = FeistelPermutation(size, self.seed)
+        self.cursor = cursor
+        nbytes = (size + 7) // 8
+        if bitmap is None:
+            self.bitmap = bytearray(nbytes)
+        elif isinstance(bitmap, bytearray) and len(bitmap) == nbytes:
+            # 呼叫端剛建好的位圖直接沿用，大型抽取池不再多複製一份
+            self.bitmap = bitmap
+        else:
+            self.bitmap = bytearray(bitmap[:nbytes])
+            self.bitmap.extend(bytes(nbytes - len(self.bitmap)))
+        self.returned = list(returned or [])
+        self._removed = _popcount(self.bitmap) if removed is None else removed
+        self.dirty_chunks = set()
+
+    # ---- 位圖操作 ----
+    def _is_removed(self, idx):
+        return (self.bitmap[idx >> 3] >> (idx & 7)) & 1
+
+    def _set(self, idx):
+        self.bitmap[idx >> 3] |= (1 << (idx & 7))
+        self._removed += 1
+        self.dirty_chunks.add((idx >> 3) // BITMAP_CHUNK_BYTES)
+
+    def _clear(self, idx):
+        self.bitmap[idx >> 3] &= ~(1 << (idx & 7)) & 0xFF
+        self._removed -= 1
+        self.dirty_chunks.add((idx >> 3) // BITMAP_CHUNK_BYTES)
+
+    # ---- list 相容介面 ----
+    def __len__(self):
+        return self.size - self._removed
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __contains__(self, idx):
+        return 0 <= idx < self.size and not self._is_removed(idx)
+
+    def pop(self):
+        while self.returned:
+            idx = self.returned.pop()
+            if idx in self:
+                self._set(idx)
+                return idx
+        for _ in range(2):
+            while self.cursor < self.size:
+                idx = self.perm(self.cursor)
+                self.cursor += 1
+                if not self._is_removed(idx):
+                    self._set(idx)
+                    return idx
+            if not len(self):
+                break
+            # 游標之前還有 restore 放回的組合：從頭再走一輪
+            self.cursor = 0
+        raise IndexError("pop from empty pool")
+
+    def discard(self, idx):
+        if idx not in self:
+            return False
+        self._set(idx)
+        return True
+
+    def remove(self, idx):
+        if not self.discard(idx):
+            raise ValueError(f"{idx} not in pool")
+
+    def add(self, idx):
+        if 0 <= idx < self.size and self._is_removed(idx):
+            self._clear(idx)
+            self.returned.append(idx)
+            return True
+        return False
+
+    append = add
+
+    def restore(self, idx):
+        if 0 <= idx < self.size and self._is_removed(idx):
+            self._clear(idx)
+            return True
+        return False
+
+    def sample(self, k):
+        """隨機取樣 k 個剩餘索引（不移除）。"""
+        k = min(k, len(self))
+        if k <= 0:
+            return []
+        picked = set()
+        if len(self) * 4 >= self.size:
+            # 剩餘密度高：直接拒絕取樣
+            while len(picked) < k:
+                idx = random.randrange(self.size)
+                if not self._is_removed(idx):
+                    picked.add(idx)
+            return list(picked)
+        # 剩餘密度低：剩下的幾乎都在游標之後，沿置換往後走即可（置換本身已是亂序）
+        for idx in self.returned:
+            if len(picked) >= k:
+                break
+            if idx in self:
+                picked.add(idx)
+        pos = self.cursor
+        while len(picked) < k and pos < self.cursor + self.size:
+            idx = self.perm(pos % self.size)
+            pos += 1
+            if not self._is_removed(idx):
+                picked.add(idx)
+        return list(picked)
+
+    # ---- 持久化 ----
+    def state(self):
+        return {
+            "size": self.size,
+            "seed": self.seed,
+            "cursor": self.cursor,
+            "returned": [i for i in self.returned if i in self],
+            "removed": self._removed,
+        }
+
+    def chunk_bytes(self, chunk):
+        """第 chunk 個位圖區塊；整塊都沒有移除時回傳 None（不必存進 DB）。"""
+        start = chunk * BITMAP_CHUNK_BYTES
+        data = bytes(self.bitmap[start:start + BITMAP_CHUNK_BYTES])
+        return data if any(data) else None
+
+    def chunk_count(self):
+        return (len(self.bitmap) + BITMAP_CHUNK_BYTES - 1) // BITMAP_CHUNK_BYTES
+
+
+class SparsePermutationPool(PermutationPool):
+    """
+    與 PermutationPool 相同的惰性置換，但不配置 size/8 的位圖：[0, size) 切成 BUCKETS 個等寬範圍，
+    每個範圍的已移除索引存成排序的 array('q')，查詢/移除/放回為 O(log n + 桶內筆數)。
+    持久化時一個桶就是一個區塊（chunk_bytes 為該桶的 array 內容），沿用位圖的區塊表。
+    """
+    BUCKETS = 4096
+
+    def __init__(self, size, seed=None, cursor=0, buckets=None, returned=None, removed=None):
+        """buckets 為 {桶編號: 該桶 array('q') 的 bytes}（由 chunk_bytes 存下的內容）。"""
+        self.size = size
+        self.seed = seed if seed is not None else random.getrandbits(63)
+        self.perm = FeistelPermutation(size, self.seed)
+        self.cursor = cursor
+        self.span = max(1, -(-size // self.BUCKETS))
+        self.buckets = {}
+        for chunk, data in (buckets or {}).items():
+            if data:
+                arr = array('q')
+                arr.frombytes(data)
+                self.buckets[chunk] = arr
+        self.returned = list(returned or [])
+        self._removed = sum(len(arr) for arr in self.buckets.values()) if removed is None else removed
+        self.dirty_chunks = set()
+
+    def _is_removed(self, idx):
+        arr = self.buckets.get(idx // self.span)
+        if not arr:
+            return False
+        i = bisect.bisect_left(arr, idx)
+        return i < len(arr) and arr[i] == idx
+
+    def _set(self, idx):
+        chunk = idx // self.span
+        arr = self.buckets.get(chunk)
+        if arr is None:
+            arr = self.buckets[chunk] = array('q')
+        arr.insert(bisect.bisect_left(arr, idx), idx)
+        self._removed += 1
+        self.dirty_chunks.add(chunk)
+
+    def _clear(self, idx):
+        chunk = idx // self.span
+        arr = self.buckets[chunk]
+        del arr[bisect.bisect_left(arr, idx)]
+        if not arr:
+            del self.buckets[chunk]
+        self._removed -= 1
+        self.dirty_chunks.add(chunk)
+
+    def state(self):
+        return dict(super().state(), sparse=True)
+
+    def chunk_bytes(self, chunk):
+        arr = self.buckets.get(chunk)
+        return arr.tobytes() if arr else None
+
+    def chunk_count(self):
+        return -(-self.size // self.span)
+
+
+class TopKIndex:
+    """
+    剩餘候選的高分索引。heap 只收錄建立時分數 >= floor 的候選（lazy deletion）：
+    不在 heap 中的剩餘候選分數一定 <= floor，所以只要有效筆數 >= k，前 k 名必然正確；
+    低於 k 時 needs_rebuild() 為真，由呼叫端重新從完整分數建立。
+    """
+
+    def __init__(self, k, entries, floor=float('-inf')):
+        """entries 為 [(score, idx)]；floor 為未收錄候選的最高可能分數（全部收錄時為 -inf）。"""
+        self.k = k
+        self.floor = floor
+        self._live = {}
+        self._heap = []
+        for score, idx in entries:
+            self._live[idx] = score
+            self._heap.append((-score, idx))
+        heapq.heapify(self._heap)
+
+    def __len__(self):
+        return len(self._live)
+
+    def __contains__(self, idx):
+        return idx in self._live
+
+    def needs_rebuild(self):
+        return len(self._live) < self.k and self.floor != float('-inf')
+
+    def discard(self, idx):
+        """候選被抽走/排除：O(1)，heap 中的舊項目在讀取時才清除。"""
+        return self._live.pop(idx, None) is not None
+
+    def add(self, idx, score):
+        """候選被恢復/撤銷：分數達門檻才需要收錄，O(log n)。"""
+        if idx in self._live or score < self.floor:
+            return False
+        self._live[idx] = score
+        heapq.heappush(self._heap, (-score, idx))
+        return True
+
+    def _valid(self, entry):
+        neg, idx = entry
+        return self._live.get(idx) == -neg
+
+    def best(self):
+        """回傳目前最高分的 (score, idx)；沒有則回傳 None。"""
+        heap = self._heap
+        while heap and not self._valid(heap[0]):
+            heapq.heappop(heap)
+        if not heap:
+            return None
+        return -heap[0][0], heap[0][1]
+
+    def top(self, n):
+        """回傳前 n 名 [(score, idx)]，由高到低。"""
+        self.best()
+        if len(self._heap) > 2 * len(self._live) + 64:
+            # 舊項目太多時整理一次
+            self._heap = [e for e in self._heap if self._valid(e)]
+            heapq.heapify(self._heap)
+        out = []
+        seen = set()
+        for neg, idx in heapq.nsmallest(len(self._heap), self._heap):
+            if len(out) >= n:
+                break
+            if idx in seen or not self._valid((neg, idx)):
+                continue
+            seen.add(idx)
+            out.append((-neg, idx))
+        return out
+
+
+class FenwickTree:
+    """
+    權重前綴和樹（1-based 內部陣列 array('d')，每筆 8 bytes）。
+    sample(u) 以 u∈[0,1) 依權重比例選出一個位置，add() 調整單一權重。
+    """
+
+    def __init__(self, size, tree=None):
+        """tree 為已建好的內部陣列（長度 size+1）；None 表示全部權重為 0。"""
+        self.size = size
+        self.tree = tree if tree is not None else array('d', bytes(8 * (size + 1)))
+        self._top_bit = 1 << (size.bit_length() - 1) if size else 0
+
+    @classmethod
+    def from_weights(cls, weights):
+        """O(n) 建樹：每個節點把自己的部分和加到父節點。"""
+        size = len(weights)
+        tree = array('d', [0.0])
+        tree.extend(weights)
+        for i in range(1, size + 1):
+            j = i + (i & -i)
+            if j <= size:
+                tree[j] += tree[i]
+        return cls(size, tree)
+
+    def add(self, idx, delta):
+        i = idx + 1
+        tree = self.tree
+        while i <= self.size:
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, count):
+        """前 count 個位置的權重和。"""
+        total = 0.0
+        i = count
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def total(self):
+        return self.prefix(self.size)
+
+    def weight(self, idx):
+        return self.prefix(idx + 1) - self.prefix(idx)
+
+    def find(self, value):
+        """回傳最小的位置 idx 使得前 idx+1 個權重和 > value。"""
+        pos = 0
+        step = self._top_bit
+        tree = self.tree
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and tree[nxt] <= value:
+                pos = nxt
+                value -= tree[nxt]
+            step >>= 1
+        return pos
+
+    def sample(self, u):
+        """依權重抽樣一個位置；總權重為 0 時回傳 None。"""
+        total = self.total()
+        if total <= 0:
+            return None
+        idx = self.find(u * total)
+        return idx if idx < self.size else None
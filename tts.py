@@ -1,5 +1,5 @@
 # tts.py - pyttsx3 TTS manager（可中斷先前播放，優先播放最新請求）
-# 使用： from tts import speak_text, stop_worker
+# 使用： from tts import speak_text, stop_worker, warm_up
 # speak_text(text, interrupt=True)  -> 會中斷當前播放並立刻播放 text
 # speak_text(text)                 -> 會排隊播放（不中斷）
 # 請在 NameGeneratorApp.on_closing 中呼叫 stop_worker()
@@ -10,12 +10,26 @@ import time
 import platform
 import os
 
-try:
-    import pyttsx3
-    _PYTTSX3_AVAILABLE = True
-except Exception:
-    pyttsx3 = None
-    _PYTTSX3_AVAILABLE = False
+# pyttsx3 延遲到第一次發音（在 worker 執行緒中）或 warm_up() 時才 import，不拖慢視窗出現
+pyttsx3 = None
+_PYTTSX3_AVAILABLE = None  # None：尚未嘗試載入
+_IMPORT_LOCK = threading.Lock()
+
+def _load_pyttsx3():
+    global pyttsx3, _PYTTSX3_AVAILABLE
+    with _IMPORT_LOCK:
+        if _PYTTSX3_AVAILABLE is None:
+            try:
+                import pyttsx3 as _mod
+                pyttsx3 = _mod
+                _PYTTSX3_AVAILABLE = True
+            except Exception:
+                _PYTTSX3_AVAILABLE = False
+    return _PYTTSX3_AVAILABLE
+
+def warm_up():
+    """預先 import pyttsx3（可在背景執行緒呼叫）；回傳是否可用。"""
+    return _load_pyttsx3()
 
 # Windows COM helpers (若可用)
 _pythoncom = None
@@ -62,7 +76,7 @@ def _select_chinese_voice(engine):
 def _speak_once_internal(text, rate=160, volume=1.0):
     """在 worker 執行緒內建立 local engine，並將 engine 設為 _CURRENT_ENGINE，完成後清理。"""
     global _CURRENT_ENGINE
-    if not _PYTTSX3_AVAILABLE:
+    if not _load_pyttsx3():
         _dprint("pyttsx3 not available")
         return
 
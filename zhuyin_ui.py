@@ -1,6 +1,6 @@
 # zhuyin_ui.py
 # 提供：get_zhuyin(name), load_zhuyin_config(), save_zhuyin_config(), ZhuyinSettingsDialog
-# 依賴：pypinyin（若可用則顯示注音），並使用 additions.py 中的 db_config_get_raw/db_config_set_raw 儲存設定
+# 依賴：pypinyin（經 namegen.phonetics 延遲載入，若可用則顯示注音），並使用 additions.py 中的 db_config_get_raw/db_config_set_raw 儲存設定
 
 import json
 import tkinter as tk
@@ -10,12 +10,8 @@ try:
 except Exception:
     ttk = None
 
-# 嘗試使用 pypinyin 產生注音（Bopomofo）
-try:
-    from pypinyin import lazy_pinyin, Style
-    _PYPINYIN_AVAILABLE = True
-except Exception:
-    _PYPINYIN_AVAILABLE = False
+# 注音（Bopomofo）由 namegen.phonetics 產生；pypinyin 在第一次查詢時才載入
+from namegen import phonetics
 
 # DB helpers（依賴 additions.py 提供）
 try:
@@ -57,16 +53,7 @@ def get_zhuyin(name: str) -> str:
     若 pypinyin 不可用則回傳空字串。
     範例: "ㄩㄢˋ ㄔㄨㄣˊ"
     """
-    if not name:
-        return ""
-    if not _PYPINYIN_AVAILABLE:
-        return ""
-    try:
-        parts = lazy_pinyin(name, style=Style.BOPOMOFO, errors='default')
-        # join with space for readability
-        return " ".join(parts)
-    except Exception:
-        return ""
+    return phonetics.get_zhuyin(name)
 
 class ZhuyinSettingsDialog(tk.Toplevel):
     """
@@ -114,7 +101,7 @@ class ZhuyinSettingsDialog(tk.Toplevel):
     def _sample_text(self):
         # sample two-chinese chars and zhuyin if available
         sample_name = "媛純"  # example; not critical
-        z = get_zhuyin(sample_name) if _PYPINYIN_AVAILABLE else "(pypinyin not installed)"
+        z = get_zhuyin(sample_name) if phonetics.PINYIN_ENABLED else "(pypinyin not installed)"
         return z
 
     def _update_sample(self):
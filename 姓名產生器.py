@@ -1,39 +1,35 @@
 # -*- coding: utf-8 -*-
 
-import random
 import json
 import os
 import sys
 from datetime import datetime
 import tkinter as tk
-from tkinter import messagebox, scrolledtext, simpledialog, filedialog
+from tkinter import ttk, messagebox, scrolledtext, simpledialog, filedialog
 import shutil
 import time
-import re
-import sqlite3
 import threading
 import subprocess
 import platform
-from tts import speak_text, stop_worker
+from tts import speak_text, stop_worker, warm_up as warm_up_tts
 from additions import TTSSettingsDialog, CharAttributesEditor, register_shortcuts, load_tts_config, save_tts_config
-from zhuyin_ui import ZhuyinSettingsDialog, load_zhuyin_config, get_zhuyin, save_zhuyin_config
-
-# --- pypinyin 可選 ---
-try:
-    import pypinyin
-    PINYIN_ENABLED = True
-    def get_pinyin_with_tone(name):
-        pinyin_display_result = pypinyin.pinyin(name, style=pypinyin.Style.TONE)
-        display_pinyin = " ".join([p[0] for p in pinyin_display_result])
-        pinyin_num_result = pypinyin.pinyin(name, style=pypinyin.Style.TONE3)
-        tones = []
-        for p in pinyin_num_result:
-            p_str = p[0]
-            tone_num = int(p_str[-1]) if p_str and p_str[-1].isdigit() else 5
-            tones.append(tone_num)
-        return display_pinyin, tuple(tones)
-except Exception:
-    PINYIN_ENABLED = False
+from zhuyin_ui import ZhuyinSettingsDialog, load_zhuyin_config, save_zhuyin_config
+from namegen import db, engine, phonetics
+from namegen.db import (
+    db_close, init_db, db_get_remaining, db_insert_history, db_pop_last_history,
+    db_insert_favorite, db_insert_excluded, db_get_excluded, db_delete_excluded_by_id, db_index_status,
+    db_count_history, db_history_page, db_history_id_at, HISTORY_PAGE_SIZE, db_iter_favorites,
+)
+from namegen.favorites import FavoritesModel
+from namegen.export import export_history, history_line, ExportCancelled
+from namegen.filters import load_filter_config, save_filter_config
+from namegen.engine import (
+    atomic_write, setup_data_paths, load_char_attributes, save_char_attributes,
+    get_name_phonetics, get_name_zhuyin, get_topk_index, load_draw_mode, set_draw_mode, name_to_index,
+    index_to_name, name_to_record_index, set_name_length, set_surname,
+    get_word_frequency_stats, initialize_database, load_indices_cache, save_indices_cache,
+    record_pool_change, draw_many, get_progress_bar,
+)
 
 # ----------------- pyttsx3 支援 -----------------
 
@@ -44,455 +40,29 @@ def speak_current_name(self):
         return
     speak_text(text)  # 呼叫 pyttsx3 的非阻塞發音
 
-# ----------------- 配置 -----------------
-WORDS_FILE = 'words_list.txt'
-DATA_DIR = 'name_generator_data'
-STATE_FILE = None
-HISTORY_FILE = None
-FAVORITES_FILE = None
-STATUS_FILE = None
-DB_FILE = None
-CHAR_ATTR_FILE = None
-
-MASTER_WORDS = []
-POOL_SIZE = 0
-WORD_COUNT = 0
-NAME_INDICES_CACHE = []
-WORD_TO_INDEX = {}
-HISTORY_RE = re.compile(r"\] - (.+?)(?: \[|$)")
-
-# ----------------- 工具 -----------------
-def atomic_write(path, data, mode='w', encoding='utf-8'):
-    tmp = f"{path}.tmp"
-    with open(tmp, mode, encoding=encoding) as f:
-        f.write(data)
-    os.replace(tmp, path)
-
-def atomic_write_json(path, obj):
-    atomic_write(path, json.dumps(obj, ensure_ascii=False, indent=2))
-
-# ----------------- DB 支援 -----------------
-def db_connect():
-    global DB_FILE
-    if DB_FILE is None:
-        raise RuntimeError("DB_FILE unknown. Call setup_data_paths() first.")
-    conn = sqlite3.connect(DB_FILE, timeout=10, isolation_level=None)
-    try:
-        conn.execute("PRAGMA journal_mode=WAL;")
-    except Exception:
-        pass
-    return conn
-
-def init_db():
-    with db_connect() as conn:
-        cur = conn.cursor()
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS remaining_indices (
-                idx INTEGER PRIMARY KEY
-            );
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                name TEXT NOT NULL,
-                tones TEXT
-            );
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS favorites (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                name TEXT NOT NULL
-            );
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS excluded (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                name TEXT NOT NULL
-            );
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS config (
-                key TEXT PRIMARY KEY,
-                value TEXT
-            );
-        """)
-
-def db_replace_remaining(indices):
-    with db_connect() as conn:
-        cur = conn.cursor()
-        cur.execute("BEGIN;")
-        cur.execute("DELETE FROM remaining_indices;")
-        cur.executemany("INSERT INTO remaining_indices(idx) VALUES (?);", ((i,) for i in indices))
-        cur.execute("COMMIT;")
-
-def db_get_remaining():
-    with db_connect() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT idx FROM remaining_indices;")
-        rows = cur.fetchall()
-        return [r[0] for r in rows]
-
-def db_delete_remaining_index(idx):
-    with db_connect() as conn:
-        cur = conn.cursor()
-        cur.execute("DELETE FROM remaining_indices WHERE idx = ?;", (idx,))
-
-def db_insert_remaining_index(idx):
-    with db_connect() as conn:
-        cur = conn.cursor()
-        try:
-            cur.execute("INSERT OR IGNORE INTO remaining_indices(idx) VALUES (?);", (idx,))
-        except Exception:
-            pass
-
-def db_insert_history(timestamp, name, tones_text=None):
-    with db_connect() as conn:
-        cur = conn.cursor()
-        cur.execute("INSERT INTO history(timestamp, name, tones) VALUES (?, ?, ?);", (timestamp, name, tones_text))
-
-def db_get_history(limit=None):
-    with db_connect() as conn:
-        cur = conn.cursor()
-        q = "SELECT timestamp, name, tones FROM history ORDER BY id ASC"
-        if limit:
-            q += f" LIMIT {limit}"
-        cur.execute(q)
-        return cur.fetchall()
-
-def db_pop_last_history():
-    with db_connect() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT id, timestamp, name, tones FROM history ORDER BY id DESC LIMIT 1;")
-        row = cur.fetchone()
-        if not row:
-            return None
-        cur.execute("DELETE FROM history WHERE id = ?;", (row[0],))
-        return row
-
-def db_insert_favorite(timestamp, name):
-    with db_connect() as conn:
-        cur = conn.cursor()
-        cur.execute("INSERT INTO favorites(timestamp, name) VALUES (?, ?);", (timestamp, name))
-
-def db_get_favorites():
-    with db_connect() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT timestamp, name FROM favorites ORDER BY id ASC;")
-        return cur.fetchall()
-
-def db_insert_excluded(timestamp, name):
-    with db_connect() as conn:
-        cur = conn.cursor()
-        cur.execute("INSERT INTO excluded(timestamp, name) VALUES (?, ?);", (timestamp, name))
-
-def db_get_excluded():
-    with db_connect() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT id, timestamp, name FROM excluded ORDER BY id DESC;")
-        return cur.fetchall()
-
-def db_delete_excluded_by_id(excluded_id):
-    with db_connect() as conn:
-        cur = conn.cursor()
-        cur.execute("DELETE FROM excluded WHERE id = ?;", (excluded_id,))
-
-def db_config_get(key, default=None):
-    with db_connect() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT value FROM config WHERE key = ?;", (key,))
-        row = cur.fetchone()
-        return row[0] if row else default
-
-def db_config_set(key, value):
-    with db_connect() as conn:
-        cur = conn.cursor()
-        cur.execute("INSERT INTO config(key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value;", (key, value))
-
-# ----------------- 過濾設定 & 屬性檔 -----------------
-DEFAULT_FILTER_CONFIG = {
-    "unsmooth_blacklist": [(3,3), (4,4), (1,1), (2,2)],
-    "probabilistic_blacklist": [],
-    "reject_chance": 50
-}
-
-def load_filter_config():
-    raw = db_config_get("filter_config", None)
-    if raw:
-        try:
-            cfg = json.loads(raw)
-            cfg["unsmooth_blacklist"] = [tuple(x) for x in cfg.get("unsmooth_blacklist", [])]
-            cfg["probabilistic_blacklist"] = [tuple(x) for x in cfg.get("probabilistic_blacklist", [])]
-            cfg["reject_chance"] = int(cfg.get("reject_chance", DEFAULT_FILTER_CONFIG["reject_chance"]))
-            return cfg
-        except Exception:
-            pass
-    return DEFAULT_FILTER_CONFIG.copy()
-
-def save_filter_config(cfg):
-    copy = {
-        "unsmooth_blacklist": [list(t) for t in cfg.get("unsmooth_blacklist", [])],
-        "probabilistic_blacklist": [list(t) for t in cfg.get("probabilistic_blacklist", [])],
-        "reject_chance": int(cfg.get("reject_chance", DEFAULT_FILTER_CONFIG["reject_chance"]))
-    }
-    db_config_set("filter_config", json.dumps(copy, ensure_ascii=False))
-
-# 字詞屬性 (char attributes)
-CHAR_ATTRS = {}  # char -> {strokes:int, wuxing:str, weight:int, meaning:str}
-
-def load_char_attributes():
-    """從 CHAR_ATTR_FILE 載入字屬性；若不存在則建立範例檔案。"""
-    global CHAR_ATTRS
-    if CHAR_ATTR_FILE is None:
-        return
-    if not os.path.exists(CHAR_ATTR_FILE):
-        # create a sample attribute set for the existing MASTER_WORDS if possible
-        sample = {}
-        for ch in MASTER_WORDS[:20]:
-            sample[ch] = {"strokes": random.randint(5,15), "wuxing": random.choice(["木","火","土","金","水"]), "weight": 1, "meaning": ""}
-        try:
-            atomic_write_json(CHAR_ATTR_FILE, sample)
-        except Exception:
-            pass
-        CHAR_ATTRS = sample
-        return
-    try:
-        with open(CHAR_ATTR_FILE, 'r', encoding='utf-8') as f:
-            CHAR_ATTRS = json.load(f)
-    except Exception:
-        CHAR_ATTRS = {}
-
-def save_char_attributes():
-    if CHAR_ATTR_FILE:
-        try:
-            atomic_write_json(CHAR_ATTR_FILE, CHAR_ATTRS)
-        except Exception:
-            pass
-
-# ----------------- 評分系統 -----------------
-def score_name(name):
-    """
-    簡單評分範例（可擴充）：
-    - 權重（weight）
-    - 筆劃平衡
-    - 五行配對
-    - 聲調影響（若能取得）
-    """
-    base = 0.0
-    a = name[0]; b = name[1]
-    wa = CHAR_ATTRS.get(a, {}).get("weight", 1)
-    wb = CHAR_ATTRS.get(b, {}).get("weight", 1)
-    base += (wa + wb) * 1.0
-
-    # strokes
-    sa = CHAR_ATTRS.get(a, {}).get("strokes")
-    sb = CHAR_ATTRS.get(b, {}).get("strokes")
-    if sa is not None and sb is not None:
-        diff = abs(sa - sb)
-        base += max(0, 3 - diff) * 0.6
-
-    # wuxing
-    wa_x = CHAR_ATTRS.get(a, {}).get("wuxing")
-    wb_x = CHAR_ATTRS.get(b, {}).get("wuxing")
-    if wa_x and wb_x:
-        if wa_x == wb_x:
-            base -= 0.5
-        else:
-            base += 0.4
-
-    # pinyin/tones
-    if PINYIN_ENABLED:
-        try:
-            _, tones = get_pinyin_with_tone(name)
-            cfg = load_filter_config()
-            unsmooth = [tuple(x) for x in cfg.get("unsmooth_blacklist", [])]
-            prob_list = [tuple(x) for x in cfg.get("probabilistic_blacklist", [])]
-            chance = int(cfg.get("reject_chance", 50))
-            if tuple(tones) in unsmooth:
-                base -= 5.0
-            elif tuple(tones) in prob_list:
-                base -= (chance / 100.0) * 2.0
-            else:
-                if len(tones) >=2 and tones[0] != tones[1]:
-                    base += 1.2
-                else:
-                    base -= 0.2
-        except Exception:
-            pass
-
-    base += max(0, 1.5 - ((wa + wb) / 2.0)) * 0.7
-
-    return base
-
-# ----------------- name/index 與核心邏輯 -----------------
-def name_to_index(name):
-    if not name or len(name) < 2:
-        return None
-    a, b = name[0], name[1]
-    idx_a = WORD_TO_INDEX.get(a)
-    idx_b = WORD_TO_INDEX.get(b)
-    if idx_a is None or idx_b is None:
-        return None
-    return idx_a * WORD_COUNT + idx_b
-
-def analyze_words_from_text(content):
-    final_words = []
-    for ch in content:
-        if ch.strip() and not ch.isspace() and ch not in [',','，','#','\n']:
-            final_words.append(ch)
-    word_count = len(final_words)
-    pool_size = word_count * word_count
-    return word_count, pool_size
-
-def get_drawn_indices_from_history():
-    drawn_indices = set()
-    rows = db_get_history()
-    for timestamp, name, tones in rows:
-        if name and len(name) == 2:
-            idx_a = WORD_TO_INDEX.get(name[0])
-            idx_b = WORD_TO_INDEX.get(name[1])
-            if idx_a is not None and idx_b is not None:
-                drawn_indices.add(idx_a * WORD_COUNT + idx_b)
-    return drawn_indices
-
-def get_word_frequency_stats():
-    frequency = {word:0 for word in MASTER_WORDS}
-    rows = db_get_history()
-    for ts, name, tones in rows:
-        if name and len(name)==2:
-            a,b = name[0], name[1]
-            if a in frequency: frequency[a]+=1
-            if b in frequency: frequency[b]+=1
-    return frequency
-
-def initialize_database(reset_history=True, exclude_drawn=False):
-    global NAME_INDICES_CACHE
-    if POOL_SIZE == 0:
-        return
-    init_db()
-    all_indices = list(range(POOL_SIZE))
-    if exclude_drawn:
-        drawn = get_drawn_indices_from_history()
-        remaining = [i for i in all_indices if i not in drawn]
-    else:
-        remaining = all_indices
-    random.shuffle(remaining)
-    NAME_INDICES_CACHE = remaining.copy()
-    try:
-        db_replace_remaining(remaining)
-    except Exception:
-        with db_connect() as conn:
-            cur = conn.cursor()
-            cur.execute("DELETE FROM remaining_indices;")
-            for idx in remaining:
-                try:
-                    cur.execute("INSERT INTO remaining_indices(idx) VALUES (?);", (idx,))
-                except Exception:
-                    pass
-    if reset_history:
-        with db_connect() as conn:
-            cur = conn.cursor()
-            cur.execute("DELETE FROM history;")
-            cur.execute("DELETE FROM favorites;")
-            cur.execute("DELETE FROM excluded;")
-        reset_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        try:
-            atomic_write_json(STATUS_FILE, {"last_reset": reset_time})
-        except Exception:
-            pass
-
-def load_indices_cache():
-    global NAME_INDICES_CACHE
-    init_db()
-    remaining = db_get_remaining()
-    if remaining:
-        NAME_INDICES_CACHE = remaining
-        random.shuffle(NAME_INDICES_CACHE)
-    else:
-        NAME_INDICES_CACHE = []
-
-def save_indices_cache():
-    global NAME_INDICES_CACHE
-    try:
-        db_replace_remaining(NAME_INDICES_CACHE)
-    except Exception as e:
-        print("警告：無法保存索引到 DB:", e)
-
+# ----------------- 抽取（engine 的 GUI 包裝） -----------------
 def get_unique_name():
-    global NAME_INDICES_CACHE
-    while NAME_INDICES_CACHE:
-        next_index = NAME_INDICES_CACHE.pop()
-        idx_a = next_index // WORD_COUNT
-        idx_b = next_index % WORD_COUNT
-        if idx_a >= WORD_COUNT or idx_b >= WORD_COUNT:
-            messagebox.showerror("數據錯誤", "索引超出範圍，請重置數據庫。")
-            return None, len(NAME_INDICES_CACHE)
-        name = MASTER_WORDS[idx_a] + MASTER_WORDS[idx_b]
-        tones = None
-        if PINYIN_ENABLED:
-            try:
-                _, tones = get_pinyin_with_tone(name)
-                cfg = load_filter_config()
-                unsmooth = [tuple(x) for x in cfg.get("unsmooth_blacklist", [])]
-                prob_list = [tuple(x) for x in cfg.get("probabilistic_blacklist", [])]
-                chance = int(cfg.get("reject_chance", 50))
-                if tuple(tones) in unsmooth:
-                    try:
-                        db_delete_remaining_index(next_index)
-                    except Exception:
-                        pass
-                    continue
-                if tuple(tones) in prob_list:
-                    roll = random.randint(1,100)
-                    if roll <= chance:
-                        try:
-                            db_delete_remaining_index(next_index)
-                        except Exception:
-                            pass
-                        continue
-            except Exception:
-                pass
-        try:
-            db_delete_remaining_index(next_index)
-        except Exception:
-            pass
-        try:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            tones_text = json.dumps(list(tones)) if tones else None
-            db_insert_history(timestamp, name, tones_text)
-        except Exception:
-            pass
-        return name, len(NAME_INDICES_CACHE)
-    return None, 0
-
-def get_progress_bar(remaining):
-    total = POOL_SIZE
-    drawn = total - remaining
-    if total == 0:
-        progress_ratio = 1.0
-    else:
-        progress_ratio = drawn / total
-    bar_length = 25
-    filled_length = int(bar_length * progress_ratio)
-    bar = '█' * filled_length + '░' * (bar_length - filled_length)
-    percentage = f"{progress_ratio:.2%}"
-    drawn_formatted = f"{drawn:,}"
-    total_formatted = f"{total:,}"
-    return f"進度: {drawn_formatted} / {total_formatted} ({percentage}) [{bar}]"
+    """抽取一個名字（engine.draw_many 的 GUI 包裝，資料錯誤時以對話框提示）。"""
+    try:
+        names = draw_many(1)
+    except ValueError as e:
+        messagebox.showerror("數據錯誤", str(e))
+        return None, len(engine.NAME_INDICES_CACHE)
+    if not names:
+        # 抽取池可能仍有組合，只是都不適合目前的姓（換姓後仍可抽到）
+        return None, len(engine.NAME_INDICES_CACHE)
+    return names[0], len(engine.NAME_INDICES_CACHE)
 
 # ----------------- Preview Dialog (即時預覽) -----------------
 class PreviewCandidatesDialog(tk.Toplevel):
-    def __init__(self, master_app, sample_size=800, top_n=50):
+    def __init__(self, master_app, top_n=50):
         super().__init__(master_app.master)
         self.title("預覽高分候選名字")
         self.geometry("600x700")
         self.master_app = master_app
-        self.sample_size = sample_size
         self.top_n = top_n
 
-        tk.Label(self, text=f"從剩餘候選中隨機抽樣 {sample_size} 個，顯示 Top {top_n}（按分數排序）").pack(pady=6)
+        tk.Label(self, text=f"從全部剩餘候選中顯示 Top {top_n}（按分數排序）").pack(pady=6)
 
         self.text = scrolledtext.ScrolledText(self, wrap=tk.WORD, font=('Courier New', 12))
         self.text.pack(expand=True, fill='both', padx=8, pady=6)
@@ -502,6 +72,7 @@ class PreviewCandidatesDialog(tk.Toplevel):
         tk.Button(btn_frame, text="刷新", command=self.refresh, bg="#03A9F4", fg="white").pack(side=tk.LEFT, padx=6)
         tk.Button(btn_frame, text="發音", command=self.speak_selected, bg="#9C27B0", fg="white").pack(side=tk.LEFT, padx=6)
         tk.Button(btn_frame, text="使用選定名字", command=self.use_selected, bg="#4CAF50", fg="white").pack(side=tk.LEFT, padx=6)
+        tk.Button(btn_frame, text="使用最高分", command=self.use_best, bg="#FF9800", fg="white").pack(side=tk.LEFT, padx=6)
         tk.Button(btn_frame, text="關閉", command=self.destroy).pack(side=tk.LEFT, padx=6)
 
         self.listbox = tk.Listbox(self, height=12, font=('Courier New', 12))
@@ -514,34 +85,34 @@ class PreviewCandidatesDialog(tk.Toplevel):
         self.listbox.delete(0, tk.END)
         self.text.config(state=tk.NORMAL)
         self.text.delete('1.0', tk.END)
-        remaining = db_get_remaining()
-        if not remaining:
+        if not engine.NAME_INDICES_CACHE:
             self.text.insert(tk.END, "剩餘候選為空。請先重置數據庫。")
             self.text.config(state=tk.DISABLED)
             return
-        sample = random.sample(remaining, min(self.sample_size, len(remaining)))
+        try:
+            top_entries = get_topk_index().top(self.top_n)
+        except ValueError as e:
+            self.text.insert(tk.END, str(e))
+            self.text.config(state=tk.DISABLED)
+            return
         scored = []
-        for idx in sample:
-            ia = idx // WORD_COUNT
-            ib = idx % WORD_COUNT
-            if ia >= WORD_COUNT or ib >= WORD_COUNT:
+        for sc, idx in top_entries:
+            if idx >= engine.POOL_SIZE:
                 continue
-            name = MASTER_WORDS[ia] + MASTER_WORDS[ib]
-            sc = score_name(name)
+            name = index_to_name(idx)
             tones_display = ""
-            if PINYIN_ENABLED:
+            if phonetics.PINYIN_ENABLED:
                 try:
-                    pinyin_display, tones = get_pinyin_with_tone(name)
+                    pinyin_display, tones = get_name_phonetics(engine.full_name(name))
                     tones_display = f"{pinyin_display} {tones}"
                 except Exception:
                     tones_display = ""
             scored.append((sc, name, idx, tones_display))
-        scored.sort(key=lambda x: x[0], reverse=True)
-        top = scored[:self.top_n]
+        top = scored
         self.candidates = top
         for i, (sc, name, idx, tdisp) in enumerate(top, start=1):
-            self.listbox.insert(tk.END, f"{i:02d}. {name}  (score:{sc:.2f})")
-            line = f"{i:02d}. {name}  score:{sc:.2f}\n    {tdisp}\n"
+            self.listbox.insert(tk.END, f"{i:02d}. {engine.full_name(name)}  (score:{sc:.2f})")
+            line = f"{i:02d}. {engine.full_name(name)}  score:{sc:.2f}\n    {tdisp}\n"
             self.text.insert(tk.END, line)
         self.text.config(state=tk.DISABLED)
 
@@ -552,7 +123,7 @@ class PreviewCandidatesDialog(tk.Toplevel):
             return
         idx = sel[0]
         sc, name, index, tones = self.candidates[idx]
-        speak_text(name)
+        speak_text(engine.full_name(name))
 
     def use_selected(self):
         sel = self.listbox.curselection()
@@ -561,24 +132,35 @@ class PreviewCandidatesDialog(tk.Toplevel):
             return
         idx = sel[0]
         sc, name, index, tones = self.candidates[idx]
-        if not messagebox.askyesno("確認使用", f"您確定要使用名字 '{name}' 嗎？\n(此動作會將該組合從待抽取清單移除並記錄到歷史)"):
+        self._use_candidate(name, index)
+
+    def use_best(self):
+        try:
+            best = get_topk_index().best()
+        except ValueError as e:
+            messagebox.showwarning("提示", str(e))
+            return
+        if best is None:
+            messagebox.showwarning("提示", "剩餘候選為空。請先重置數據庫。")
+            return
+        sc, index = best
+        self._use_candidate(index_to_name(index), index)
+
+    def _use_candidate(self, name, index):
+        if not messagebox.askyesno("確認使用", f"您確定要使用名字 '{engine.full_name(name)}' 嗎？\n(此動作會將該組合從待抽取清單移除並記錄到歷史)"):
             return
         try:
-            if index in NAME_INDICES_CACHE:
-                try:
-                    NAME_INDICES_CACHE.remove(index)
-                except Exception:
-                    pass
-            db_delete_remaining_index(index)
+            if engine.NAME_INDICES_CACHE.discard(index):
+                record_pool_change("draw", index)
         except Exception:
             pass
         try:
             ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            db_insert_history(ts, name, json.dumps([]))
+            db_insert_history(ts, name, json.dumps([]), name_to_record_index(name))
         except Exception:
             pass
-        messagebox.showinfo("已使用", f"名字 '{name}' 已被使用並記錄。")
-        self.master_app._update_progress_display(remaining=len(db_get_remaining()))
+        messagebox.showinfo("已使用", f"名字 '{engine.full_name(name)}' 已被使用並記錄。")
+        self.master_app._update_progress_display(remaining=len(engine.NAME_INDICES_CACHE))
         self.refresh()
 
 # ----------------- FilterSettingsDialog (unchanged) -----------------
@@ -646,7 +228,7 @@ class FilterSettingsDialog(tk.Toplevel):
 class NameGeneratorApp:
     def __init__(self, master):
         self.master = master
-        master.title(f"名字抽取器 | 總組合數: {POOL_SIZE:,}")
+        master.title(f"名字抽取器 | 總組合數: {engine.POOL_SIZE:,}")
         # 設為預設較大的視窗（若需改回其他尺寸請修改此行）
         master.geometry("900x450")
         master.config(bg='#F0F0F0')
@@ -656,6 +238,8 @@ class NameGeneratorApp:
         self.pinyin_var = tk.StringVar(master, value="")
         self.config_stats_var = tk.StringVar(master, value="")
         self.current_name = ""
+        # 收藏視窗的分頁模型（第一次開啟時建立；重置會清空收藏，因此一併丟棄）
+        self._favorites_model = None
 
         # 確保在建立視窗之後註冊關閉處理
         self.master.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -684,6 +268,8 @@ class NameGeneratorApp:
         except Exception:
             pass
 
+        stop_db_writer(self.master)
+
         try:
             save_indices_cache()
         except Exception:
@@ -694,6 +280,11 @@ class NameGeneratorApp:
         except Exception:
             pass
 
+        try:
+            db_close()
+        except Exception:
+            pass
+
         try:
             self.master.destroy()
         except Exception:
@@ -785,6 +376,22 @@ class NameGeneratorApp:
         self.batch_draw_button = tk.Button(batch_frame, text="批量抽取並預覽", command=self.batch_draw_gui,
                                            font=('Microsoft JhengHei', 10), bg="#03A9F4", fg='white', width=18)
         self.batch_draw_button.pack(side=tk.LEFT)
+        self._weighted_var = tk.BooleanVar(master=self.master, value=(engine.DRAW_MODE == "weighted"))
+        tk.Checkbutton(batch_frame, text="加權抽取 (依分數)", variable=self._weighted_var,
+                       command=self._toggle_weighted_draw, font=('Microsoft JhengHei', 9),
+                       bg=main_bg).pack(side=tk.LEFT, padx=(10,0))
+        tk.Label(batch_frame, text="名字長度:", bg=main_bg, font=('Microsoft JhengHei', 10)).pack(side=tk.LEFT, padx=(10,0))
+        self._name_length_var = tk.StringVar(self.master, value=str(engine.NAME_LENGTH))
+        tk.Spinbox(batch_frame, from_=engine.NAME_LENGTH_MIN, to=engine.NAME_LENGTH_MAX, width=3, state='readonly',
+                   textvariable=self._name_length_var, command=self._change_name_length,
+                   font=('Microsoft JhengHei', 10)).pack(side=tk.LEFT, padx=(4,0))
+        tk.Label(batch_frame, text="姓氏:", bg=main_bg, font=('Microsoft JhengHei', 10)).pack(side=tk.LEFT, padx=(10,0))
+        self._surname_var = tk.StringVar(self.master, value=engine.SURNAME)
+        self._surname_box = ttk.Combobox(batch_frame, textvariable=self._surname_var, values=[""] + engine.SURNAMES,
+                                         width=5, font=('Microsoft JhengHei', 10))
+        self._surname_box.pack(side=tk.LEFT, padx=(4,0))
+        self._surname_box.bind("<<ComboboxSelected>>", lambda e: self._change_surname())
+        self._surname_box.bind("<Return>", lambda e: self._change_surname())
 
         # 主要功能按鈕：4x4
         btn_defs = [
@@ -839,7 +446,7 @@ class NameGeneratorApp:
 
     # ----------------- TTS / UI 操作相關方法 -----------------
     def speak_current_name(self):
-        text = self.current_name or self.name_var.get() or ""
+        text = engine.full_name(self.current_name) or self.name_var.get() or ""
         if not text or "請點擊抽取" in text or "已全部抽取完畢" in text:
             messagebox.showwarning("無法發音", "目前沒有可發音的名字，請先抽取或選擇一個名字。")
             return
@@ -848,6 +455,43 @@ class NameGeneratorApp:
     def open_filter_settings(self):
         FilterSettingsDialog(self.master)
 
+    def _toggle_weighted_draw(self):
+        try:
+            set_draw_mode("weighted" if self._weighted_var.get() else "uniform")
+        except Exception as e:
+            print("WARN: set_draw_mode failed:", e)
+
+    def _change_name_length(self):
+        """切換名字長度：重建該長度的抽取池（已抽/已排除的同長度名字不會再出現）。"""
+        try:
+            length = int(self._name_length_var.get())
+            if length == engine.NAME_LENGTH:
+                return
+            filtered = set_name_length(length)
+        except Exception as e:
+            self._name_length_var.set(str(engine.NAME_LENGTH))
+            messagebox.showerror("錯誤", f"無法切換名字長度：{e}")
+            return
+        self.current_name = ""
+        self.master.title(f"名字抽取器 | 總組合數: {engine.POOL_SIZE:,}")
+        remaining = self._get_remaining_count()
+        self._update_progress_display(name=f"已切換為 {length} 字名字，請點擊抽取", remaining=remaining)
+        self.draw_button.config(state=tk.NORMAL if remaining else tk.DISABLED)
+        self.status_label.config(text=f"名字長度 {length}：總組合數 {engine.POOL_SIZE:,}，聲調預先過濾 {filtered or 0:,}")
+
+    def _change_surname(self):
+        """切換姓氏（輸入新的姓會加入清單）；評分/過濾表依姓氏各自快取，不重建抽取池。"""
+        try:
+            set_surname(self._surname_var.get())
+        except ValueError as e:
+            self._surname_var.set(engine.SURNAME)
+            messagebox.showerror("錯誤", str(e))
+            return
+        self._surname_box.config(values=[""] + engine.SURNAMES)
+        if self.current_name:
+            self.name_var.set(engine.full_name(self.current_name))
+        self.status_label.config(text=f"姓氏：{engine.SURNAME or '（不加姓）'}")
+
     def open_preview_dialog(self):
         PreviewCandidatesDialog(self)
 
@@ -859,8 +503,8 @@ class NameGeneratorApp:
         RestoreExcludedDialog(self, rows)
 
     def view_word_list_gui(self):
-        w = tk.Toplevel(self.master); w.title(f"當前字詞庫（總字數: {len(MASTER_WORDS)}）"); w.geometry("450x600")
-        sorted_words = sorted(MASTER_WORDS)
+        w = tk.Toplevel(self.master); w.title(f"當前字詞庫（總字數: {len(engine.MASTER_WORDS)}）"); w.geometry("450x600")
+        sorted_words = sorted(engine.MASTER_WORDS)
         WORDS_PER_LINE = 10
         lines = [" | ".join(sorted_words[i:i+WORDS_PER_LINE]) for i in range(0, len(sorted_words), WORDS_PER_LINE)]
         text_area = scrolledtext.ScrolledText(w, wrap=tk.WORD, font=('Microsoft JhengHei', 12)); text_area.insert(tk.END, "\n".join(lines)); text_area.config(state=tk.DISABLED); text_area.pack(expand=True, fill='both'); tk.Button(w, text="關閉", command=w.destroy).pack(pady=10)
@@ -877,7 +521,7 @@ class NameGeneratorApp:
         text_area.config(state=tk.DISABLED); text_area.pack(expand=True, fill='both'); tk.Button(w, text="關閉", command=w.destroy).pack(pady=5)
 
     def _get_remaining_count(self):
-        return len(NAME_INDICES_CACHE)
+        return len(engine.NAME_INDICES_CACHE)
 
     def _update_progress_display(self, name=None, remaining=None, pinyin_str=None):
         if remaining is None:
@@ -946,7 +590,7 @@ class NameGeneratorApp:
                 except Exception:
                     # fallback 同步
                     try:
-                        z = get_zhuyin(self.current_name) or ""
+                        z = get_name_zhuyin(engine.full_name(self.current_name)) or ""
                     except Exception:
                         z = ""
                     self.pinyin_var.set(z)
@@ -969,13 +613,13 @@ class NameGeneratorApp:
             print("ERROR saving zhuyin cfg:", e)
         def _compute_and_set_zhuyin(self, name):
             """
-            在背景線程計算注音，完成後透過 master.after 更新 UI（僅在 current_name 未變時應用）。
+            在背景線程計算「姓 + 名」的注音，完成後透過 master.after 更新 UI（僅在 current_name 未變時應用）。
             """
             try:
                 print("[DEBUG] compute zhuyin background for:", name)
                 z = ""
                 try:
-                    z = get_zhuyin(name) or ""
+                    z = get_name_zhuyin(engine.full_name(name)) or ""
                 except Exception as e:
                     print("zhuyin compute error:", e)
                     z = ""
@@ -998,14 +642,14 @@ class NameGeneratorApp:
         你可以把這個按鈕暫時放在 UI（例如 batch_frame）來測試 pypinyin 是否可用。
         """
         try:
-            name = getattr(self, "current_name", None) or self.name_var.get() or ""
+            name = engine.full_name(getattr(self, "current_name", None) or "") or self.name_var.get() or ""
             if not name:
                 messagebox.showinfo("提示", "目前沒有名字可供測試（請先抽取一個）")
                 return
             print("[DEBUG] test_zhuyin_now for:", name)
             z = ""
             try:
-                z = get_zhuyin(name) or ""
+                z = get_name_zhuyin(name) or ""
             except Exception as e:
                 print("test get_zhuyin error:", e)
                 z = ""
@@ -1016,7 +660,7 @@ class NameGeneratorApp:
 
     # draw_name 保留你之前的完整實作（含 TTS throttle/interrutp/debounce）
     def draw_name(self):
-        MAX_ATTEMPTS = min(POOL_SIZE if POOL_SIZE else 1000, 1000)
+        MAX_ATTEMPTS = min(engine.POOL_SIZE if engine.POOL_SIZE else 1000, 1000)
         for attempt in range(MAX_ATTEMPTS):
             name, remaining = get_unique_name()
             if not name:
@@ -1027,9 +671,11 @@ class NameGeneratorApp:
 
             # 設定目前名字並嘗試複製到剪貼簿
             self.current_name = name
+            # 顯示、複製與發音都用「姓 + 名」（歷史與抽取池只記錄名字）
+            spoken_name = engine.full_name(name)
             try:
                 self.master.clipboard_clear()
-                self.master.clipboard_append(name)
+                self.master.clipboard_append(spoken_name)
             except Exception:
                 pass
 
@@ -1070,14 +716,14 @@ class NameGeneratorApp:
                 if elapsed >= throttle_ms:
                     do_interrupt = interrupt_pref or (mode == "interrupt")
                     try:
-                        speak_text(name, rate=rate, volume=volume, interrupt=do_interrupt)
+                        speak_text(spoken_name, rate=rate, volume=volume, interrupt=do_interrupt)
                     except Exception:
                         pass
                     self._last_speak_ts = int(time.time() * 1000)
                 else:
                     if mode == "interrupt":
                         try:
-                            speak_text(name, rate=rate, volume=volume, interrupt=True)
+                            speak_text(spoken_name, rate=rate, volume=volume, interrupt=True)
                         except Exception:
                             pass
                         self._last_speak_ts = int(time.time() * 1000)
@@ -1092,7 +738,7 @@ class NameGeneratorApp:
                                     pass
                         except Exception:
                             pass
-                        self._debounce_pending_name = name
+                        self._debounce_pending_name = spoken_name
                         def _debounced_play():
                             pending = getattr(self, "_debounce_pending_name", None)
                             if pending:
@@ -1107,13 +753,13 @@ class NameGeneratorApp:
                             self._debounce_after_id = self.master.after(throttle_ms, _debounced_play)
                         except Exception:
                             try:
-                                speak_text(name, rate=rate, volume=volume, interrupt=interrupt_pref)
+                                speak_text(spoken_name, rate=rate, volume=volume, interrupt=interrupt_pref)
                                 self._last_speak_ts = int(time.time() * 1000)
                             except Exception:
                                 pass
                     else:
                         try:
-                            speak_text(name, rate=rate, volume=volume, interrupt=True)
+                            speak_text(spoken_name, rate=rate, volume=volume, interrupt=True)
                         except Exception:
                             pass
                         self._last_speak_ts = int(time.time() * 1000)
@@ -1126,31 +772,31 @@ class NameGeneratorApp:
             # 若注音啟用：先把 name 更新到 UI，並在背景計算注音（非阻塞）
             if zh_cfg.get("enabled", False):
                 # 先把 name 顯示出來，pinyin 先留空（或可顯示 loading）
-                self._update_progress_display(name, remaining, pinyin_str)
+                self._update_progress_display(spoken_name, remaining, pinyin_str)
                 # 非阻塞計算注音並更新 pinyin_var（只在 current_name 相同時應用）
                 try:
                     threading.Thread(target=self._compute_and_set_zhuyin, args=(name,), daemon=True).start()
                 except Exception:
                     # 若 thread 建立失敗，退回同步計算（fallback）
                     try:
-                        pinyin_str = get_zhuyin(name) or ""
+                        pinyin_str = get_name_zhuyin(spoken_name) or ""
                     except Exception:
                         pinyin_str = ""
-                    self._update_progress_display(name, remaining, pinyin_str)
+                    self._update_progress_display(spoken_name, remaining, pinyin_str)
                 # 一旦已經更新畫面（非阻塞或 fallback 同步），就應該結束此 draw_name 的工作，避免繼續迴圈抽取下一個。
                 return
 
             else:
                 # 注音未啟用：若有 PINYIN 支援，可同步計算拼音（通常很快）
-                if PINYIN_ENABLED:
+                if phonetics.PINYIN_ENABLED:
                     try:
-                        pinyin_str, _ = get_pinyin_with_tone(name)
+                        pinyin_str, _ = get_name_phonetics(spoken_name)
                     except Exception:
                         pinyin_str = ""
                 else:
                     pinyin_str = ""
                 # 同步更新 UI（顯示拼音），然後結束此 draw 操作
-                self._update_progress_display(name, remaining, pinyin_str)
+                self._update_progress_display(spoken_name, remaining, pinyin_str)
                 return
 
         # 若嘗試耗盡仍未找到
@@ -1172,8 +818,9 @@ class NameGeneratorApp:
                 # 若啟用注音，計算目前名字的注音並顯示
                 if getattr(self, "current_name", None):
                     try:
-                        zh = get_zhuyin(self.current_name)
-                        self._update_progress_display(name=self.current_name, remaining=self._get_remaining_count(), pinyin_str=zh)
+                        full = engine.full_name(self.current_name)
+                        zh = get_name_zhuyin(full)
+                        self._update_progress_display(name=full, remaining=self._get_remaining_count(), pinyin_str=zh)
                     except Exception:
                         # 若計算失敗，清空注音欄位
                         self.pinyin_var.set("")
@@ -1187,7 +834,7 @@ class NameGeneratorApp:
         """
         顯示系統資訊視窗（字詞庫、進度、檔案狀態、TTS 狀態等）。
         將此方法貼到 NameGeneratorApp 類中（與其它 view_* 函式並列）。
-        依賴外部全域變數/函式： WORDS_FILE, WORD_COUNT, POOL_SIZE, db_get_remaining, STATUS_FILE, DB_FILE, CHAR_ATTR_FILE
+        依賴 namegen.engine 的全域變數與函式： WORDS_FILE, WORD_COUNT, POOL_SIZE, db_get_remaining, STATUS_FILE, DB_FILE, CHAR_ATTR_FILE
         """
         try:
             remaining_count = self._get_remaining_count()
@@ -1199,8 +846,8 @@ class NameGeneratorApp:
 
         drawn_count = "N/A"
         try:
-            if isinstance(POOL_SIZE, int) and isinstance(remaining_count, int):
-                drawn_count = POOL_SIZE - remaining_count
+            if isinstance(engine.POOL_SIZE, int) and isinstance(remaining_count, int):
+                drawn_count = engine.POOL_SIZE - remaining_count
             else:
                 drawn_count = "N/A"
         except Exception:
@@ -1208,16 +855,16 @@ class NameGeneratorApp:
 
         last_reset = "N/A"
         try:
-            if os.path.exists(STATUS_FILE):
-                with open(STATUS_FILE, 'r', encoding='utf-8') as sf:
+            if os.path.exists(engine.STATUS_FILE):
+                with open(engine.STATUS_FILE, 'r', encoding='utf-8') as sf:
                     status_data = json.load(sf)
                     last_reset = status_data.get("last_reset", last_reset)
         except Exception:
             pass
 
-        db_exists = os.path.exists(DB_FILE)
-        char_attr_exists = os.path.exists(CHAR_ATTR_FILE)
-        words_exists = os.path.exists(WORDS_FILE)
+        db_exists = os.path.exists(engine.DB_FILE)
+        char_attr_exists = os.path.exists(engine.CHAR_ATTR_FILE)
+        words_exists = os.path.exists(engine.WORDS_FILE)
 
         # TTS status (best-effort)
         tts_status = "未知"
@@ -1233,17 +880,20 @@ class NameGeneratorApp:
 
         info_lines = []
         info_lines.append("[一、字詞庫資訊]")
-        info_lines.append(f"  - 字詞庫檔案: {WORDS_FILE} ({'存在' if words_exists else '遺失'})")
-        info_lines.append(f"  - 總字數 (N): {WORD_COUNT:,}" if isinstance(WORD_COUNT, int) else f"  - 總字數 (N): {WORD_COUNT}")
-        info_lines.append(f"  - 總組合數 (N x N): {POOL_SIZE:,}" if isinstance(POOL_SIZE, int) else f"  - 總組合數 (N x N): {POOL_SIZE}")
+        info_lines.append(f"  - 字詞庫檔案: {engine.WORDS_FILE} ({'存在' if words_exists else '遺失'})")
+        info_lines.append(f"  - 總字數 (N): {engine.WORD_COUNT:,}" if isinstance(engine.WORD_COUNT, int) else f"  - 總字數 (N): {engine.WORD_COUNT}")
+        info_lines.append(f"  - 名字長度 (L): {engine.NAME_LENGTH} 字")
+        info_lines.append(f"  - 姓氏: {engine.SURNAME or '（不加姓）'}（清單: {'、'.join(engine.SURNAMES) or '無'}）")
+        info_lines.append(f"  - 總組合數 (N^L): {engine.POOL_SIZE:,}" if isinstance(engine.POOL_SIZE, int) else f"  - 總組合數 (N^L): {engine.POOL_SIZE}")
 
         info_lines.append("\n[二、抽取進度]")
         info_lines.append(f"  - 已抽取: {drawn_count if isinstance(drawn_count, int) else drawn_count}")
         info_lines.append(f"  - 剩餘數量: {remaining_count if isinstance(remaining_count, int) else remaining_count}")
 
         info_lines.append("\n[三、檔案狀態]")
-        info_lines.append(f"  - DB: {'✅ 存在' if db_exists else '❌ 遺失'} ({DB_FILE})")
-        info_lines.append(f"  - 字屬性檔: {'✅ 存在' if char_attr_exists else '❌ 遺失'} ({CHAR_ATTR_FILE})")
+        info_lines.append(f"  - DB: {'✅ 存在' if db_exists else '❌ 遺失'} ({engine.DB_FILE})")
+        info_lines.append(f"  - 儲存設定檔: {db.STORAGE_PROFILE}")
+        info_lines.append(f"  - 字屬性檔: {'✅ 存在' if char_attr_exists else '❌ 遺失'} ({engine.CHAR_ATTR_FILE})")
         info_lines.append(f"  - 上次重置時間: {last_reset}")
 
         info_lines.append("\n[四、系統環境 & TTS]")
@@ -1286,8 +936,11 @@ class NameGeneratorApp:
             return
 
         sorted_stats = sorted(stats.items(), key=lambda item: item[1], reverse=True)
-        total_draws = sum(stats.values()) // 2  # 每個名字有兩個字，所以這樣估算抽取名字數
-        header = f"【字詞抽取頻率統計】\n\n總抽取名字數 (估算): {total_draws:,} 個（雙字計算）\n\n"
+        try:
+            total_draws = db_count_history()
+        except Exception:
+            total_draws = 0
+        header = f"【字詞抽取頻率統計】\n\n總抽取名字數: {total_draws:,} 個\n\n"
 
         # 建立視窗
         w = tk.Toplevel(self.master)
@@ -1342,44 +995,49 @@ class NameGeneratorApp:
 
     def search_name_gui(self):
         """
-        查詢兩字名字的狀態並顯示相關資訊。
+        查詢名字（1 到 NAME_LENGTH_MAX 個字，不限目前長度）的狀態並顯示相關資訊。
         將此方法貼到 NameGeneratorApp 類中（與其他 view_* 方法並列）。
         會檢查：
-        - 名字是否為兩個字
-        - 是否在字詞庫中（每個字是否存在 MASTER_WORDS）
+        - 名字長度是否在支援範圍內
+        - 是否在字詞庫中（每個字是否存在 engine.MASTER_WORDS）
         - 是否已被抽取（透過 history）
         - 若啟用 pypinyin，會顯示拼音與聲調
         """
-        name = simpledialog.askstring("名字查詢", "請輸入要查詢的兩個漢字名字:")
+        name = simpledialog.askstring("名字查詢", f"請輸入要查詢的名字（{engine.NAME_LENGTH_MIN} 到 {engine.NAME_LENGTH_MAX} 個字）:")
         if not name:
             return
         name = name.strip()
-        if len(name) != 2:
-            messagebox.showwarning("查詢失敗", "名字必須為兩個漢字。")
+        if not engine.NAME_LENGTH_MIN <= len(name) <= engine.NAME_LENGTH_MAX:
+            messagebox.showwarning("查詢失敗", f"名字必須為 {engine.NAME_LENGTH_MIN} 到 {engine.NAME_LENGTH_MAX} 個漢字。")
             return
 
-        a, b = name[0], name[1]
-        in_pool = (a in MASTER_WORDS) and (b in MASTER_WORDS)
-        idx = name_to_index(name) if in_pool else None
+        in_pool = all(ch in engine.WORD_TO_INDEX for ch in name)
+        idx = name_to_record_index(name) if in_pool else None
 
-        # 檢查抽取狀態（從 history）
+        # 檢查抽取 / 收藏 / 排除狀態（history 等表的 idx 索引查詢）
         drawn_status = "❌ 待抽取"
-        try:
-            rows = db_get_history()
-            for ts, n, tones in rows:
-                if n == name:
+        extra_status = []
+        if idx is None:
+            drawn_status = "—（不在字詞庫中）"
+        else:
+            try:
+                drawn, favorite, excluded = db_index_status(idx)
+                if drawn:
                     drawn_status = "✅ 已抽取"
-                    break
-        except Exception:
-            # 若讀取失敗，設為未知
-            drawn_status = "未知（歷史讀取失敗）"
+                if favorite:
+                    extra_status.append("已收藏")
+                if excluded:
+                    extra_status.append("已排除")
+            except Exception:
+                # 若讀取失敗，設為未知
+                drawn_status = "未知（歷史讀取失敗）"
 
         # 拼音/聲調資訊（若可用）
         pinyin_display = ""
         tones_display = ""
-        if PINYIN_ENABLED:
+        if phonetics.PINYIN_ENABLED:
             try:
-                pinyin_display, tones = get_pinyin_with_tone(name)
+                pinyin_display, tones = get_name_phonetics(name)
                 tones_display = f" 聲調: {tones}"
             except Exception:
                 pinyin_display = ""
@@ -1392,11 +1050,16 @@ class NameGeneratorApp:
         msg_lines.append(f"是否在字詞庫中：{'✅ 是' if in_pool else '❌ 否'}")
         if in_pool and idx is not None:
             try:
-                msg_lines.append(f"索引 (a_index * N + b_index)：{idx}")
-                msg_lines.append(f"總字數: {WORD_COUNT:,}，總組合: {POOL_SIZE:,}")
+                if len(name) == engine.NAME_LENGTH:
+                    msg_lines.append(f"索引（{len(name)} 位 {engine.WORD_COUNT} 進位）：{name_to_index(name)}")
+                else:
+                    msg_lines.append(f"（{len(name)} 字名字；目前抽取長度為 {engine.NAME_LENGTH} 字）")
+                msg_lines.append(f"總字數: {engine.WORD_COUNT:,}，總組合: {engine.POOL_SIZE:,}")
             except Exception:
                 pass
         msg_lines.append(f"抽取狀態：{drawn_status}")
+        if extra_status:
+            msg_lines.append(f"其他：{'、'.join(extra_status)}")
         if pinyin_display:
             msg_lines.append(f"拼音：{pinyin_display}{tones_display}")
 
@@ -1405,88 +1068,90 @@ class NameGeneratorApp:
     
     def export_history_gui(self):
         """
-        匯出歷史紀錄到文字或 CSV 檔案。
-        建議將此方法貼到 NameGeneratorApp 類中（與其它 view_* 函式平行）。
-        會使用 db_get_history() 取得 (timestamp, name, tones) 三元組。
+        匯出歷史紀錄到 TXT / CSV / JSONL（檔名加 .gz 則壓縮）。
+        由 namegen.export 在背景執行緒分批讀取並寫出，視窗顯示進度並可取消；
+        百萬筆以上的歷史也只佔固定記憶體，不會卡住主視窗。
         """
         try:
-            rows = db_get_history()
+            total = db_count_history()
         except Exception as e:
             messagebox.showerror("匯出失敗", f"讀取歷史資料時發生錯誤：{e}")
             return
 
-        if not rows:
+        if not total:
             messagebox.showwarning("匯出失敗", "歷史記錄為空，無法匯出。")
             return
 
-        # 提供兩種格式：.txt 或 .csv
         initial = f"Export_History_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         fn = filedialog.asksaveasfilename(
             defaultextension=".txt",
-            filetypes=[("Text files","*.txt"), ("CSV files","*.csv")],
+            filetypes=[("Text files","*.txt"), ("CSV files","*.csv"), ("JSON Lines","*.jsonl"),
+                       ("Gzip 壓縮","*.gz")],
             initialfile=initial + ".txt",
             title="匯出歷史記錄為..."
         )
         if not fn:
             return
 
-        try:
-            lower = fn.lower()
-            if lower.endswith(".csv"):
-                # 匯出 CSV：欄位 Timestamp, Name, Tones (tones 做為 JSON 或逗號分隔)
-                import csv
-                with open(fn, "w", encoding="utf-8", newline="") as f:
-                    writer = csv.writer(f)
-                    writer.writerow(["Timestamp", "Name", "Tones"])
-                    for ts, name, tones in rows:
-                        tcell = ""
-                        if tones:
-                            # tones 在 DB 中可能是 JSON 字串，嘗試解析
-                            try:
-                                parsed = json.loads(tones)
-                                if isinstance(parsed, (list, tuple)):
-                                    tcell = ",".join(str(x) for x in parsed)
-                                else:
-                                    tcell = str(parsed)
-                            except Exception:
-                                tcell = str(tones)
-                        writer.writerow([ts, name, tcell])
-            else:
-                # 預設匯出為純文字，每行一筆
-                with open(fn, "w", encoding="utf-8") as f:
-                    for ts, name, tones in rows:
-                        line = f"[{ts}] - {name}"
-                        if tones:
-                            try:
-                                tlist = json.loads(tones)
-                                line += " [" + ",".join(map(str, tlist)) + "]"
-                            except Exception:
-                                line += f" [{tones}]"
-                        f.write(line + "\n")
-            messagebox.showinfo("匯出成功", f"歷史記錄已成功匯出至:\n{fn}")
-        except Exception as e:
-            messagebox.showerror("匯出失敗", f"匯出過程發生錯誤: {e}")
-        
+        w = tk.Toplevel(self.master)
+        w.title("匯出歷史記錄")
+        w.geometry("360x120")
+        w.transient(self.master)
+        status_var = tk.StringVar(value=f"準備匯出 {total:,} 筆…")
+        tk.Label(w, textvariable=status_var).pack(pady=(16,8))
+        cancel = threading.Event()
+        cancel_btn = tk.Button(w, text="取消", command=cancel.set)
+        cancel_btn.pack(pady=(0,10))
+        w.protocol("WM_DELETE_WINDOW", cancel.set)
+
+        def _on_progress(done, total_rows):
+            pct = done * 100 // max(total_rows, 1)
+            self.master.after(0, lambda: status_var.set(f"已匯出 {done:,} / {total_rows:,} 筆（{pct}%）"))
+
+        def _finish(title, msg, error=False):
+            try:
+                w.destroy()
+            except Exception:
+                pass
+            (messagebox.showerror if error else messagebox.showinfo)(title, msg)
+
+        def _worker():
+            try:
+                count = export_history(fn, progress=_on_progress, cancel=cancel)
+                self.master.after(0, lambda: _finish("匯出成功", f"已匯出 {count:,} 筆歷史記錄至:\n{fn}"))
+            except ExportCancelled:
+                self.master.after(0, lambda: _finish("已取消", "匯出已取消，未產生檔案。"))
+            except Exception as e:
+                err = e
+                self.master.after(0, lambda: _finish("匯出失敗", f"匯出過程發生錯誤: {err}", error=True))
+            finally:
+                db_close()
+
+        threading.Thread(target=_worker, daemon=True).start()
+
     # 以下方法大致維持原先實作（保留行為）
     def undo_last_draw_gui(self):
         last = db_pop_last_history()
         if not last:
             messagebox.showwarning("無法撤銷", "歷史記錄為空或無法讀取。")
             return
-        if len(last) >= 4:
-            _id, ts, name, tones = last
+        if len(last) >= 5:
+            _id, ts, name, tones, idx = last
         else:
             messagebox.showwarning("撤銷警告", "歷史解析錯誤，請手動檢查。"); return
-        if not name or len(name) !=2:
+        if not name:
             messagebox.showwarning("撤銷警告", f"名字長度異常：{name}"); return
-        idx = name_to_index(name)
+        if len(name) != engine.NAME_LENGTH:
+            # 其他長度的抽取池在切換長度時會依歷史重建，刪除紀錄即可
+            messagebox.showinfo("成功", f"已撤銷抽取：{name}（{len(name)} 字名字）"); return
+        idx = engine.record_index_to_index(idx)
+        if idx is None:
+            idx = name_to_index(name)
         if idx is None:
             messagebox.showwarning("撤銷警告", f"字詞不在庫中：{name}"); return
-        if idx not in NAME_INDICES_CACHE:
-            NAME_INDICES_CACHE.append(idx)
         try:
-            db_insert_remaining_index(idx)
-            db_replace_remaining(NAME_INDICES_CACHE)
+            if engine.NAME_INDICES_CACHE.add(idx):
+                record_pool_change("undo", idx)
         except Exception:
             pass
         messagebox.showinfo("成功", f"已撤銷抽取：{name}")
@@ -1494,24 +1159,22 @@ class NameGeneratorApp:
     def batch_draw_gui(self):
         try:
             count = int(self.batch_count_var.get())
-            if count<=0 or count>1000:
-                messagebox.showwarning("警告","批量抽取數量必須是 1 到 1000 之間的整數。"); return
+            if count<=0 or count>engine.BATCH_DRAW_MAX:
+                messagebox.showwarning("警告",f"批量抽取數量必須是 1 到 {engine.BATCH_DRAW_MAX:,} 之間的整數。"); return
         except ValueError:
             messagebox.showwarning("警告","請輸入有效的批量抽取數量。"); return
-        drawn_names=[]
         draw_limit = min(count, self._get_remaining_count())
         if draw_limit==0:
             messagebox.showinfo("提示","剩餘待抽取名字數量為 0。"); return
-        for _ in range(draw_limit):
-            name, remaining = get_unique_name()
-            if name:
-                drawn_names.append(name)
-            else:
-                break
+        try:
+            drawn_names = draw_many(draw_limit)
+        except ValueError as e:
+            messagebox.showerror("數據錯誤", str(e)); return
         final_remaining = self._get_remaining_count()
         self.current_name = drawn_names[-1] if drawn_names else ""
-        self._update_progress_display(name=self.current_name, remaining=final_remaining)
-        self._display_batch_results(drawn_names, draw_limit)
+        self._update_progress_display(name=engine.full_name(self.current_name), remaining=final_remaining)
+        # 結果清單與複製也用「姓 + 名」（歷史只記錄名字）
+        self._display_batch_results([engine.full_name(name) for name in drawn_names], draw_limit)
 
     def manage_words_gui(self):
         if hasattr(self, '_batch_dialog') and getattr(self, '_batch_dialog', None) and self._batch_dialog.winfo_exists():
@@ -1523,9 +1186,7 @@ class NameGeneratorApp:
         results_window = tk.Toplevel(self.master); results_window.title(f"批量抽取結果 ({len(names)} 個)"); results_window.geometry("400x550")
         header_text = f"成功抽取 {len(names)} 個名字。\n"; header_label = tk.Label(results_window, text=header_text, font=('Microsoft JhengHei', 10, 'bold'), pady=5); header_label.pack()
         text_widget = scrolledtext.ScrolledText(results_window, wrap=tk.WORD, font=('Courier New', 12)); text_widget.pack(expand=True, fill=tk.BOTH, padx=10, pady=(0,10))
-        output_content = ""
-        for i, name in enumerate(names):
-            output_content += f"{i+1:03d}. {name}\n"
+        output_content = "".join(f"{i+1:03d}. {name}\n" for i, name in enumerate(names))
         text_widget.insert(tk.END, output_content); text_widget.config(state=tk.DISABLED)
         def copy_to_clipboard():
             full_text = "\n".join(names); results_window.clipboard_clear(); results_window.clipboard_append(full_text); messagebox.showinfo("複製成功", f"共 {len(names)} 個名字已複製到剪貼簿！")
@@ -1541,34 +1202,31 @@ class NameGeneratorApp:
         else:
             is_standard_reset = True
         if is_standard_reset:
-            initialize_database(reset_history=True, exclude_drawn=False); reset_message = "標準重置完成"
+            filtered = initialize_database(reset_history=True, exclude_drawn=False); reset_message = "標準重置完成"
+            self._favorites_model = None
         else:
-            initialize_database(reset_history=False, exclude_drawn=True); reset_message = "智慧重置完成"
+            filtered = initialize_database(reset_history=False, exclude_drawn=True); reset_message = "智慧重置完成"
         final_remaining_count = self._get_remaining_count(); self.current_name = ""; self._update_progress_display(remaining=final_remaining_count); self.draw_button.config(state=tk.NORMAL)
         if show_message:
-            messagebox.showinfo(reset_message, f"數據庫已重置。\n\n總字數: {WORD_COUNT} 個\n總組合數: {POOL_SIZE:,} 個\n剩餘待抽取數量: {final_remaining_count:,} 個"); self.name_var.set("重置完成，請點擊抽取")
+            messagebox.showinfo(reset_message, f"數據庫已重置。\n\n總字數: {engine.WORD_COUNT} 個\n總組合數: {engine.POOL_SIZE:,} 個\n聲調預先過濾: {filtered or 0:,} 個\n剩餘待抽取數量: {final_remaining_count:,} 個"); self.name_var.set("重置完成，請點擊抽取")
 
     def exclude_current_name_gui(self):
         name_to_exclude = self.current_name
-        if not name_to_exclude or name_to_exclude=="已全部抽取完畢！" or len(name_to_exclude)!=2:
-            messagebox.showwarning("無法排除","請先抽取一個名字，且名字必須為兩個漢字。"); return
-        if not messagebox.askyesno("確認排除", f"您確定要將名字 '{name_to_exclude}' 從待抽取列表永久排除嗎？"):
+        if not name_to_exclude or name_to_exclude=="已全部抽取完畢！" or len(name_to_exclude)!=engine.NAME_LENGTH:
+            messagebox.showwarning("無法排除",f"請先抽取一個名字，且名字必須為 {engine.NAME_LENGTH} 個漢字。"); return
+        display_name = engine.full_name(name_to_exclude)
+        if not messagebox.askyesno("確認排除", f"您確定要將名字 '{display_name}' 從待抽取列表永久排除嗎？"):
             return
         try:
             idx = name_to_index(name_to_exclude)
             if idx is None: raise ValueError("字詞庫中不存在該字")
             try:
-                NAME_INDICES_CACHE.remove(idx)
-            except Exception:
-                pass
-            try:
-                db_delete_remaining_index(idx)
+                if engine.NAME_INDICES_CACHE.discard(idx):
+                    record_pool_change("exclude", idx)
             except Exception:
                 pass
-            ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S"); db_insert_excluded(ts, name_to_exclude)
-            try: db_replace_remaining(NAME_INDICES_CACHE)
-            except Exception: pass
-            self.current_name=""; self._update_progress_display(name=f"'{name_to_exclude}' 已永久排除", remaining=len(NAME_INDICES_CACHE)); messagebox.showinfo("排除成功", f"名字 '{name_to_exclude}' 已從待抽取組合中永久移除。")
+            ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S"); db_insert_excluded(ts, name_to_exclude, name_to_record_index(name_to_exclude))
+            self.current_name=""; self._update_progress_display(name=f"'{display_name}' 已永久排除", remaining=len(engine.NAME_INDICES_CACHE)); messagebox.showinfo("排除成功", f"名字 '{display_name}' 已從待抽取組合中永久移除。")
         except ValueError:
             messagebox.showerror("錯誤","當前字詞庫中不包含此名字的字詞，無法排除。")
         except Exception as e:
@@ -1578,7 +1236,7 @@ class NameGeneratorApp:
         if self.current_name:
             ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             try:
-                db_insert_favorite(ts, self.current_name)
+                db_insert_favorite(ts, self.current_name, name_to_record_index(self.current_name))
                 messagebox.showinfo("收藏成功", f"'{self.current_name}' 已加入收藏清單。")
             except Exception as e:
                 messagebox.showerror("錯誤", f"無法寫入收藏: {e}")
@@ -1588,15 +1246,17 @@ class NameGeneratorApp:
     def view_favorites_gui(self):
         """
         顯示收藏清單的視窗（含播放、複製、刪除與匯出功能）。
-        會使用資料庫中的 favorites 表（fetch id,timestamp,name）來展示並允許刪除單筆。
-        將這個方法貼到你的 NameGeneratorApp 類中（與其他 view_* 函式平行）。
+        資料來自 FavoritesModel：開啟時只讀第一頁，捲到底部再載入下一頁；
+        刪除（可多選，單一交易）與新增只更新本地清單，不重新讀取整張表。
+        模型保留在 self._favorites_model，再次開啟時只補上新收藏。
         """
         try:
-            # 取得帶 id 的 favorites 資料
-            with db_connect() as conn:
-                cur = conn.cursor()
-                cur.execute("SELECT id, timestamp, name FROM favorites ORDER BY id ASC;")
-                rows = cur.fetchall()
+            model = self._favorites_model
+            if model is None:
+                model = self._favorites_model = FavoritesModel()
+                model.load_more()
+            else:
+                model.sync()
         except Exception as e:
             messagebox.showerror("錯誤", f"無法讀取收藏資料庫：{e}")
             return
@@ -1607,55 +1267,56 @@ class NameGeneratorApp:
         w.transient(self.master)
         w.grab_set()
 
-        # listbox 與 scrollbar
+        # listbox 與 scrollbar（EXTENDED：Shift/Ctrl 多選）
         list_frame = tk.Frame(w)
         list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=8)
         scrollbar = tk.Scrollbar(list_frame, orient=tk.VERTICAL)
-        listbox = tk.Listbox(list_frame, yscrollcommand=scrollbar.set, font=('Courier New', 10))
+        listbox = tk.Listbox(list_frame, selectmode=tk.EXTENDED, font=('Courier New', 10))
         scrollbar.config(command=listbox.yview)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         listbox.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
+        status_var = tk.StringVar()
+        tk.Label(w, textvariable=status_var, anchor='w').pack(fill=tk.X, padx=10)
+
+        def append_rows(rows):
+            if rows:
+                listbox.insert(tk.END, *(f"[{ts}] - {name}" for fid, ts, name in rows))
+            more = "" if model.done else "（捲動載入更多）"
+            status_var.set(f"收藏共 {model.total:,} 筆，已載入 {len(model.rows):,} 筆{more}")
+
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            if not model.done and float(last) > 0.9:
+                try:
+                    append_rows(model.load_more())
+                except Exception as e:
+                    messagebox.showerror("錯誤", f"無法讀取收藏資料庫：{e}", parent=w)
 
-        # 將 rows（id,ts,name）存到本地變數以便操作
-        fav_rows = list(rows or [])
-
-        def refresh_list():
-            nonlocal fav_rows
-            try:
-                with db_connect() as conn:
-                    cur = conn.cursor()
-                    cur.execute("SELECT id, timestamp, name FROM favorites ORDER BY id ASC;")
-                    fav_rows = cur.fetchall()
-            except Exception as e:
-                messagebox.showerror("錯誤", f"無法讀取收藏資料庫：{e}")
-                fav_rows = []
-            listbox.delete(0, tk.END)
-            for i, (fid, ts, name) in enumerate(fav_rows, start=1):
-                display = f"{i:03d}. [{ts}] - {name}"
-                listbox.insert(tk.END, display)
-
-        refresh_list()
+        listbox.config(yscrollcommand=on_scroll)
+        append_rows(model.rows)
 
         # 按鈕功能
-        def play_selected():
+        def first_selected():
             sel = listbox.curselection()
             if not sel:
                 messagebox.showwarning("請選擇", "請先從列表中選擇一個收藏項目。")
+                return None
+            return model.rows[sel[0]]
+
+        def play_selected():
+            row = first_selected()
+            if not row:
                 return
-            idx = sel[0]
-            _, ts, name = fav_rows[idx]
             try:
-                speak_text(name)
+                speak_text(row[2])
             except Exception:
                 messagebox.showwarning("發音失敗", "發音模組不可用或發生錯誤。")
 
         def copy_selected():
-            sel = listbox.curselection()
-            if not sel:
-                messagebox.showwarning("請選擇", "請先從列表中選擇一個收藏項目。")
+            row = first_selected()
+            if not row:
                 return
-            idx = sel[0]
-            _, ts, name = fav_rows[idx]
+            name = row[2]
             try:
                 w.clipboard_clear()
                 w.clipboard_append(name)
@@ -1668,32 +1329,35 @@ class NameGeneratorApp:
             if not sel:
                 messagebox.showwarning("請選擇", "請先從列表中選擇一個收藏項目。")
                 return
-            idx = sel[0]
-            fid, ts, name = fav_rows[idx]
-            if not messagebox.askyesno("確認刪除", f"確定要刪除收藏：\n[{ts}] - {name}？"):
+            if len(sel) == 1:
+                fid, ts, name = model.rows[sel[0]]
+                prompt = f"確定要刪除收藏：\n[{ts}] - {name}？"
+            else:
+                prompt = f"確定要刪除選取的 {len(sel):,} 筆收藏？"
+            if not messagebox.askyesno("確認刪除", prompt):
                 return
             try:
-                with db_connect() as conn:
-                    cur = conn.cursor()
-                    # 使用 id 刪除最安全
-                    cur.execute("DELETE FROM favorites WHERE id = ?;", (fid,))
-                refresh_list()
-                messagebox.showinfo("刪除成功", "已刪除選定的收藏。")
-                # 若在主畫面顯示收藏數量或其他資訊，可在此更新
+                for first, last in model.delete(sel):
+                    listbox.delete(first, last)
+                append_rows([])
+                if model.rows:
+                    pos = min(sel[0], len(model.rows) - 1)
+                    listbox.selection_set(pos)
+                    listbox.see(pos)
             except Exception as e:
                 messagebox.showerror("刪除失敗", f"刪除收藏時發生錯誤：{e}")
 
         def export_all():
             try:
-                if not fav_rows:
+                if not model.total:
                     messagebox.showinfo("匯出", "收藏列表為空，無資料可匯出。")
                     return
                 fn = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text files", "*.txt")], initialfile=f"favorites_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
                 if not fn:
                     return
                 with open(fn, 'w', encoding='utf-8') as f:
-                    for fid, ts, name in fav_rows:
-                        f.write(f"[{ts}] - {name}\n")
+                    for rows in db_iter_favorites():
+                        f.write("".join(f"[{ts}] - {name}\n" for fid, ts, name in rows))
                 messagebox.showinfo("匯出成功", f"已匯出至：{fn}")
             except Exception as e:
                 messagebox.showerror("匯出失敗", f"匯出過程發生錯誤：{e}")
@@ -1718,67 +1382,140 @@ class NameGeneratorApp:
         listbox.bind("<Key>", on_key)
 
         # 讓清單自動選到第一項（若存在）
-        if fav_rows:
+        if model.rows:
             try:
                 listbox.selection_set(0)
                 listbox.see(0)
             except Exception:
                 pass
-    
-    
 
     def view_history_gui(self):
-        rows = db_get_history()
-        w = tk.Toplevel(self.master); w.title("抽取歷史紀錄"); w.geometry("450x600")
-        text_widget = scrolledtext.ScrolledText(w, wrap=tk.WORD, font=('Courier New', 10)); text_widget.pack(expand=True, fill=tk.BOTH, padx=10, pady=10)
-        if not rows: text_widget.insert(tk.END, "尚無歷史記錄。")
-        else:
-            for ts, name, tones in rows:
-                t_display = f"[{ts}] - {name}"
-                if tones:
-                    try:
-                        t_list = json.loads(tones); t_display += f" [{','.join(map(str,t_list))}]"
-                    except Exception:
-                        pass
+        """
+        歷史紀錄視窗（由新到舊）：每次以 id keyset 向 DB 取一頁（db_history_page），
+        捲到接近底部才載入下一頁，因此開啟時間與記憶體和歷史筆數無關。
+        名字篩選與跳到日期都在 SQL 端完成（完整名字走 idx 索引，其他用 LIKE；日期以 id 二分搜尋）。
+        """
+        try:
+            total = db_count_history()
+        except Exception as e:
+            messagebox.showerror("錯誤", f"無法讀取歷史資料庫：{e}")
+            return
+        w = tk.Toplevel(self.master); w.title("抽取歷史紀錄"); w.geometry("480x620")
 
-# ----------------- 啟動邏輯 -----------------
-def setup_data_paths():
-    global WORDS_FILE, STATE_FILE, HISTORY_FILE, FAVORITES_FILE, STATUS_FILE, DATA_DIR, DB_FILE, CHAR_ATTR_FILE
-    if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR)
-    WORDS_FILE = os.path.join(DATA_DIR, 'words_list.txt')
-    STATE_FILE = os.path.join(DATA_DIR, 'name_indices.json')
-    HISTORY_FILE = os.path.join(DATA_DIR, 'drawn_history.txt')
-    FAVORITES_FILE = os.path.join(DATA_DIR, 'favorites.txt')
-    STATUS_FILE = os.path.join(DATA_DIR, 'system_status.json')
-    DB_FILE = os.path.join(DATA_DIR, 'name_generator.sqlite3')
-    CHAR_ATTR_FILE = os.path.join(DATA_DIR, 'char_attributes.json')
+        bar = tk.Frame(w); bar.pack(fill=tk.X, padx=10, pady=(10,4))
+        tk.Label(bar, text="名字:").pack(side=tk.LEFT)
+        filter_var = tk.StringVar()
+        filter_entry = tk.Entry(bar, textvariable=filter_var, width=8); filter_entry.pack(side=tk.LEFT, padx=(2,6))
+        tk.Label(bar, text="日期:").pack(side=tk.LEFT)
+        date_var = tk.StringVar()
+        date_entry = tk.Entry(bar, textvariable=date_var, width=11); date_entry.pack(side=tk.LEFT, padx=(2,6))
+
+        list_frame = tk.Frame(w); list_frame.pack(expand=True, fill=tk.BOTH, padx=10, pady=4)
+        scrollbar = tk.Scrollbar(list_frame, orient=tk.VERTICAL)
+        listbox = tk.Listbox(list_frame, font=('Courier New', 10), activestyle='none')
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y); listbox.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
+        status_var = tk.StringVar()
+        tk.Label(w, textvariable=status_var, anchor='w').pack(fill=tk.X, padx=10, pady=(0,8))
+
+        # 目前的查詢條件與 keyset 游標
+        view = {"before_id": None, "idx": None, "name_like": None, "loaded": 0, "done": False, "pending": False}
+
+        def load_page():
+            view["pending"] = False
+            if view["done"]:
+                return
+            try:
+                rows = db_history_page(view["before_id"], idx=view["idx"], name_like=view["name_like"])
+            except Exception as e:
+                view["done"] = True; status_var.set(f"讀取失敗：{e}"); return
+            if rows:
+                listbox.insert(tk.END, *(history_line(ts, name, tones) for _id, ts, name, tones in rows))
+                view["before_id"] = rows[-1][0]
+                view["loaded"] += len(rows)
+            if len(rows) < HISTORY_PAGE_SIZE:
+                view["done"] = True
+            if not view["loaded"]:
+                listbox.insert(tk.END, "尚無歷史記錄。" if not total else "沒有符合條件的紀錄。")
+            more = "" if view["done"] else "（捲動載入更多）"
+            status_var.set(f"已載入 {view['loaded']:,} 筆 / 歷史共 {total:,} 筆{more}")
+
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            if not view["done"] and not view["pending"] and float(last) > 0.9:
+                view["pending"] = True
+                w.after_idle(load_page)
+
+        listbox.config(yscrollcommand=on_scroll)
+        scrollbar.config(command=listbox.yview)
+
+        def restart(before_id=None):
+            text = filter_var.get().strip()
+            # 剛好是目前長度的完整名字才用索引精確查詢，其餘（單字、較短或較長）都以子字串篩選
+            idx = name_to_record_index(text) if len(text) == engine.NAME_LENGTH else None
+            view.update(before_id=before_id, idx=idx, name_like=None if idx is not None else (text or None), loaded=0, done=False)
+            listbox.delete(0, tk.END)
+            load_page()
+            listbox.yview_moveto(0)
 
+        def jump_to_date(event=None):
+            text = date_var.get().strip()
+            if not text:
+                restart(); return
+            try:
+                day = datetime.strptime(text, "%Y-%m-%d").strftime("%Y-%m-%d")
+            except ValueError:
+                messagebox.showwarning("日期格式錯誤", "請輸入 YYYY-MM-DD，例如 2024-05-01。", parent=w); return
+            anchor = db_history_id_at(f"{day} 23:59:59")
+            if anchor is None:
+                messagebox.showinfo("跳到日期", f"{day} 之前沒有歷史記錄。", parent=w); return
+            restart(before_id=anchor + 1)
+
+        def show_latest():
+            date_var.set(""); restart()
+
+        filter_entry.bind("<Return>", lambda e: restart())
+        date_entry.bind("<Return>", jump_to_date)
+        tk.Button(bar, text="篩選", command=restart).pack(side=tk.LEFT, padx=2)
+        tk.Button(bar, text="跳到日期", command=jump_to_date).pack(side=tk.LEFT, padx=2)
+        tk.Button(bar, text="最新", command=show_latest).pack(side=tk.LEFT, padx=2)
+        load_page()
+
+# ----------------- 啟動邏輯 -----------------
 def load_master_words():
-    global MASTER_WORDS, POOL_SIZE, WORD_COUNT, WORD_TO_INDEX
-    if not os.path.exists(WORDS_FILE):
-        try:
-            with open(WORDS_FILE, 'w', encoding='utf-8') as f:
-                f.write("愛\n麗\n雅\n靜\n")
-                f.write("風\n雲\n月\n星\n")
-            messagebox.showerror("錯誤：找不到字詞庫", f"找不到字詞庫檔案 '{WORDS_FILE}'。\n程式已在資料夾中為您創建範本檔案，請編輯後再次運行程式。")
-            sys.exit(1)
-        except Exception as e:
-            messagebox.showerror("錯誤", f"無法創建字詞庫檔案: {e}"); sys.exit(1)
     try:
-        with open(WORDS_FILE, 'r', encoding='utf-8') as f: content = f.read()
-        final_words = []
-        for ch in content:
-            if ch.strip() and not ch.isspace() and ch not in [',','，','#','\n']:
-                final_words.append(ch)
-        if not final_words:
-            messagebox.showerror("錯誤", f"字詞庫檔案 '{WORDS_FILE}' 內容為空。請編輯後重新運行。"); sys.exit(1)
-        MASTER_WORDS = final_words
-        WORD_COUNT = len(MASTER_WORDS); POOL_SIZE = WORD_COUNT * WORD_COUNT
-        WORD_TO_INDEX = {word:i for i,word in enumerate(MASTER_WORDS)}
+        engine.load_master_words()
+    except FileNotFoundError as e:
+        messagebox.showerror("錯誤：找不到字詞庫", str(e)); sys.exit(1)
+    except ValueError as e:
+        messagebox.showerror("錯誤", str(e)); sys.exit(1)
     except Exception as e:
         messagebox.showerror("錯誤", f"加載字詞庫時發生錯誤: {e}"); sys.exit(1)
 
+def stop_db_writer(parent=None):
+    """結束背景寫入（關閉 / 重新啟動前）；有寫入無法提交時詢問是否重試，放棄則回傳 False。"""
+    while True:
+        try:
+            db.stop_writer()
+            return True
+        except Exception as e:
+            if not messagebox.askretrycancel(
+                    "寫入失敗", f"部分抽取紀錄尚未寫入資料庫：\n{e}\n\n要重試嗎？（取消將放棄這些紀錄）", parent=parent):
+                return False
+
+# 視窗出現後才在背景建立聲調表（拼音快取不完整時才會載入 pypinyin）、各姓氏的評分表並載入 pyttsx3；
+# 使用者在完成前抽取時，抽取會等待同一份建立（ensure_phonetic_table 有鎖），不會重複載入。
+WARMUP_DELAY_MS = 300
+
+def warm_optional_modules():
+    for step in (engine.ensure_phonetic_table, engine.precompute_surname_tables, warm_up_tts):
+        try:
+            step()
+        except Exception as e:
+            print("警告：背景預熱失敗:", e)
+
+def start_background_warmup():
+    threading.Thread(target=warm_optional_modules, daemon=True).start()
+
 # ----------------- 補充：簡化的 RestoreExcludedDialog 和 BatchWordManagerDialog ------------
 class RestoreExcludedDialog(tk.Toplevel):
     def __init__(self, master_app, excluded_rows):
@@ -1824,22 +1561,18 @@ class RestoreExcludedDialog(tk.Toplevel):
         for i in sel:
             _id, ts, name = self.excluded_rows[i]
             idx = name_to_index(name)
-            if idx is None:
+            if idx is None and len(name or "") == engine.NAME_LENGTH:
                 continue
-            if idx not in NAME_INDICES_CACHE:
-                NAME_INDICES_CACHE.append(idx)
             try:
-                db_insert_remaining_index(idx)
+                # 其他長度的名字只刪除排除紀錄，切換到該長度時重建的抽取池就會包含它
+                if idx is not None and engine.NAME_INDICES_CACHE.add(idx):
+                    record_pool_change("restore", idx)
                 db_delete_excluded_by_id(_id)
                 restored += 1
             except Exception:
                 pass
-        try:
-            db_replace_remaining(NAME_INDICES_CACHE)
-        except Exception:
-            pass
         messagebox.showinfo("成功", f"已恢復 {restored} 個組合。")
-        self.master_app._update_progress_display(remaining=len(NAME_INDICES_CACHE))
+        self.master_app._update_progress_display(remaining=len(engine.NAME_INDICES_CACHE))
         self.destroy()
 
 class BatchWordManagerDialog(tk.Toplevel):
@@ -1849,7 +1582,7 @@ class BatchWordManagerDialog(tk.Toplevel):
         self.geometry("500x600")
         self.app_instance = app_instance
         self.word_edit_area = scrolledtext.ScrolledText(self, wrap=tk.WORD, font=('Microsoft JhengHei',12), padx=10, pady=10)
-        initial_content = "\n".join(MASTER_WORDS)
+        initial_content = "\n".join(engine.MASTER_WORDS)
         self.word_edit_area.insert(tk.END, initial_content)
         self.word_edit_area.pack(expand=True, fill='both')
         bf = tk.Frame(self); bf.pack(pady=10)
@@ -1885,11 +1618,17 @@ class BatchWordManagerDialog(tk.Toplevel):
         if len(clean_words) < 2:
             messagebox.showerror("保存失敗", "字詞庫至少需要兩個字。"); return
         try:
-            atomic_write(WORDS_FILE, "\n".join(clean_words) + "\n")
+            atomic_write(engine.WORDS_FILE, "\n".join(clean_words) + "\n")
         except Exception as e:
             messagebox.showerror("保存失敗", f"寫入檔案時發生錯誤:\n{e}"); return
         messagebox.showinfo("保存成功", f"字詞庫已更新，共 {len(clean_words)} 個字，程式將重新啟動。")
         self.master.quit()
+        # 重新啟動前先把寫入佇列與抽取池狀態寫回 DB
+        stop_db_writer(self)
+        try:
+            save_indices_cache()
+        except Exception:
+            pass
         python = sys.executable
         try:
             os.execl(python, python, *sys.argv)
@@ -1901,12 +1640,13 @@ if __name__ == "__main__":
     load_master_words()
     load_char_attributes()
     init_db()
-    if not os.path.exists(DB_FILE) or (not db_get_remaining() and POOL_SIZE > 0):
-        initialize_database(reset_history=True)
-    else:
-        load_indices_cache()
+    load_draw_mode()
+    load_indices_cache()
+    # 抽取/歷史等寫入改由背景執行緒提交，Tk 主執行緒不會被 DB 卡住
+    db.start_writer()
     root = tk.Tk()
     # NOTE: integrate complete NameGeneratorApp implementation (above is truncated with pass for brevity)
     app = NameGeneratorApp(root)
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
+    root.after(WARMUP_DELAY_MS, start_background_warmup)
     root.mainloop()
\ No newline at end of file